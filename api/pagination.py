@@ -0,0 +1,214 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+from typing import Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from chat.archive import ChatHistory
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Cursor pagination that seeks directly to the position given by the values of all the `ordering` fields, so deep
+    pages cost the same as the first one (as long as an index covers `ordering`).
+
+    Parameters
+    ----------
+    ordering: :class:`tuple`
+        Fields that define the position of each row. Last one must be unique.
+    page_size: :class:`int`
+        Default number of rows per page.
+    max_page_size: :class:`int`
+        Maximum number of rows per page clients can ask for.
+    """
+
+    ordering = ('-entry_created_at', '-id')
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    invalid_cursor_message = _('invalid cursor').capitalize()
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.limit = self.get_page_size(request)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        position, reverse = self.decode_cursor(request, queryset)
+
+        results = self.get_rows(queryset, position, reverse, self.limit + 1)
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.page = results
+        return results
+
+    def get_rows(self, queryset: QuerySet, position: Optional[list], reverse: bool, size: int) -> list:
+        """
+        Returns up to `size` rows placed after given position (from the beginning if not given).
+        """
+
+        ordering = self.get_ordering(reverse)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(ordering, position))
+        return list(queryset[:size])
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, reverse: bool) -> list[str]:
+        if not reverse:
+            return list(self.ordering)
+        return [field.lstrip('-') if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def get_position_filter(self, ordering: list[str], position: list) -> Q:
+        """
+        Returns rows placed after given position for given ordering, that is `(a, b) < (x, y)` for descending fields.
+        """
+
+        conditions = []
+        for index, field in enumerate(ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {name: value for name, value in zip(self.fields[:index], position)}
+            conditions.append(Q(**equal, **{f'{self.fields[index]}__{lookup}': position[index]}))
+        return reduce(or_, conditions)
+
+    def get_position(self, instance) -> list:
+        return [getattr(instance, field) for field in self.fields]
+
+    def encode_cursor(self, instance, reverse: bool) -> str:
+        position = [
+            value.isoformat() if hasattr(value, 'isoformat') else value for value in self.get_position(instance)
+        ]
+        data = json.dumps({'p': position, 'r': reverse}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(data.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request: Request, queryset: QuerySet) -> tuple:
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values = data['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [
+                queryset.model._meta.get_field(field).to_python(value) for field, value in zip(self.fields, values)
+            ]
+            return position, bool(data.get('r', False))
+        except (binascii.Error, TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data) -> Response:
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view) -> list[dict]:
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value, send it empty to start paginating by cursor.',
+                'schema': {'type': 'string'},
+            },
+        ]
+
+
+class LimitOffsetOrCursorPagination(LimitOffsetPagination):
+    """
+    Keeps :class:`LimitOffsetPagination` as default, but paginates with :class:`KeysetCursorPagination` once the
+    `cursor` query parameter is given (even if empty), since deep offsets get slower the longer the list is.
+    """
+
+    cursor_pagination_class = KeysetCursorPagination
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_pagination_class.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data) -> Response:
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        schema = super().get_paginated_response_schema(schema)
+        # NOTE: `count` is not given when paginating by cursor
+        schema['properties']['count']['nullable'] = True
+        return schema
+
+    def get_schema_operation_parameters(self, view) -> list[dict]:
+        return [
+            *super().get_schema_operation_parameters(view),
+            *self.cursor_pagination_class().get_schema_operation_parameters(view),
+        ]
+
+
+class ChatHistoryCursorPagination(KeysetCursorPagination):
+    """
+    Cursor pagination over a :class:`~chat.archive.ChatHistory`, which goes on with archived messages once the
+    messages table is exhausted.
+    """
+
+    def get_rows(self, queryset: ChatHistory, position: Optional[list], reverse: bool, size: int) -> list:
+        return queryset.seek(position, reverse, size)
+
+
+class ChatHistoryPagination(LimitOffsetOrCursorPagination):
+    """
+    Same as :class:`LimitOffsetOrCursorPagination` but for a :class:`~chat.archive.ChatHistory`.
+    """
+
+    cursor_pagination_class = ChatHistoryCursorPagination
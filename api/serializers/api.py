@@ -51,6 +51,21 @@ class DiceRollSerializer(serializers.Serializer):
     roll = serializers.CharField(required=True)
 
 
+class DiceRollSimulationSerializer(DiceRollSerializer):
+    """
+    Serializer for rolling dice several times.
+
+    Parameters
+    ----------
+    roll: :class:`str`
+        Dice notation.
+    trials: :class:`int`
+        Times the dice are rolled.
+    """
+
+    trials = serializers.IntegerField(required=True)
+
+
 class DiceRollResponseSerializer(serializers.Serializer):
     """
     Serializer for resulting dice roll.
@@ -66,3 +81,64 @@ class DiceRollResponseSerializer(serializers.Serializer):
 
     result = serializers.IntegerField(required=True)
     rolls = serializers.DictField(required=True)
+
+
+class DiceRollDistributionResponseSerializer(serializers.Serializer):
+    """
+    Serializer for the probability distribution of a dice roll.
+    This specific serializer is used for DRF-YASG.
+
+    Parameters
+    ----------
+    roll: :class:`str`
+        Normalized dice notation.
+    minimum: :class:`int`
+        Lowest possible result.
+    maximum: :class:`int`
+        Highest possible result.
+    mean: :class:`float`
+        Expected result.
+    variance: :class:`float`
+        Variance of the results.
+    percentiles: :class:`dict`
+        Result reached by each percentile.
+    distribution: :class:`dict`
+        Probability of every possible result.
+    """
+
+    roll = serializers.CharField(required=True)
+    minimum = serializers.IntegerField(required=True)
+    maximum = serializers.IntegerField(required=True)
+    mean = serializers.FloatField(required=True)
+    variance = serializers.FloatField(required=True)
+    percentiles = serializers.DictField(child=serializers.IntegerField(), required=True)
+    distribution = serializers.DictField(child=serializers.FloatField(), required=True)
+
+
+class DiceRollSimulationResponseSerializer(serializers.Serializer):
+    """
+    Serializer for the results of rolling dice several times.
+    This specific serializer is used for DRF-YASG.
+
+    Parameters
+    ----------
+    roll: :class:`str`
+        Normalized dice notation.
+    totals: list[:class:`int`]
+        Result of each trial.
+    minimum: :class:`int`
+        Lowest result rolled.
+    maximum: :class:`int`
+        Highest result rolled.
+    mean: :class:`float`
+        Mean of the results.
+    stdev: :class:`float`
+        Standard deviation of the results.
+    """
+
+    roll = serializers.CharField(required=True)
+    totals = serializers.ListField(child=serializers.IntegerField(), required=True)
+    minimum = serializers.IntegerField(required=True)
+    maximum = serializers.IntegerField(required=True)
+    mean = serializers.FloatField(required=True)
+    stdev = serializers.FloatField(required=True)
@@ -1,5 +1,9 @@
+from typing import Dict, Optional
+
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
+from chat.archive import ChatHistory
 from chat.models import Chat, ChatMessage
 
 from .common import WebSocketMessageSerializer
@@ -26,18 +30,61 @@ class ChatMessageUpdateRequestSerializer(ChatMessageCreateRequestSerializer):
     pass
 
 
+class ChatLastMessageSerializer(serializers.Serializer):
+    """
+    Preview of the last message of a chat.
+    """
+
+    id = serializers.IntegerField()
+    message = serializers.CharField()
+    author = serializers.IntegerField()
+    entry_created_at = serializers.DateTimeField()
+
+
 class ChatSerializer(serializers.ModelSerializer):
+    """
+    API serializer for :class:`Chat`, it needs the chat annotated by
+    :meth:`~chat.managers.ChatQuerySet.with_summary`. Messages are listed by the messages endpoint.
+    """
+
+    message_count = serializers.IntegerField(read_only=True)
+    unread_count = serializers.IntegerField(read_only=True)
+    last_message = serializers.SerializerMethodField()
+
+    @extend_schema_field(ChatLastMessageSerializer(allow_null=True))
+    def get_last_message(self, obj: Chat) -> Optional[Dict]:
+        if obj.last_message_id is None:
+            return None
+        if obj.last_message_message is None:
+            # NOTE: Every message is archived, so the last one is read from the newest archive
+            message = ChatHistory(obj.chat_message_set.none(), obj.pk)[:1][0]
+            return ChatLastMessageSerializer({
+                'id': message.id,
+                'message': message.message,
+                'author': message.author_id,
+                'entry_created_at': message.entry_created_at,
+            }).data
+        return ChatLastMessageSerializer({
+            'id': obj.last_message_id,
+            'message': obj.last_message_message,
+            'author': obj.last_message_author,
+            'entry_created_at': obj.last_message_entry_created_at,
+        }).data
+
     class Meta:
         model = Chat
         fields = (
-            'id', 'name', 'users', 'chat_message_set', 'entry_created_at', 'entry_updated_at',
+            'id', 'name', 'users', 'message_count', 'unread_count', 'last_message', 'entry_created_at',
+            'entry_updated_at',
         )
 
 
+class ChatReadRequestSerializer(serializers.Serializer):
+    message = serializers.IntegerField(min_value=1, required=False)
+
+
 class WebSocketChatSerializer(WebSocketMessageSerializer):
-    chat = serializers.PrimaryKeyRelatedField(
-        queryset=Chat.objects.all(),
-        required=True,
-    )
+    # NOTE: Consumers check chats against the memberships of the user, so there's no query per frame
+    chat = serializers.IntegerField(min_value=1, required=True)
     message = serializers.CharField(max_length=255, required=False)
     content = ChatMessageSerializer(many=False, read_only=True)
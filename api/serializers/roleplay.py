@@ -1,11 +1,16 @@
+from collections import defaultdict
 from typing import Dict, List, Optional
 
+from django.conf import settings
+from django.core.cache import cache
 from drf_spectacular.utils import OpenApiExample, extend_schema_serializer
 from rest_framework import serializers
 
 from roleplay.managers import PlaceQuerySet
 # NOTE: Since Schema needs to access models we need to import them instead of dynamically calling from `apps.get_model`
 from roleplay.models import Campaign, Domain, Place, Race
+from roleplay.utils.trees import get_place_tree_cache_key
+from roleplay.utils.worlds import FORMATS
 
 
 class DomainSerializer(serializers.ModelSerializer):
@@ -57,14 +62,43 @@ class DomainSerializer(serializers.ModelSerializer):
     )]
 )
 class PlaceNestedSerializer(serializers.ModelSerializer):
+    """
+    Serializes a place with every place inside it. The whole tree is fetched with a single query and built in one pass,
+    truncated to `depth` levels below the place if given in the context. Trees are cached until any place changes.
+    """
+
     children = serializers.SerializerMethodField()
 
+    def to_representation(self, instance: Place) -> Dict:
+        request = self.context.get('request')
+        depth = self.context.get('depth')
+        # NOTE: Image URLs are absolute when there is a request, so they are cached per host
+        key = get_place_tree_cache_key(
+            instance.tree_id, 'api', instance.pk, depth, request.build_absolute_uri('/') if request else '',
+        )
+        data = cache.get(key)
+        if data is None:
+            data = self.build_tree(instance, depth)
+            cache.set(key, data, timeout=settings.PLACE_TREE_CACHE_TIMEOUT)
+        return data
+
+    def build_tree(self, instance: Place, depth: Optional[int]) -> Dict:
+        places: PlaceQuerySet = instance.get_descendants(include_self=True).order_by('-path')
+        if depth is not None:
+            places = places.filter(level__lte=instance.level + depth)
+        # NOTE: Places are serialized from the last one, so children are always serialized before their parents
+        self.tree = defaultdict(list)
+        for place in places:
+            data = super().to_representation(place)
+            if place.pk == instance.pk:
+                return data
+            self.tree[place.parent_site_id].append(data)
+        return super().to_representation(instance)
+
     def get_children(self, obj: Place) -> List[Dict]:
-        children: PlaceQuerySet = obj.get_children()
-        if not children:
-            return []
-        serialized_children = PlaceNestedSerializer(children, many=True, read_only=True)
-        return serialized_children.data
+        children = self.tree.pop(obj.pk, [])
+        children.reverse()
+        return children
 
     class Meta:
         model = Place
@@ -105,3 +139,41 @@ class RaceSerializer(serializers.ModelSerializer):
             'id', 'name', 'description', 'strength', 'dexterity', 'constitution', 'intelligence', 'wisdom', 'charisma',
             'affected_by_armor', 'image', 'users', 'owners',
         )
+
+
+class WorldImportSerializer(serializers.Serializer):
+    """
+    Serializer for importing a world from a document of places.
+
+    Parameters
+    ----------
+    file: :class:`File`
+        Document with the places, the first one is the world.
+    file_format: :class:`str`
+        Either `json` or `csv`, guessed from the name of the file if not given.
+    is_public: :class:`bool`
+        Whether the places belong to the community.
+    """
+
+    file = serializers.FileField(required=True)
+    file_format = serializers.ChoiceField(choices=FORMATS, required=False)
+    is_public = serializers.BooleanField(default=False)
+
+
+class WorldImportResponseSerializer(serializers.Serializer):
+    """
+    Serializer for the world imported.
+
+    Parameters
+    ----------
+    id: :class:`int`
+        Identifier of the world.
+    name: :class:`str`
+        Name of the world.
+    places: :class:`int`
+        Number of places created, the world included.
+    """
+
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    places = serializers.IntegerField()
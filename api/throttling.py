@@ -0,0 +1,58 @@
+from typing import Optional
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from core.throttling import get_token_buckets, parse_rate
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttles requests with a token bucket per user (or IP for anonymous requests) shared by every process through
+    the channel layer.
+    Rates are taken from `DEFAULT_THROTTLE_RATES` by `scope`, or by `<scope>_premium` for premium users if given.
+
+    Parameters
+    ----------
+    scope: :class:`str`
+        Name of the rate.
+    """
+
+    scope = None
+    wait_time = None
+
+    def get_rate(self, request) -> Optional[str]:
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        if getattr(request.user, 'is_premium', False) and f'{self.scope}_premium' in rates:
+            return rates[f'{self.scope}_premium']
+        return rates.get(self.scope)
+
+    def get_cache_key(self, request, view) -> str:
+        ident = request.user.pk if request.user.is_authenticated else self.get_ident(request)
+        return f'{self.scope}:{ident}'
+
+    def allow_request(self, request, view) -> bool:
+        rate = parse_rate(self.get_rate(request))
+        channel_layer = get_channel_layer()
+        if rate is None or channel_layer is None:
+            return True
+        buckets = get_token_buckets(channel_layer)
+        self.wait_time = async_to_sync(buckets.consume)(self.get_cache_key(request, view), *rate)
+        return self.wait_time == 0
+
+    def wait(self) -> Optional[float]:
+        return self.wait_time
+
+
+class RollThrottle(TokenBucketThrottle):
+    scope = 'roll'
+
+
+class RollDistributionThrottle(TokenBucketThrottle):
+    scope = 'roll_distribution'
+
+
+class RollSimulationThrottle(TokenBucketThrottle):
+    scope = 'roll_simulation'
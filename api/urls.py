@@ -11,6 +11,8 @@ app_name = 'api'
 UTILS_PATTERNS = [
     path('resolver/', api.URLResolverView.as_view(), name='resolver'),
     path('roll/', api.RollView.as_view(), name='roll_dice'),
+    path('roll/distribution/', api.RollDistributionView.as_view(), name='roll_distribution'),
+    path('roll/simulation/', api.RollSimulationView.as_view(), name='roll_simulation'),
 ]
 
 obtain_token_view = extend_schema_view(
@@ -12,11 +12,13 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 
 from core.exceptions import OilAndRopeException
-from roleplay.utils.dice import roll_dice
+from roleplay.utils.dice import roll_dice, roll_distribution, simulate_roll
 
 from .. import get_version
-from ..serializers.api import (ApiVersionSerializer, DiceRollResponseSerializer, DiceRollSerializer,
+from ..serializers.api import (ApiVersionSerializer, DiceRollDistributionResponseSerializer, DiceRollResponseSerializer,
+                               DiceRollSerializer, DiceRollSimulationResponseSerializer, DiceRollSimulationSerializer,
                                URLResolverResponseSerializer, URLResolverSerializer)
+from ..throttling import RollDistributionThrottle, RollSimulationThrottle, RollThrottle
 
 
 class ApiVersionView(GenericAPIView):
@@ -90,6 +92,7 @@ class RollView(GenericAPIView):
     pagination_class = None
     permission_classes = [IsAuthenticated]
     serializer_class = DiceRollSerializer
+    throttle_classes = [RollThrottle]
 
     # NOTE: Overriding to get typing notations
     def get_serializer(self, *args, **kwargs) -> DiceRollSerializer:
@@ -128,3 +131,115 @@ class RollView(GenericAPIView):
             return Response(data=response_serializer.data, status=status.HTTP_200_OK)
         except OilAndRopeException as ex:
             raise ValidationError(ex.message)
+
+
+class RollDistributionView(GenericAPIView):
+    pagination_class = None
+    permission_classes = [IsAuthenticated]
+    serializer_class = DiceRollSerializer
+    throttle_classes = [RollDistributionThrottle]
+
+    # NOTE: Overriding to get typing notations
+    def get_serializer(self, *args, **kwargs) -> DiceRollSerializer:
+        return super().get_serializer(*args, **kwargs)
+
+    @extend_schema(
+        summary='Get dice roll probabilities',
+        operation_id='roleplay:roll:distribution',
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                response=DiceRollDistributionResponseSerializer,
+                examples=[
+                    OpenApiExample(name='Example 1', value={
+                        'roll': '2d4',
+                        'minimum': 2,
+                        'maximum': 8,
+                        'mean': 5.0,
+                        'variance': 2.5,
+                        'percentiles': {'5': 2, '25': 4, '50': 5, '75': 6, '95': 8},
+                        'distribution': {
+                            '2': 0.0625, '3': 0.125, '4': 0.1875, '5': 0.25, '6': 0.1875, '7': 0.125, '8': 0.0625,
+                        },
+                    }),
+                ]
+            ),
+        }
+    )
+    def post(self, request: Request) -> Response:
+        """
+        From given dice string, calculates the exact probability of every result without rolling.
+        """
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            distribution = roll_distribution(serializer.data['roll'])
+        except OilAndRopeException as ex:
+            raise ValidationError(ex.message)
+
+        response_serializer = DiceRollDistributionResponseSerializer(data={
+            'roll': distribution.expression,
+            'minimum': distribution.minimum,
+            'maximum': distribution.maximum,
+            'mean': distribution.mean,
+            'variance': distribution.variance,
+            'percentiles': distribution.percentiles,
+            'distribution': distribution.probabilities,
+        })
+        response_serializer.is_valid(raise_exception=True)
+        return Response(data=response_serializer.data, status=status.HTTP_200_OK)
+
+
+class RollSimulationView(GenericAPIView):
+    pagination_class = None
+    permission_classes = [IsAuthenticated]
+    serializer_class = DiceRollSimulationSerializer
+    throttle_classes = [RollSimulationThrottle]
+
+    # NOTE: Overriding to get typing notations
+    def get_serializer(self, *args, **kwargs) -> DiceRollSimulationSerializer:
+        return super().get_serializer(*args, **kwargs)
+
+    @extend_schema(
+        summary='Roll dice several times',
+        operation_id='roleplay:roll:simulation',
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                response=DiceRollSimulationResponseSerializer,
+                examples=[
+                    OpenApiExample(name='Example 1', value={
+                        'roll': '2d6',
+                        'totals': [7, 4, 9, 11],
+                        'minimum': 4,
+                        'maximum': 11,
+                        'mean': 7.75,
+                        'stdev': 2.5860201081971503,
+                    }),
+                ]
+            ),
+        }
+    )
+    def post(self, request: Request) -> Response:
+        """
+        From given dice string and number of trials, rolls dice that many times and returns the results of each one.
+        """
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            simulation = simulate_roll(serializer.data['roll'], serializer.data['trials'])
+        except OilAndRopeException as ex:
+            raise ValidationError(ex.message)
+
+        response_serializer = DiceRollSimulationResponseSerializer(data={
+            'roll': simulation.expression,
+            'totals': simulation.totals,
+            'minimum': simulation.minimum,
+            'maximum': simulation.maximum,
+            'mean': simulation.mean,
+            'stdev': simulation.stdev,
+        })
+        response_serializer.is_valid(raise_exception=True)
+        return Response(data=response_serializer.data, status=status.HTTP_200_OK)
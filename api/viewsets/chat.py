@@ -1,13 +1,19 @@
 from django.db.models import QuerySet
+from django.utils.translation import gettext_lazy as _
 from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.request import Request
 from rest_framework.response import Response
 
-from chat.models import Chat, ChatMessage
+from chat.archive import ChatHistory
+from chat.models import Chat, ChatMessage, ReadMarker
+from chat.state import notify_unread_changes
 
+from ..pagination import ChatHistoryPagination
 from ..serializers.chat import (ChatMessageCreateRequestSerializer, ChatMessageSerializer,
-                                ChatMessageUpdateRequestSerializer, ChatSerializer)
+                                ChatMessageUpdateRequestSerializer, ChatReadRequestSerializer, ChatSerializer)
 
 
 @extend_schema_view(
@@ -22,9 +28,33 @@ class ChatViewSet(viewsets.ReadOnlyModelViewSet):
         user = self.request.user
         qs = super().get_queryset().filter(
             users__in=[user],
-        )
+        ).with_summary(user).prefetch_related('users').order_by('-entry_created_at')
         return qs
 
+    @extend_schema(
+        summary='Mark chat as read',
+        request=ChatReadRequestSerializer,
+        responses={204: None},
+    )
+    @action(detail=True, methods=['post'])
+    def read(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Marks messages of the chat as read up to given message, or up to the last one if not given.
+        """
+
+        chat = self.get_object()
+        serializer = ChatReadRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        last_read_id = serializer.validated_data.get('message', chat.last_message_id or 0)
+        # NOTE: Any other identifier would mark as read messages of other chats or messages not sent yet
+        history = ChatHistory(chat.chat_message_set.all(), chat.pk)
+        if 'message' in serializer.validated_data and history.get(last_read_id) is None:
+            raise ValidationError({'message': [_('message does not belong to this chat.').capitalize()]})
+        ReadMarker.objects.update_or_create(chat=chat, user=request.user, defaults={'last_read_id': last_read_id})
+        unread_count = chat.chat_message_set.filter(pk__gt=last_read_id).exclude(author=request.user).count()
+        notify_unread_changes(chat.pk, request.user.pk, unread_count)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 @extend_schema(parameters=[
     OpenApiParameter(
@@ -34,23 +64,56 @@ class ChatViewSet(viewsets.ReadOnlyModelViewSet):
 ])
 @extend_schema_view(
     list=extend_schema(summary='List messages', description='Retrieve messages for given chat ID.'),
-    retrieve=extend_schema(summary='Get message', description='Get message in given chat ID by given ID.'),
+    retrieve=extend_schema(
+        summary='Get message', description='Get message in given chat ID by given ID, even if it is archived.',
+    ),
 )
 class ChatMessageViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
     queryset = ChatMessage.objects.all()
     serializer_class = ChatMessageSerializer
+    pagination_class = ChatHistoryPagination
+
+    def initial(self, request: Request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # NOTE: Membership is checked just once instead of joining chat users on every query
+        if not Chat.users.through.objects.filter(chat_id=self.kwargs['chat_pk'], user_id=request.user.pk).exists():
+            raise NotFound()
 
     def get_queryset(self) -> QuerySet:
         qs: QuerySet = super().get_queryset().filter(
-            chat__id=self.kwargs['chat_pk'],
-            chat__users__in=[self.request.user],
-        )
-        qs = qs.order_by('-entry_created_at')
+            chat_id=self.kwargs['chat_pk'],
+        ).select_related('author')
+        qs = qs.order_by('-entry_created_at', '-id')
         # User can only edit their own messages
         if self.action == 'partial_update':
             qs = qs.filter(author=self.request.user)
         return qs
 
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Lists messages of given chat ID, newest first, going on with archived messages once the recent ones are over.
+        """
+
+        history = ChatHistory(self.filter_queryset(self.get_queryset()), self.kwargs['chat_pk'])
+        page = self.paginate_queryset(history)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Gets message of given chat ID by given ID, looking for it among archived messages if it's not a recent one.
+        """
+
+        try:
+            message_id = int(self.kwargs['pk'])
+        except ValueError:
+            raise NotFound()
+        message = ChatHistory(self.get_queryset(), self.kwargs['chat_pk']).get(message_id)
+        if message is None:
+            raise NotFound()
+        serializer = self.get_serializer(message)
+        return Response(serializer.data)
+
     @extend_schema(
         summary='Create message',
         request=ChatMessageCreateRequestSerializer,
@@ -1,4 +1,3 @@
-from django.conf import settings
 from drf_spectacular.utils import extend_schema
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
@@ -7,6 +6,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from registration.models import User
+from registration.utils import bot_identity
 
 from ..serializers.registration import BotSerializer, UserSerializer
 
@@ -41,6 +41,4 @@ class BotViewSet(APIView):
         Gets Oil & Rope Bot and returns it as a JSON object.
         """
 
-        bot = User.objects.get(email=settings.DEFAULT_FROM_EMAIL)
-        serializer = self.serializer_class(bot)
-        return Response(data=serializer.data)
+        return Response(data=bot_identity.serialize(self.serializer_class))
@@ -1,10 +1,28 @@
-from drf_spectacular.utils import extend_schema, extend_schema_view
-from rest_framework import mixins, viewsets
+import io
+from typing import Optional
 
+from django.http import FileResponse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from core.exceptions import OilAndRopeException
 from roleplay.managers import CampaignQuerySet, PlaceQuerySet
 from roleplay.models import Campaign, Place
+from roleplay.utils.worlds import FORMATS, export_world_document, import_world
+
+from ..serializers.roleplay import (CampaignSerializer, PlaceNestedSerializer, WorldImportResponseSerializer,
+                                    WorldImportSerializer)
 
-from ..serializers.roleplay import CampaignSerializer, PlaceNestedSerializer
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'csv': 'text/csv',
+}
 
 
 @extend_schema_view(
@@ -23,7 +41,16 @@ class CampaignViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 @extend_schema_view(
-    retrieve=extend_schema(summary='Get place', description='Returns a place/world by given ID.'),
+    retrieve=extend_schema(
+        summary='Get place',
+        description='Returns a place/world by given ID.',
+        parameters=[
+            OpenApiParameter(
+                name='depth', type=int, location=OpenApiParameter.QUERY,
+                description='Maximum number of levels of places nested inside the place.',
+            ),
+        ],
+    ),
 )
 class PlaceNestedViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     queryset = Place.objects.all()
@@ -33,3 +60,67 @@ class PlaceNestedViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
         qs: PlaceQuerySet = super().get_queryset()
         qs = qs.community_places() | Place.objects.filter(owner=self.request.user)
         return qs
+
+    def get_serializer_context(self) -> dict:
+        context = super().get_serializer_context()
+        context['depth'] = self.get_depth()
+        return context
+
+    def get_depth(self) -> Optional[int]:
+        try:
+            depth = int(self.request.query_params['depth'])
+        except (KeyError, ValueError):
+            return None
+        return max(0, depth)
+
+    @extend_schema(
+        summary='Import world',
+        request={'multipart/form-data': WorldImportSerializer},
+        responses={201: WorldImportResponseSerializer},
+    )
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_world(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Creates a world owned by the user from a document of places, read as it's uploaded.
+        """
+
+        serializer = WorldImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        file = serializer.validated_data['file']
+        file_format = serializer.validated_data.get('file_format')
+        if file_format is None:
+            file_format = 'csv' if file.name.lower().endswith('.csv') else 'json'
+        try:
+            world, count = import_world(
+                io.TextIOWrapper(file, encoding='utf-8', newline=''), owner=request.user, format=file_format,
+                is_public=serializer.validated_data['is_public'],
+            )
+        except OilAndRopeException as ex:
+            raise ValidationError(ex.message)
+        response_serializer = WorldImportResponseSerializer({'id': world.pk, 'name': world.name, 'places': count})
+        return Response(data=response_serializer.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        summary='Export place',
+        parameters=[
+            OpenApiParameter(
+                name='file_format', type=str, location=OpenApiParameter.QUERY, enum=FORMATS,
+                description='Format of the document, `json` by default.',
+            ),
+        ],
+        responses={(200, 'application/json'): OpenApiTypes.STR, (200, 'text/csv'): OpenApiTypes.STR},
+    )
+    @action(detail=True, methods=['get'], url_path='export')
+    def export_world(self, request: Request, *args, **kwargs) -> FileResponse:
+        """
+        Sends the place and every place inside it as a document that can be imported again.
+        """
+
+        place = self.get_object()
+        file_format = request.query_params.get('file_format', 'json')
+        if file_format not in FORMATS:
+            raise ValidationError({'file_format': [f'"{file_format}" is not a valid choice.']})
+        return FileResponse(
+            export_world_document(place, format=file_format), as_attachment=True,
+            filename=f'place-{place.pk}.{file_format}', content_type=CONTENT_TYPES[file_format],
+        )
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from django.contrib import admin
 
-from .models import Chat, ChatMessage
+from .models import Chat, ChatArchive, ChatMessage, ReadMarker, RollRecord
 
 
 @admin.register(Chat)
@@ -45,3 +45,70 @@ class ChatMessageAdmin(admin.ModelAdmin):
         'message',
         'author__username',
     )
+
+
+@admin.register(RollRecord)
+class RollRecordAdmin(admin.ModelAdmin):
+    date_hierarchy = 'entry_created_at'
+    list_display_links = (
+        'id',
+    )
+    list_display = (
+        'id',
+        'chat',
+        'author',
+        'expression',
+        'total',
+        'entry_created_at',
+    )
+    list_filter = (
+        'entry_created_at',
+        'chat',
+        'author'
+    )
+    search_fields = (
+        'expression',
+        'author__username',
+    )
+
+
+@admin.register(ReadMarker)
+class ReadMarkerAdmin(admin.ModelAdmin):
+    list_display_links = (
+        'id',
+    )
+    list_display = (
+        'id',
+        'chat',
+        'user',
+        'last_read_id',
+        'entry_updated_at',
+    )
+    list_filter = (
+        'chat',
+        'user',
+    )
+    search_fields = (
+        'user__username',
+    )
+
+
+@admin.register(ChatArchive)
+class ChatArchiveAdmin(admin.ModelAdmin):
+    date_hierarchy = 'last_message_at'
+    list_display_links = (
+        'id',
+    )
+    list_display = (
+        'id',
+        'chat',
+        'first_message_at',
+        'last_message_at',
+        'message_count',
+    )
+    list_filter = (
+        'chat',
+    )
+    exclude = (
+        'data',
+    )
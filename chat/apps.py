@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ChatConfig(AppConfig):
     name = 'chat'
     verbose_name = 'Chat'
+
+    def ready(self):
+        # Importing handlers to register signals
+        import chat.signals.handlers  # noqa
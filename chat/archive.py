@@ -0,0 +1,216 @@
+import gzip
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Q, QuerySet, Sum
+from django.utils.dateparse import parse_datetime
+
+from common.constants import models as constants
+
+
+def dump_messages(messages: Iterable) -> bytes:
+    """
+    Packs given messages as gzipped JSON lines.
+    """
+
+    lines = []
+    for message in messages:
+        lines.append(json.dumps({
+            'id': message.id,
+            'author_id': message.author_id,
+            'message': message.message,
+            'entry_created_at': message.entry_created_at.isoformat(),
+            'entry_updated_at': message.entry_updated_at.isoformat(),
+        }, separators=(',', ':')))
+    return gzip.compress('\n'.join(lines).encode())
+
+
+def load_messages(archive) -> list:
+    """
+    Unpacks the messages of given :class:`~chat.models.ChatArchive` as (unsaved) messages, oldest first.
+    """
+
+    ChatMessage = apps.get_model(constants.CHAT_MESSAGE)
+    messages = []
+    for line in gzip.decompress(bytes(archive.data)).decode().splitlines():
+        data = json.loads(line)
+        data['entry_created_at'] = parse_datetime(data['entry_created_at'])
+        data['entry_updated_at'] = parse_datetime(data['entry_updated_at'])
+        messages.append(ChatMessage(chat_id=archive.chat_id, **data))
+    return messages
+
+
+def archive_messages(before: datetime, batch_size: int, chats: Optional[QuerySet] = None) -> int:
+    """
+    Moves messages created before given date into :class:`~chat.models.ChatArchive` blobs of `batch_size` messages
+    at most, one blob per chat and batch. Returns the number of messages archived.
+
+    Parameters
+    ----------
+    before: :class:`datetime.datetime`
+        Messages older than this date are archived.
+    batch_size: :class:`int`
+        Maximum number of messages per archive.
+    chats: Optional[:class:`QuerySet`]
+        Chats to archive, all of them if not given.
+    """
+
+    Chat = apps.get_model(constants.CHAT)
+    ChatArchive = apps.get_model(constants.CHAT_ARCHIVE)
+    ChatMessage = apps.get_model(constants.CHAT_MESSAGE)
+
+    if chats is None:
+        chats = Chat.objects.all()
+    chat_ids = ChatMessage.objects.filter(
+        chat__in=chats, entry_created_at__lt=before,
+    ).order_by().values_list('chat_id', flat=True).distinct()
+
+    archived = 0
+    for chat_id in list(chat_ids):
+        while True:
+            with transaction.atomic():
+                messages = list(ChatMessage.objects.filter(
+                    chat_id=chat_id, entry_created_at__lt=before,
+                ).order_by('entry_created_at', 'id')[:batch_size])
+                if not messages:
+                    break
+                ChatArchive.objects.create(
+                    chat_id=chat_id,
+                    first_message_id=messages[0].id,
+                    first_message_at=messages[0].entry_created_at,
+                    last_message_id=messages[-1].id,
+                    last_message_at=messages[-1].entry_created_at,
+                    message_count=len(messages),
+                    data=dump_messages(messages),
+                )
+                ChatMessage.objects.filter(pk__in=[message.id for message in messages]).delete()
+            archived += len(messages)
+    return archived
+
+
+class ChatHistory:
+    """
+    Every message of a chat, newest first: messages still in :class:`~chat.models.ChatMessage` followed by archived
+    ones. Since only messages older than any other are archived, archives always go after the table.
+    It can be sliced and counted like a :class:`QuerySet`, so it can be given to `LimitOffsetPagination`, and it can
+    seek a position for `KeysetCursorPagination` or get a message by its identifier.
+
+    Parameters
+    ----------
+    queryset: :class:`QuerySet`
+        Messages of the chat.
+    chat_id: :class:`int`
+        Identifier of the chat.
+    """
+
+    def __init__(self, queryset: QuerySet, chat_id: int):
+        self.queryset = queryset.order_by('-entry_created_at', '-id')
+        self.chat_id = chat_id
+        self.model = queryset.model
+
+    @property
+    def archives(self) -> QuerySet:
+        ChatArchive = apps.get_model(constants.CHAT_ARCHIVE)
+        return ChatArchive.objects.filter(chat_id=self.chat_id).order_by('-last_message_at', '-last_message_id')
+
+    def count(self) -> int:
+        archived = self.archives.aggregate(total=Sum('message_count'))['total'] or 0
+        return self.queryset.count() + archived
+
+    def __getitem__(self, item: slice) -> list:
+        start, stop = item.start or 0, item.stop
+        messages = list(self.queryset[start:stop])
+        if stop is not None and len(messages) == stop - start:
+            return messages
+        # NOTE: Table is exhausted, the rest comes from archives skipping those before the requested offset
+        skip = max(start - self.queryset.count(), 0) if not messages else 0
+        size = None if stop is None else stop - start - len(messages)
+        return messages + self.read_archives(self.archives, skip, size)
+
+    def get(self, message_id: int):
+        """
+        Returns the message with given identifier, archived or not, or None if it's not a message of the chat.
+        """
+
+        message = self.queryset.filter(pk=message_id).first()
+        if message is not None:
+            return message
+        # NOTE: Identifiers grow along with creation dates, so only archives whose range has it are read
+        archives = self.archives.filter(first_message_id__lte=message_id, last_message_id__gte=message_id)
+        for archive in archives:
+            for message in load_messages(archive):
+                if message.id == message_id:
+                    self.load_authors([message])
+                    return message
+        return None
+
+    def seek(self, position: Optional[list], reverse: bool, size: int) -> list:
+        """
+        Returns up to `size` messages after given `(entry_created_at, id)` position, older ones unless `reverse`.
+        """
+
+        if reverse:
+            # NOTE: Newer messages go from archives to the table
+            archives = self.archives.reverse().filter(self.after(position, reverse, 'last_message'))
+            messages = self.read_archives(archives, 0, size, position, reverse)
+            queryset = self.queryset.reverse().filter(self.after(position, reverse))
+            return messages + list(queryset[:size - len(messages)])
+
+        queryset = self.queryset if position is None else self.queryset.filter(self.after(position, reverse))
+        messages = list(queryset[:size])
+        if len(messages) < size:
+            archives = self.archives
+            if position is not None:
+                archives = archives.filter(self.after(position, reverse, 'first_message'))
+            messages += self.read_archives(archives, 0, size - len(messages), position, reverse)
+        return messages
+
+    @staticmethod
+    def after(position: Optional[list], reverse: bool, prefix: Optional[str] = None) -> Q:
+        if position is None:
+            return Q()
+        created_at, identifier = ('entry_created_at', 'id') if not prefix else (f'{prefix}_at', f'{prefix}_id')
+        lookup = 'gt' if reverse else 'lt'
+        return Q(**{f'{created_at}__{lookup}': position[0]}) | Q(
+            **{created_at: position[0], f'{identifier}__{lookup}': position[1]}
+        )
+
+    def read_archives(self, archives: QuerySet, skip: int, size: Optional[int], position: Optional[list] = None,
+                      reverse: bool = False) -> list:
+        messages = []
+        for message in self.iter_archives(archives, skip, reverse):
+            if position is not None and not self.is_after(message, position, reverse):
+                continue
+            if size is not None and len(messages) >= size:
+                break
+            messages.append(message)
+        self.load_authors(messages)
+        return messages
+
+    def iter_archives(self, archives: QuerySet, skip: int, reverse: bool) -> Iterator:
+        for archive in archives.defer('data').iterator():
+            if skip >= archive.message_count:
+                skip -= archive.message_count
+                continue
+            # NOTE: Only archives actually read are loaded with their data
+            archive.refresh_from_db(fields=['data'])
+            messages = load_messages(archive)
+            if not reverse:
+                messages.reverse()
+            yield from messages[skip:]
+            skip = 0
+
+    @staticmethod
+    def is_after(message, position: list, reverse: bool) -> bool:
+        key = (message.entry_created_at, message.id)
+        return key > tuple(position) if reverse else key < tuple(position)
+
+    def load_authors(self, messages: list):
+        User = apps.get_model(constants.REGISTRATION_USER)
+        authors = User.objects.in_bulk({message.author_id for message in messages})
+        for message in messages:
+            # NOTE: Archives outlive their authors, deleted ones are cached as missing instead of being read again
+            message._meta.get_field('author').set_cached_value(message, authors.get(message.author_id))
@@ -9,6 +9,7 @@ fake = create_faker()
 
 Chat = apps.get_model(models.CHAT)
 ChatMessage = apps.get_model(models.CHAT_MESSAGE)
+RollRecord = apps.get_model(models.CHAT_ROLL_RECORD)
 
 chat = Recipe(
     Chat,
@@ -21,3 +22,12 @@ message = Recipe(
     message=fake.sentence,
     author=foreign_key(user),
 )
+
+roll_record = Recipe(
+    RollRecord,
+    chat=foreign_key(chat),
+    author=foreign_key(user),
+    expression='1d20',
+    total=20,
+    results=lambda: {'1d20': [20]},
+)
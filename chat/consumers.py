@@ -1,116 +1,538 @@
+import asyncio
+import atexit
 import logging
-from typing import Any
+from operator import itemgetter
+from typing import Any, Optional, Union
 
+from asgiref.sync import async_to_sync
 from channels.db import database_sync_to_async
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
-from api.serializers.chat import ChatMessageSerializer, WebSocketChatSerializer
-from chat.models import ChatMessage
+from api.serializers.chat import ChatMessageSerializer
+from chat.models import Chat, ChatMessage, RollRecord
+from chat.protocols import WireProtocol, negotiate_protocol, reference_author, shorten
+from chat.schemas import WebSocketChatSchema
+from chat.state import ChatState, get_chat_state
+from chat.utils import (get_chat_group_name, get_members_group_name, get_node_group_name, get_user_group_name,
+                        load_resume_token, make_resume_token)
 from common.enums import WebSocketCloseCodes
-from core.consumers import HandlerJsonWebsocketConsumer, TokenAuthenticationMixin
+from common.tools.sync import WriteBehindBuffer
+from core.consumers import BatchSendMixin, HandlerJsonWebsocketConsumer, TokenAuthenticationMixin
 from core.exceptions import OilAndRopeException
+from core.throttling import TokenBucket, get_token_buckets, parse_rate
 from registration.models import User
-from roleplay.utils.dice import roll_dice
+from registration.utils import bot_identity
+from roleplay.utils.dice import CounterRandom, normalize_roll, roll_dice
 
 LOGGER = logging.getLogger(__name__)
 
+# NOTE: Shared by every connection of the process so rolls and their answers are inserted in batches
+ROLL_RECORD_BUFFER = WriteBehindBuffer(
+    RollRecord, max_size=settings.ROLL_RECORD_BUFFER_SIZE, max_latency=settings.ROLL_RECORD_BUFFER_LATENCY,
+)
+ROLL_MESSAGE_BUFFER = WriteBehindBuffer(
+    ChatMessage, max_size=settings.ROLL_RECORD_BUFFER_SIZE, max_latency=settings.ROLL_RECORD_BUFFER_LATENCY,
+)
 
-class ChatConsumer(TokenAuthenticationMixin, HandlerJsonWebsocketConsumer):
+
+async def flush_roll_buffers():
+    await ROLL_MESSAGE_BUFFER.flush()
+    await ROLL_RECORD_BUFFER.flush()
+
+
+@atexit.register
+def flush_roll_buffers_on_exit():
+    # NOTE: Rolls still waiting when the process stops are written before leaving
+    if len(ROLL_MESSAGE_BUFFER) or len(ROLL_RECORD_BUFFER):
+        async_to_sync(flush_roll_buffers)()
+
+
+class ChatConsumer(TokenAuthenticationMixin, BatchSendMixin, HandlerJsonWebsocketConsumer):
+    batch_max_latency = settings.CHAT_BATCH_MAX_LATENCY
+    batch_max_size = settings.CHAT_BATCH_MAX_SIZE
     chat_group_name = None
-    serializer_class = WebSocketChatSerializer
+    chat_id = None
+    schema_class = WebSocketChatSchema
+    handler_types = ('setup_channel_layer', 'make_roll', 'send_message', 'typing')
+    throttled_types = ('make_roll', 'send_message')
+    throttle_bucket = None
     user = None
+    chats = None
+    dice_streams = None
+    protocol = WireProtocol()
+    authors = None
+    last_message_id = None
+    roll_announcement = None
 
     async def connect(self):
-        return await super().connect()
+        # NOTE: Draining nodes reject connections, so clients connect to another node
+        if await self.state.is_draining(settings.CHAT_NODE_NAME):
+            return await self.close(code=WebSocketCloseCodes.TRY_AGAIN_LATER.value)
+        # NOTE: Counters of the dice stream are reserved in blocks per connection to avoid a write per roll
+        self.dice_streams = {}
+        # NOTE: Authors already sent to clients speaking a compact protocol, which get just their identifier afterwards
+        self.authors = set()
+        await self.channel_layer.group_add(get_node_group_name(settings.CHAT_NODE_NAME), self.channel_name)
+        protocol = negotiate_protocol(self.scope.get('subprotocols', []))
+        if protocol is None:
+            return await self.accept()
+        self.protocol = protocol
+        return await self.accept(subprotocol=protocol.name)
 
     async def disconnect(self, code):
         if self.chat_group_name:
-            await self.channel_layer.group_discard(self.chat_group_name, self.channel_name)
+            await self.leave_chat_group()
+        if self.chats is not None:
+            await self.channel_layer.group_discard(get_user_group_name(self.user.pk), self.channel_name)
+            for chat_id in self.chats:
+                await self.channel_layer.group_discard(get_members_group_name(chat_id), self.channel_name)
+        await self.channel_layer.group_discard(get_node_group_name(settings.CHAT_NODE_NAME), self.channel_name)
         await super().disconnect(code)
 
-    async def receive(self, text_data=None, bytes_data=None, **kwargs):
-        await self.authenticate(text_data)
-        self.user: User = self.scope['user']
+    async def authenticate(self, content: dict) -> Optional[User]:
+        # NOTE: Clients moved from a draining node can resume with the token given by it
+        resume = load_resume_token(content.get('resume_token'))
+        if resume is None:
+            return await super().authenticate(content)
+        user = await User.objects.filter(pk=resume['user']).afirst()
+        if user:
+            await self.login_user(user)
+        return user
+
+    async def receive_json(self, content, **kwargs):
+        # NOTE: Users are authenticated just once per connection
+        if self.user is None or not self.user.is_authenticated:
+            await self.authenticate(content)
+            self.user: User = self.scope['user']
         if not self.user.is_authenticated:
             msg = _('user not authenticated.').capitalize()
-            await super().send_json({
+            await self.send_json({
                 'type': 'info',
                 'content': {'message': msg},
             })
-            return await super().close(code=WebSocketCloseCodes.UNAUTHORIZED.value)
-        return await super().receive(text_data, bytes_data, **kwargs)
+            return await self.close(code=WebSocketCloseCodes.UNAUTHORIZED.value)
+        if content.get('type') != 'setup_channel_layer' and content.get('chat') not in (self.chats or ()):
+            return await self.send_json({
+                'type': 'error',
+                'content': {'message': _('you are not a member of this chat.').capitalize()},
+            })
+        if content.get('type') in self.throttled_types:
+            wait = await self.throttle(content['chat'])
+            if wait:
+                # NOTE: Clients are told to slow down instead of being disconnected
+                return await self.send_json({
+                    'type': 'slow_down',
+                    'content': {
+                        'message': _('you are sending messages too fast, slow down.').capitalize(),
+                        'retry_after': round(wait, 3),
+                    },
+                })
+        return await super().receive_json(content, **kwargs)
+
+    def get_throttle_rate(self, scope: str) -> Optional[tuple[int, float]]:
+        rates = settings.CHAT_THROTTLE_RATES
+        if self.user.is_premium and f'{scope}_premium' in rates:
+            return parse_rate(rates[f'{scope}_premium'])
+        return parse_rate(rates.get(scope))
+
+    async def throttle(self, chat_id: int) -> float:
+        """
+        Takes a token from the bucket of this connection and from the bucket of the chat (shared by every connection),
+        returning the seconds to wait if any of them is empty.
+        """
+
+        if self.throttle_bucket is None:
+            rate = self.get_throttle_rate('connection')
+            self.throttle_bucket = TokenBucket(*rate) if rate else False
+        if self.throttle_bucket:
+            wait = self.throttle_bucket.consume()
+            if wait:
+                return wait
+        rate = self.get_throttle_rate('chat')
+        if rate is None:
+            return 0
+        return await get_token_buckets(self.channel_layer).consume(f'chat:{chat_id}', *rate)
+
+    async def decode_json(self, data: Union[str, bytes]):
+        if isinstance(data, bytes) and self.protocol.binary:
+            return self.protocol.decode(data)
+        return await super().decode_json(data)
+
+    async def send_json(self, content, close=False):
+        if not self.protocol.compact:
+            return await super().send_json(content, close)
+        return await self.send_encoded(self.protocol.encode(shorten(content)), close)
+
+    async def send_encoded(self, data: Union[str, bytes], close=False):
+        if isinstance(data, bytes):
+            return await self.send(bytes_data=data, close=close)
+        return await self.send(text_data=data, close=close)
+
+    def encode_batch(self, events: list):
+        return self.protocol.encode_batch(events)
+
+    @property
+    def state(self) -> ChatState:
+        return get_chat_state(self.channel_layer)
 
     @database_sync_to_async
-    def register_message(self, author_id: int, chat_id: int, message: str) -> ChatMessage:
-        return ChatMessage.objects.create(
-            author_id=author_id,
-            chat_id=chat_id,
-            message=message,
-        )
+    def get_chats(self) -> set[int]:
+        return set(self.user.chat_set.values_list('pk', flat=True))
+
+    @database_sync_to_async
+    def get_chat_members(self, chat_id: int) -> set[int]:
+        return set(Chat.users.through.objects.filter(chat_id=chat_id).values_list('user_id', flat=True))
+
+    async def get_members(self, chat_id: int) -> set[int]:
+        """
+        Returns the members of the chat, loading them from the database just the first time.
+        """
+
+        members = await self.state.get_members(chat_id)
+        if members is None:
+            members = await self.get_chat_members(chat_id)
+            await self.state.load_members(chat_id, members)
+        return members
+
+    @database_sync_to_async
+    def get_unread_counts(self) -> dict[int, int]:
+        return dict(Chat.objects.filter(pk__in=self.chats).with_summary(self.user).values_list('pk', 'unread_count'))
+
+    async def get_unread(self) -> dict[int, int]:
+        """
+        Returns the unread counters of the user, loading them from the database just the first time.
+        """
+
+        counts = await self.state.get_unread(self.user.pk)
+        if counts is None:
+            counts = await self.get_unread_counts()
+            await self.state.load_unread(self.user.pk, counts)
+        return {chat_id: counts.get(chat_id, 0) for chat_id in self.chats}
+
+    def get_dice_random(self, chat_id: int) -> CounterRandom:
+        """
+        Returns the random generator for the next roll in given chat.
+        """
+
+        chat, counters = self.dice_streams.get(chat_id, (None, iter(())))
+        counter = next(counters, None)
+        if counter is None:
+            chat = Chat.objects.only('id', 'dice_seed').get(pk=chat_id)
+            counters = iter(chat.reserve_dice_counters(settings.DICE_COUNTER_BLOCK_SIZE))
+            counter = next(counters)
+            self.dice_streams[chat_id] = (chat, counters)
+        return chat.get_dice_random(counter)
 
     @database_sync_to_async
-    def register_roll_message(self, chat_id: int, message: str) -> tuple[ChatMessage, dict]:
-        bot = User.objects.get(email=settings.DEFAULT_FROM_EMAIL)
+    def get_roll_message(self, chat_id: int, message: str) -> tuple[ChatMessage, Any, dict, Optional[int]]:
+        """
+        Rolls the dice in given chat and returns the answer of the bot (not stored yet) along with the result, the dice
+        rolled and the counter of the dice stream used.
+        """
+
+        rng = self.get_dice_random(chat_id)
         try:
-            result, roll = roll_dice(message)
+            result, roll = roll_dice(message, rng)
+            counter = rng.counter
         except OilAndRopeException as ex:
             # NOTE: If roll fails, we send message to chat with error message
             result = ex.message
             roll = {}
-        finally:
-            message = result
-            return ChatMessage.objects.create(
-                author_id=bot.id,
-                chat_id=chat_id,
-                message=result,
-            ), dict(roll)
+            counter = None
+        message = ChatMessage(author_id=bot_identity.id, chat_id=chat_id, message=result)
+        # NOTE: Bot is already in memory, so the answer is rendered without reading it again
+        message.author = bot_identity.user
+        return message, result, dict(roll), counter
 
-    @database_sync_to_async
-    def get_serialized_message(self, message: ChatMessage) -> dict:
-        serialized_message = ChatMessageSerializer(message)
-        return serialized_message.data
+    async def register_message(self, chat_id: int, message: str) -> dict:
+        """
+        Stores a message of the user in given chat and returns it serialized.
+        Since the author is the user of this connection, the message is rendered without touching the database again.
+        """
+
+        message = await ChatMessage.objects.acreate(author=self.user, chat_id=chat_id, message=message)
+        return ChatMessageSerializer(message).data
+
+    async def broadcast(self, content: dict[str, Any], group_name: Optional[str] = None):
+        """
+        Sends given content to every connection of the chat, encoding it just once for all of them.
+        The compact version (with the author referenced by its identifier) is given too for compact protocols.
+        """
+
+        compact, author = reference_author(content)
+        return await self.channel_layer.group_send(
+            group_name or self.chat_group_name,
+            {
+                'type': 'group_send_text',
+                'text': await self.encode_json(content),
+                'compact': shorten(compact),
+                'author': author,
+                'message_id': content['content'].get('id') if content['type'] == 'group_send_message' else None,
+            },
+        )
 
     async def setup_channel_layer(self, content):
         chat_id = content['chat']
-        self.chat_group_name = f'chat_{chat_id}'
-        await self.channel_layer.group_add(self.chat_group_name, self.channel_name)
+        if content.get('batch') is not None:
+            # NOTE: Clients opt in to get events of the chat coalesced in batch frames
+            self.batching = content['batch']
+        if self.chats is None:
+            self.chats = await self.get_chats()
+            # NOTE: Memberships are kept up to date by `chat_membership_changed` events
+            await self.channel_layer.group_add(get_user_group_name(self.user.pk), self.channel_name)
+            for member_chat_id in self.chats:
+                await self.channel_layer.group_add(get_members_group_name(member_chat_id), self.channel_name)
+        if chat_id not in self.chats:
+            await self.send_json({
+                'type': 'error',
+                'content': {'message': _('you are not a member of this chat.').capitalize()},
+            })
+            return await self.close(code=WebSocketCloseCodes.POLICY_VIOLATION.value)
 
-        return await self.send_json({
+        if self.chat_group_name:
+            await self.leave_chat_group()
+        await self.join_chat_group(chat_id)
+
+        await self.send_json({
             'type': 'info',
-            'content': {'message': 'Chat connected!'},
+            'content': {
+                'message': 'Chat connected!',
+                # NOTE: From now on clients get deltas of these, so they don't need to poll them
+                'present': await self.state.get_present(chat_id),
+                'unread': await self.get_unread(),
+            },
         })
+        last_seen_id = content.get('last_seen_id')
+        resume = load_resume_token(content.get('resume_token'))
+        if last_seen_id is None and resume is not None and resume['chat'] == chat_id:
+            last_seen_id = resume['last_seen_id']
+        if last_seen_id is not None:
+            # NOTE: Group is joined before replaying, so messages sent meanwhile may come twice but are never lost
+            messages, complete = await self.get_missed_messages(chat_id, last_seen_id)
+            return await self.send_replay(chat_id, messages, complete)
 
-    async def make_roll(self, content):
-        chat_id = content['chat']
-        msg_text = content['message']
-        message, roll = await self.register_roll_message(chat_id, msg_text)
-        serialized_message = await self.get_serialized_message(message)
+    async def get_missed_messages(self, chat_id: int, last_seen_id: int) -> tuple[list[dict], bool]:
+        """
+        Returns the messages of the chat after given one (oldest first) and whether those are all of them.
+        Recent messages kept by the chat state are used if they go back far enough, else they're read from the database.
+        """
+
+        recent = await self.state.get_recent_messages(chat_id)
+        if recent and min(message['id'] for message in recent) <= last_seen_id:
+            missed = [message for message in recent if message['id'] > last_seen_id]
+            return sorted(missed, key=itemgetter('id')), True
+        return await self.load_missed_messages(chat_id, last_seen_id)
+
+    @database_sync_to_async
+    def load_missed_messages(self, chat_id: int, last_seen_id: int) -> tuple[list[dict], bool]:
+        limit = settings.CHAT_REPLAY_MAX_MESSAGES
+        queryset = ChatMessage.objects.filter(chat_id=chat_id, pk__gt=last_seen_id).select_related('author')
+        messages = list(queryset.order_by('pk')[:limit + 1])
+        return ChatMessageSerializer(messages[:limit], many=True).data, len(messages) <= limit
+
+    async def send_replay(self, chat_id: int, messages: list[dict], complete: bool):
+        """
+        Sends given messages in a single frame. If not `complete`, the client should get the rest from the API.
+        """
+
+        if messages:
+            self.last_message_id = max(self.last_message_id or 0, messages[-1]['id'])
+        if self.protocol.compact:
+            for author in {message['author']['id']: message['author'] for message in messages}.values():
+                if author['id'] not in self.authors:
+                    self.authors.add(author['id'])
+                    await self.send_event({'type': 'author', 'content': author})
+            messages = [{**message, 'author': message['author']['id']} for message in messages]
+        return await self.send_json({
+            'type': 'replay',
+            'content': {
+                'chat': chat_id,
+                'messages': messages,
+                'complete': complete,
+            },
+        })
 
+    async def join_chat_group(self, chat_id: int):
+        self.chat_id, self.chat_group_name = chat_id, get_chat_group_name(chat_id)
+        await self.channel_layer.group_add(self.chat_group_name, self.channel_name)
+        # NOTE: Only the first connection of the user to the chat changes its presence
+        if await self.state.join(chat_id, self.user.pk) == 1:
+            await self.notify_presence(chat_id, online=True)
+
+    async def leave_chat_group(self):
+        chat_id = self.chat_id
+        await self.channel_layer.group_discard(self.chat_group_name, self.channel_name)
+        self.chat_id, self.chat_group_name = None, None
+        if await self.state.leave(chat_id, self.user.pk) <= 0:
+            await self.notify_presence(chat_id, online=False)
+
+    async def notify_presence(self, chat_id: int, online: bool):
         return await self.channel_layer.group_send(
-            self.chat_group_name,
+            get_chat_group_name(chat_id),
+            {
+                'type': 'chat_presence_changed',
+                'chat': chat_id,
+                'user': self.user.pk,
+                'online': online,
+            },
+        )
+
+    async def notify_unread(self, chat_id: int):
+        """
+        Adds the last message of the user to the unread counters of the rest of members of given chat.
+        Members get a single event with the change, which clients add to the counters they have.
+        """
+
+        members = await self.get_members(chat_id)
+        await self.state.increment_unread(chat_id, members - {self.user.pk})
+        await self.channel_layer.group_send(
+            get_members_group_name(chat_id),
             {
-                'type': 'group_send_message',
-                'status': 'ok',
-                'content': serialized_message,
-                'roll': roll,
+                'type': 'chat_unread_changed',
+                'chat': chat_id,
+                'user': self.user.pk,
+                'delta': 1,
             },
         )
 
+    async def make_roll(self, content):
+        chat_id = content['chat']
+        msg_text = content['message']
+        message, result, roll, counter = await self.get_roll_message(chat_id, msg_text)
+        if counter is not None:
+            await ROLL_RECORD_BUFFER.add(RollRecord(
+                chat_id=chat_id,
+                author_id=self.user.id,
+                expression=normalize_roll(msg_text),
+                total=result,
+                results=roll,
+                counter=counter,
+            ))
+        # NOTE: Answer is sent once it's written along with other answers, so it has its identifier in the history
+        written = await ROLL_MESSAGE_BUFFER.add(message)
+        self.roll_announcement = asyncio.ensure_future(
+            self.announce_roll(written, roll, counter, previous=self.roll_announcement),
+        )
+
+    async def announce_roll(self, written: asyncio.Future, roll: dict, counter: Optional[int],
+                            previous: Optional[asyncio.Future] = None):
+        """
+        Sends the answer of a roll to the chat as soon as it's written, after the previous rolls of this connection.
+        """
+
+        if previous is not None:
+            await asyncio.wait([previous])
+        message = await written
+        if message is None:
+            return
+        serialized_message = ChatMessageSerializer(message).data
+        await self.broadcast({
+            'type': 'group_send_message',
+            'status': 'ok',
+            'content': serialized_message,
+            'roll': roll,
+            # NOTE: Along with the chat seed (kept secret) this counter allows replaying the roll
+            'counter': counter,
+        }, group_name=get_chat_group_name(message.chat_id))
+        await self.state.remember_message(message.chat_id, serialized_message)
+        return await self.notify_unread(message.chat_id)
+
     async def send_message(self, content: dict[str, Any]):
         chat_id = content['chat']
         msg_text = content['message']
 
-        message = await self.register_message(self.user.id, chat_id, msg_text)
-        serialized_message = await self.get_serialized_message(message)
+        serialized_message = await self.register_message(chat_id, msg_text)
+
+        await self.broadcast({
+            'type': 'group_send_message',
+            'content': serialized_message,
+        })
+        await self.state.remember_message(chat_id, serialized_message)
+        return await self.notify_unread(chat_id)
 
+    async def typing(self, content: dict[str, Any]):
+        # NOTE: Typing indicators are just forwarded, they're never stored
         return await self.channel_layer.group_send(
-            self.chat_group_name,
+            get_chat_group_name(content['chat']),
             {
-                'type': 'group_send_message',
-                'content': serialized_message,
+                'type': 'chat_typing',
+                'chat': content['chat'],
+                'user': self.user.pk,
+                'typing': content.get('typing') is not False,
             },
         )
 
-    async def group_send_message(self, content):
-        return await self.send_json(content)
+    async def group_send_text(self, content):
+        if content.get('message_id'):
+            self.last_message_id = max(self.last_message_id or 0, content['message_id'])
+        if not self.protocol.compact:
+            # NOTE: Text is already encoded by the sender, so it's forwarded as it is
+            return await self.send_batched(content['text'])
+        author = content.get('author')
+        if author is not None and author['id'] not in self.authors:
+            self.authors.add(author['id'])
+            await self.send_event({'type': 'author', 'content': author})
+        return await self.send_batched(self.protocol.encode(content['compact']))
+
+    async def send_event(self, content: dict[str, Any]):
+        if self.protocol.compact:
+            return await self.send_batched(self.protocol.encode(shorten(content)))
+        return await self.send_batched(await self.encode_json(content))
+
+    async def chat_drain(self, content):
+        """
+        Moves this connection to another node, giving the client a token to resume its chat from its last message.
+        """
+
+        await flush_roll_buffers()
+        resume_token = None
+        if self.chat_id is not None:
+            resume_token = make_resume_token(self.user.pk, self.chat_id, self.last_message_id)
+        await self.send_json({
+            'type': 'reconnect',
+            'content': {
+                'message': _('server is restarting, reconnecting.').capitalize(),
+                'resume_token': resume_token,
+            },
+        })
+        return await self.close(code=WebSocketCloseCodes.SERVICE_RESTART.value)
+
+    async def chat_membership_changed(self, content):
+        chats = set(content['chats'])
+        if content['action'] == 'add':
+            self.chats |= chats
+            for chat_id in chats:
+                await self.channel_layer.group_add(get_members_group_name(chat_id), self.channel_name)
+            return
+        self.chats -= chats
+        for chat_id in chats:
+            await self.channel_layer.group_discard(get_members_group_name(chat_id), self.channel_name)
+        if self.chat_group_name in {get_chat_group_name(chat_id) for chat_id in chats}:
+            await self.leave_chat_group()
+
+    async def chat_presence_changed(self, content):
+        if content['user'] == self.user.pk:
+            return
+        return await self.send_event({
+            'type': 'presence',
+            'content': {key: content[key] for key in ('chat', 'user', 'online')},
+        })
+
+    async def chat_typing(self, content):
+        if content['user'] == self.user.pk:
+            return
+        return await self.send_event({
+            'type': 'typing',
+            'content': {key: content[key] for key in ('chat', 'user', 'typing')},
+        })
+
+    async def chat_unread_changed(self, content):
+        # NOTE: Authors don't get their own messages as unread
+        if content.get('user') == self.user.pk:
+            return
+        # NOTE: Counters or changes not known are left out, so clients keep theirs
+        return await self.send_event({
+            'type': 'unread',
+            'content': {key: content[key] for key in ('chat', 'count', 'delta') if content.get(key) is not None},
+        })
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from chat.archive import archive_messages
+from chat.models import Chat
+
+
+class Command(BaseCommand):
+    help = 'Moves old chat messages into compressed archives to keep the messages table small.'
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument(
+            '--days',
+            help='Messages older than given days are archived.',
+            type=int,
+            default=settings.CHAT_ARCHIVE_AFTER_DAYS,
+        )
+        parser.add_argument(
+            '--batch-size',
+            help='Maximum number of messages per archive.',
+            type=int,
+            default=settings.CHAT_ARCHIVE_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--chat',
+            help='Chat to archive, all of them if not given.',
+            nargs='?',
+            action='append',
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        chats = Chat.objects.filter(pk__in=options['chat']) if options['chat'] else None
+        archived = archive_messages(before, options['batch_size'], chats)
+        self.stdout.write(self.style.SUCCESS(f'{archived} messages archived.'))
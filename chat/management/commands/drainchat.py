@@ -0,0 +1,34 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+from chat.state import drain_node, get_chat_state
+
+
+class Command(BaseCommand):
+    help = (
+        'Moves the chat connections of an ASGI node to other nodes before restarting it. '
+        'Clients are given a token to resume their chat and the node rejects connections for `CHAT_DRAIN_EXPIRY` '
+        'seconds or until called again with `--cancel`.'
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument(
+            '--node',
+            help='Name of the node to drain, this one if not given.',
+            default=settings.CHAT_NODE_NAME,
+        )
+        parser.add_argument(
+            '--cancel',
+            help='Lets the node accept connections again.',
+            action='store_true',
+        )
+
+    def handle(self, *args, **options):
+        node = options['node']
+        if options['cancel']:
+            async_to_sync(get_chat_state(get_channel_layer()).set_draining)(node, False)
+            return self.stdout.write(self.style.SUCCESS(f'Node {node} accepts connections.'))
+        async_to_sync(drain_node)(node)
+        self.stdout.write(self.style.SUCCESS(f'Node {node} drained.'))
@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from channels.auth import AuthMiddlewareStack
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from chat.consumers import ChatConsumer
+from chat.models import Chat
+from chat.utils import get_chat_group_name
+from registration.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures how long it takes for chat events to reach a growing number of connections through the channel '
+        'layer. Time per frame should stay flat as connections grow (linear fan-out). Run it from several nodes at '
+        'once against the Redis channel layer to measure fan-out across nodes.'
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument('chat', help='Identifier of the chat.', type=int)
+        parser.add_argument('username', help='User connected, must be member of the chat.')
+        parser.add_argument(
+            '--connections',
+            help='Number of connections of every round.',
+            nargs='+',
+            type=int,
+            default=[10, 100, 500],
+        )
+        parser.add_argument(
+            '--messages',
+            help='Events sent in every round.',
+            type=int,
+            default=20,
+        )
+
+    def handle(self, *args, **options):
+        try:
+            chat = Chat.objects.get(pk=options['chat'], users__username=options['username'])
+        except Chat.DoesNotExist:
+            raise CommandError('Given user is not member of given chat.')
+        user = User.objects.get(username=options['username'])
+        for connections in options['connections']:
+            elapsed = async_to_sync(self.run_round)(chat, user, connections, options['messages'])
+            frames = connections * options['messages']
+            self.stdout.write(
+                f'{connections} connections: {frames} frames in {elapsed:.3f}s '
+                f'({elapsed / frames * 1_000_000:.1f} µs per frame).'
+            )
+
+    async def connect(self, chat: Chat, user: User) -> WebsocketCommunicator:
+        consumer = WebsocketCommunicator(AuthMiddlewareStack(ChatConsumer.as_asgi()), '/ws/chat/')
+        consumer.scope['user'] = user
+        await consumer.connect()
+        await consumer.send_json_to({'type': 'setup_channel_layer', 'chat': chat.pk})
+        await consumer.receive_from()
+        return consumer
+
+    async def run_round(self, chat: Chat, user: User, connections: int, messages: int) -> float:
+        """
+        Connects the given number of clients and returns the seconds until every one of them got every event.
+        """
+
+        consumers = [await self.connect(chat, user) for _ in range(connections)]
+        channel_layer = get_channel_layer()
+        # NOTE: Events are sent straight to the group, so just the fan-out is measured (no database writes)
+        event = {
+            'type': 'group_send_text',
+            'text': '{"type":"group_send_message","content":{"message":"Load test"}}',
+            'compact': {'t': 'group_send_message', 'c': {'m': 'Load test'}},
+            'author': None,
+            'message_id': None,
+        }
+        start = time.perf_counter()
+        for _ in range(messages):
+            await channel_layer.group_send(get_chat_group_name(chat.pk), event)
+        await asyncio.gather(*(self.receive(consumer, messages) for consumer in consumers))
+        elapsed = time.perf_counter() - start
+        for consumer in consumers:
+            await consumer.disconnect()
+        return elapsed
+
+    @staticmethod
+    async def receive(consumer: WebsocketCommunicator, messages: int):
+        for _ in range(messages):
+            await consumer.receive_from(timeout=30)
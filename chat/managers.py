@@ -0,0 +1,61 @@
+from django.apps import apps
+from django.db import models
+from django.db.models.functions import Coalesce
+
+from common.constants.models import CHAT_ARCHIVE, CHAT_MESSAGE, CHAT_READ_MARKER
+
+
+class ChatQuerySet(models.QuerySet):
+    """
+    Specific manager for :class:`~chat.models.Chat`.
+    """
+
+    def with_summary(self, user):
+        """
+        Return chats with a summary of their messages annotated, without loading any of them.
+        The new :class:`~django.db.models.QuerySet` will have the following fields:
+        `message_count` (archived ones included), `unread_count` (messages from others after the last one read by
+        given user) and
+        `last_message_id`, `last_message_message`, `last_message_author`, `last_message_entry_created_at`.
+        If every message is archived, the last message is the newest archived one, whose `last_message_message` and
+        `last_message_author` are left empty since they're only kept by its archive.
+        """
+
+        ChatArchive = apps.get_model(CHAT_ARCHIVE)
+        ChatMessage = apps.get_model(CHAT_MESSAGE)
+        ReadMarker = apps.get_model(CHAT_READ_MARKER)
+
+        messages = ChatMessage.objects.filter(chat=models.OuterRef('pk')).order_by()
+        last_read_id = ReadMarker.objects.filter(chat=models.OuterRef(models.OuterRef('pk')), user=user)
+        unread_messages = messages.filter(
+            pk__gt=Coalesce(models.Subquery(last_read_id.values('last_read_id')[:1]), 0),
+        ).exclude(author=user)
+        last_message = messages.order_by('-entry_created_at', '-id')[:1]
+        archives = ChatArchive.objects.filter(chat=models.OuterRef('pk'))
+        archived = archives.order_by().values('chat').annotate(total=models.Sum('message_count')).values('total')
+        last_archived = archives.order_by('-last_message_at', '-last_message_id')[:1]
+
+        return self.annotate(
+            message_count=self._count(messages) + Coalesce(
+                models.Subquery(archived, output_field=models.IntegerField()), 0,
+            ),
+            unread_count=self._count(unread_messages),
+            last_message_id=Coalesce(
+                models.Subquery(last_message.values('id')), models.Subquery(last_archived.values('last_message_id')),
+                output_field=models.BigIntegerField(),
+            ),
+            last_message_message=models.Subquery(last_message.values('message')),
+            last_message_author=models.Subquery(last_message.values('author')),
+            last_message_entry_created_at=Coalesce(
+                models.Subquery(last_message.values('entry_created_at')),
+                models.Subquery(last_archived.values('last_message_at')),
+            ),
+        )
+
+    @staticmethod
+    def _count(queryset):
+        counter = queryset.values('chat').annotate(count=models.Count('pk')).values('count')
+        return Coalesce(models.Subquery(counter, output_field=models.IntegerField()), 0)
+
+
+ChatManager = models.Manager.from_queryset(ChatQuerySet)
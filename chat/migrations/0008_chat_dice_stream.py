@@ -0,0 +1,36 @@
+# Generated by Django 4.1.2 on 2026-10-17 12:28
+
+from django.db import migrations, models
+
+import roleplay.utils.dice
+from common.constants import models as constants
+
+
+def generate_dice_seeds(apps, schema_editor):
+    # NOTE: Callable defaults are evaluated just once for existing rows, so every chat gets its own seed here
+    Chat = apps.get_model(constants.CHAT)
+    chats = list(Chat.objects.only('id'))
+    for chat in chats:
+        chat.dice_seed = roleplay.utils.dice.generate_seed()
+    Chat.objects.bulk_update(chats, fields=['dice_seed'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0007_alter_chat_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='dice_counter',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='dice counter'),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='dice_seed',
+            field=models.CharField(default=roleplay.utils.dice.generate_seed, editable=False, max_length=64, verbose_name='dice seed'),
+        ),
+        migrations.RunPython(code=generate_dice_seeds, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.1.2 on 2026-10-17 12:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('chat', '0008_chat_dice_stream'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollRecord',
+            fields=[
+                ('entry_created_at', models.DateTimeField(auto_now_add=True, verbose_name='entry created at')),
+                ('entry_updated_at', models.DateTimeField(auto_now=True, verbose_name='entry updated at')),
+                ('id', models.BigAutoField(primary_key=True, serialize=False, verbose_name='identifier')),
+                ('expression', models.CharField(max_length=254, verbose_name='expression')),
+                ('total', models.IntegerField(verbose_name='total')),
+                ('results', models.JSONField(default=dict, verbose_name='results')),
+                ('counter', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='counter')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roll_record_set', to=settings.AUTH_USER_MODEL, verbose_name='author')),
+                ('chat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roll_record_set', to='chat.chat', verbose_name='chat')),
+            ],
+            options={
+                'verbose_name': 'roll',
+                'verbose_name_plural': 'rolls',
+            },
+        ),
+    ]
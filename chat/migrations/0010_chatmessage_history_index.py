@@ -0,0 +1,17 @@
+# Generated by Django 4.1.2 on 2026-10-17 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0009_rollrecord'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['chat', '-entry_created_at', '-id'], name='chat_chatme_chat_id_f94886_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.1.2 on 2026-10-17 13:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('chat', '0010_chatmessage_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadMarker',
+            fields=[
+                ('entry_created_at', models.DateTimeField(auto_now_add=True, verbose_name='entry created at')),
+                ('entry_updated_at', models.DateTimeField(auto_now=True, verbose_name='entry updated at')),
+                ('id', models.BigAutoField(primary_key=True, serialize=False, verbose_name='identifier')),
+                ('last_read_id', models.PositiveBigIntegerField(default=0, verbose_name='last message read')),
+                ('chat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_marker_set', to='chat.chat', verbose_name='chat')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_marker_set', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'read marker',
+                'verbose_name_plural': 'read markers',
+                'unique_together': {('chat', 'user')},
+            },
+        ),
+    ]
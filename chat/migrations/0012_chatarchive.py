@@ -0,0 +1,37 @@
+# Generated by Django 4.1.2 on 2026-10-17 13:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0011_readmarker'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatArchive',
+            fields=[
+                ('entry_created_at', models.DateTimeField(auto_now_add=True, verbose_name='entry created at')),
+                ('entry_updated_at', models.DateTimeField(auto_now=True, verbose_name='entry updated at')),
+                ('id', models.BigAutoField(primary_key=True, serialize=False, verbose_name='identifier')),
+                ('first_message_id', models.PositiveBigIntegerField(verbose_name='first message')),
+                ('first_message_at', models.DateTimeField(verbose_name='first message date')),
+                ('last_message_id', models.PositiveBigIntegerField(verbose_name='last message')),
+                ('last_message_at', models.DateTimeField(verbose_name='last message date')),
+                ('message_count', models.PositiveIntegerField(verbose_name='number of messages')),
+                ('data', models.BinaryField(verbose_name='data')),
+                ('chat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_set', to='chat.chat', verbose_name='chat')),
+            ],
+            options={
+                'verbose_name': 'message archive',
+                'verbose_name_plural': 'message archives',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='chatarchive',
+            index=models.Index(fields=['chat', '-last_message_at', '-last_message_id'], name='chat_chatar_chat_id_fcd191_idx'),
+        ),
+    ]
@@ -1,9 +1,13 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.utils.translation import gettext_lazy as _
 
 from bot.models import Channel
 from common.constants.models import CHAT, REGISTRATION_USER
 from core.models import TracingMixin
+from roleplay.utils.dice import CounterRandom, generate_seed, replay_roll
+
+from .managers import ChatManager
 
 
 class Chat(TracingMixin):
@@ -20,6 +24,10 @@ class Chat(TracingMixin):
         Users in this chat.
     discord_id: Optional[:class:`str`]
         Discord chat associated if given.
+    dice_seed: :class:`str`
+        Secret seed for the dice rolled in this chat.
+    dice_counter: :class:`int`
+        Next counter of the dice stream available, every roll uses its own counter so it can be replayed.
     """
 
     id = models.BigAutoField(primary_key=True, verbose_name=_('identifier'))
@@ -28,6 +36,12 @@ class Chat(TracingMixin):
     discord_id = models.CharField(
         verbose_name=_('discord identifier'), max_length=100, null=False, blank=True, db_index=True,
     )
+    dice_seed = models.CharField(
+        verbose_name=_('dice seed'), max_length=64, default=generate_seed, null=False, blank=False, editable=False,
+    )
+    dice_counter = models.PositiveBigIntegerField(verbose_name=_('dice counter'), default=0, editable=False)
+
+    objects = ChatManager()
 
     @property
     def discord_chat(self):
@@ -36,6 +50,36 @@ class Chat(TracingMixin):
         d_chat = Channel(self.discord_id)
         return d_chat
 
+    def reserve_dice_counters(self, size: int = 1) -> range:
+        """
+        Reserves a block of counters of the dice stream of this chat.
+        Counters are never given twice, even if several workers reserve them at the same time.
+
+        Parameters
+        ----------
+        size: :class:`int`
+            Number of counters to reserve.
+        """
+
+        with transaction.atomic():
+            Chat.objects.filter(pk=self.pk).update(dice_counter=F('dice_counter') + size)
+            self.refresh_from_db(fields=['dice_counter'])
+        return range(self.dice_counter - size, self.dice_counter)
+
+    def get_dice_random(self, counter: int) -> CounterRandom:
+        """
+        Returns the random generator of the dice stream for given counter.
+        """
+
+        return CounterRandom(self.dice_seed, counter)
+
+    def replay_roll(self, roll: str, counter: int):
+        """
+        Executes again a roll made in this chat with given counter, giving the same results.
+        """
+
+        return replay_roll(roll, self.dice_seed, counter)
+
     class Meta:
         verbose_name = _('chat')
         verbose_name_plural = _('chats')
@@ -74,6 +118,134 @@ class ChatMessage(TracingMixin):
     class Meta:
         verbose_name = _('message')
         verbose_name_plural = _('messages')
+        indexes = [
+            # NOTE: Covers history pages, which are sought by position in `api.pagination.KeysetCursorPagination`
+            models.Index(fields=['chat', '-entry_created_at', '-id']),
+        ]
 
     def __str__(self):
         return f'{self.message} ({self.entry_created_at})'
+
+
+class ChatArchive(TracingMixin):
+    """
+    Old messages of a chat moved out of :class:`ChatMessage` and stored compressed (gzipped JSON lines).
+
+    Parameters
+    ----------
+    id: :class:`int`
+        Identifier of the archive (auto-incremented).
+    chat: :class:`~chat.models.Chat`
+        Chat the messages belong to.
+    first_message_id: :class:`int`
+        Identifier of the oldest message archived.
+    first_message_at: :class:`datetime.datetime`
+        Creation date of the oldest message archived.
+    last_message_id: :class:`int`
+        Identifier of the newest message archived.
+    last_message_at: :class:`datetime.datetime`
+        Creation date of the newest message archived.
+    message_count: :class:`int`
+        Number of messages archived.
+    data: :class:`bytes`
+        Messages archived.
+    """
+
+    id = models.BigAutoField(primary_key=True, verbose_name=_('identifier'))
+    chat = models.ForeignKey(
+        to=CHAT, verbose_name=_('chat'), on_delete=models.CASCADE, related_name='archive_set', db_index=True,
+    )
+    first_message_id = models.PositiveBigIntegerField(verbose_name=_('first message'))
+    first_message_at = models.DateTimeField(verbose_name=_('first message date'))
+    last_message_id = models.PositiveBigIntegerField(verbose_name=_('last message'))
+    last_message_at = models.DateTimeField(verbose_name=_('last message date'))
+    message_count = models.PositiveIntegerField(verbose_name=_('number of messages'))
+    data = models.BinaryField(verbose_name=_('data'))
+
+    class Meta:
+        verbose_name = _('message archive')
+        verbose_name_plural = _('message archives')
+        indexes = [
+            models.Index(fields=['chat', '-last_message_at', '-last_message_id']),
+        ]
+
+    def __str__(self):
+        return f'{self.chat_id}: {self.first_message_id} - {self.last_message_id} ({self.message_count})'
+
+
+class RollRecord(TracingMixin):
+    """
+    History of the dice rolled in a chat.
+
+    Parameters
+    ----------
+    id: :class:`int`
+        Identifier of the roll (auto-incremented).
+    chat: :class:`~chat.models.Chat`
+        Chat where the roll was made.
+    author: :class:`~registration.models.User`
+        Person who made the roll.
+    expression: :class:`str`
+        Dice roll as it was executed.
+    total: :class:`int`
+        Result of the roll.
+    results: :class:`dict`
+        Every value rolled by each term of the roll.
+    counter: Optional[:class:`int`]
+        Counter of the dice stream of the chat used for this roll, so it can be replayed.
+    """
+
+    id = models.BigAutoField(primary_key=True, verbose_name=_('identifier'))
+    chat = models.ForeignKey(
+        to=CHAT, verbose_name=_('chat'), on_delete=models.CASCADE, related_name='roll_record_set', db_index=True,
+    )
+    author = models.ForeignKey(
+        to=REGISTRATION_USER, verbose_name=_('author'), on_delete=models.CASCADE, related_name='roll_record_set',
+        db_index=True,
+    )
+    expression = models.CharField(verbose_name=_('expression'), max_length=254, null=False, blank=False)
+    total = models.IntegerField(verbose_name=_('total'))
+    results = models.JSONField(verbose_name=_('results'), default=dict)
+    counter = models.PositiveBigIntegerField(verbose_name=_('counter'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('roll')
+        verbose_name_plural = _('rolls')
+
+    def __str__(self):
+        return f'{self.expression} = {self.total} ({self.entry_created_at})'
+
+
+class ReadMarker(TracingMixin):
+    """
+    Last message of a chat read by a user.
+
+    Parameters
+    ----------
+    id: :class:`int`
+        Identifier of the marker (auto-incremented).
+    chat: :class:`~chat.models.Chat`
+        Chat read.
+    user: :class:`~registration.models.User`
+        Person who read the chat.
+    last_read_id: :class:`int`
+        Identifier of the last message read. It's not a relation so it survives messages being removed.
+    """
+
+    id = models.BigAutoField(primary_key=True, verbose_name=_('identifier'))
+    chat = models.ForeignKey(
+        to=CHAT, verbose_name=_('chat'), on_delete=models.CASCADE, related_name='read_marker_set', db_index=True,
+    )
+    user = models.ForeignKey(
+        to=REGISTRATION_USER, verbose_name=_('user'), on_delete=models.CASCADE, related_name='read_marker_set',
+        db_index=True,
+    )
+    last_read_id = models.PositiveBigIntegerField(verbose_name=_('last message read'), default=0)
+
+    class Meta:
+        verbose_name = _('read marker')
+        verbose_name_plural = _('read markers')
+        unique_together = ('chat', 'user')
+
+    def __str__(self):
+        return f'{self.user} ({self.chat_id}: {self.last_read_id})'
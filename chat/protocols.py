@@ -0,0 +1,131 @@
+import json
+from typing import Any, Optional, Union
+
+import msgpack
+
+# NOTE: Values of these keys are data (dice expressions, chat identifiers...), so their keys are never shortened
+RAW_KEYS = ('roll', 'unread')
+
+SHORT_KEYS = {
+    'type': 't',
+    'content': 'c',
+    'events': 'e',
+    'id': 'i',
+    'chat': 'ch',
+    'message': 'm',
+    'author': 'a',
+    'entry_created_at': 'ca',
+    'entry_updated_at': 'ua',
+    'status': 's',
+    'roll': 'r',
+    'counter': 'n',
+    'user': 'u',
+    'online': 'o',
+    'typing': 'ty',
+    'count': 'co',
+    'delta': 'd',
+    'present': 'p',
+    'unread': 'ur',
+    'retry_after': 'ra',
+    'messages': 'ms',
+    'complete': 'cp',
+    'resume_token': 'rt',
+    'username': 'un',
+    'first_name': 'fn',
+    'last_name': 'ln',
+    'email': 'em',
+}
+
+
+def shorten(content: Any, key: Optional[str] = None) -> Any:
+    """
+    Replaces every known key of given content by its short version.
+    """
+
+    if isinstance(content, dict) and key not in RAW_KEYS:
+        return {SHORT_KEYS.get(name, name): shorten(value, name) for name, value in content.items()}
+    if isinstance(content, list):
+        return [shorten(value) for value in content]
+    return content
+
+
+def reference_author(content: dict[str, Any]) -> tuple[dict[str, Any], Optional[dict]]:
+    """
+    Splits the author out of an event with a message, returning the event with just the identifier of the author and
+    the author itself (if any).
+    """
+
+    message = content.get('content')
+    if not isinstance(message, dict) or not isinstance(message.get('author'), dict):
+        return content, None
+    author = message['author']
+    return {**content, 'content': {**message, 'author': author['id']}}, author
+
+
+class WireProtocol:
+    """
+    Format of the frames sent through a websocket connection, negotiated as subprotocol on connect.
+
+    Parameters
+    ----------
+    name: :class:`str`
+        Name of the subprotocol.
+    compact: :class:`bool`
+        Whether keys are shortened and authors are sent just once per connection.
+    binary: :class:`bool`
+        Whether frames are sent as bytes.
+    """
+
+    name = 'oilandrope.json'
+    compact = False
+    binary = False
+
+    def encode(self, content: Any) -> Union[str, bytes]:
+        return json.dumps(content, separators=(',', ':') if self.compact else None)
+
+    def decode(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+    def encode_batch(self, events: list) -> Union[str, bytes]:
+        """
+        Joins already encoded events into a single batch frame, without decoding them again.
+        """
+
+        type_key, events_key = ('t', 'e') if self.compact else ('type', 'events')
+        return f'{{"{type_key}":"batch","{events_key}":[{",".join(events)}]}}'
+
+
+class CompactJsonProtocol(WireProtocol):
+    name = 'oilandrope.compact'
+    compact = True
+
+
+class MessagePackProtocol(WireProtocol):
+    name = 'oilandrope.msgpack'
+    compact = True
+    binary = True
+
+    def encode(self, content: Any) -> bytes:
+        return msgpack.packb(content)
+
+    def decode(self, data: Union[str, bytes]) -> Any:
+        return msgpack.unpackb(data, strict_map_key=False)
+
+    def encode_batch(self, events: list) -> bytes:
+        # NOTE: A MessagePack array is just its header followed by its items, already packed
+        packer = msgpack.Packer()
+        return b''.join((
+            packer.pack_map_header(2), packer.pack('t'), packer.pack('batch'), packer.pack('e'),
+            packer.pack_array_header(len(events)), *events,
+        ))
+
+
+PROTOCOLS = {protocol.name: protocol for protocol in (WireProtocol(), CompactJsonProtocol(), MessagePackProtocol())}
+
+
+def negotiate_protocol(subprotocols: list[str]) -> Optional[WireProtocol]:
+    """
+    Returns the first protocol of given ones the server speaks, if any.
+    """
+
+    return next((PROTOCOLS[name] for name in subprotocols if name in PROTOCOLS), None)
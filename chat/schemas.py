@@ -0,0 +1,33 @@
+from typing import Optional
+
+from pydantic import Field
+
+from core.schemas import WebSocketMessageSchema
+
+
+class WebSocketChatSchema(WebSocketMessageSchema):
+    """
+    Schema for messages received by :class:`~chat.consumers.ChatConsumer`.
+
+    Parameters
+    ----------
+    chat: :class:`int`
+        Identifier of the chat.
+    message: Optional[:class:`str`]
+        Message or roll sent.
+    typing: Optional[:class:`bool`]
+        Whether the user is typing or stopped typing.
+    batch: Optional[:class:`bool`]
+        Whether events of the chat are sent in batches.
+    last_seen_id: Optional[:class:`int`]
+        Identifier of the last message received, messages after it are sent again.
+    resume_token: Optional[:class:`str`]
+        Token given by a draining node to resume the chat (authenticating the user too).
+    """
+
+    chat: int = Field(ge=1)
+    message: Optional[str] = Field(default=None, max_length=255)
+    typing: Optional[bool] = None
+    batch: Optional[bool] = None
+    last_seen_id: Optional[int] = Field(default=None, ge=0)
+    resume_token: Optional[str] = None
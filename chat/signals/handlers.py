@@ -0,0 +1,71 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from chat.state import get_chat_state
+from chat.utils import get_user_group_name
+from common.constants import models as constants
+
+Chat = apps.get_model(constants.CHAT)
+
+MEMBERSHIP_ACTIONS = {
+    'post_add': 'add',
+    'post_remove': 'remove',
+    'pre_clear': 'remove',
+}
+
+
+def notify_membership_changes(action: str, changes: dict[int, list[int]]):
+    """
+    Sends the chats a user joined or left to every connection of that user.
+    Unread counters of the user and members of the chats are dropped, so they are loaded again.
+
+    Parameters
+    ----------
+    action: :class:`str`
+        Either `add` or `remove`.
+    changes: :class:`dict`
+        Chats changed by user.
+    """
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    state = get_chat_state(channel_layer)
+    for chat_id in {chat_id for chats in changes.values() for chat_id in chats}:
+        async_to_sync(state.forget_members)(chat_id)
+    for user_id, chats in changes.items():
+        async_to_sync(state.forget_unread)(user_id)
+        async_to_sync(channel_layer.group_send)(
+            get_user_group_name(user_id),
+            {
+                'type': 'chat_membership_changed',
+                'action': action,
+                'chats': chats,
+            },
+        )
+
+
+@receiver(m2m_changed, sender=Chat.users.through)
+def chat_users_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keeps the chat memberships cached by websocket connections up to date.
+    """
+
+    if action not in MEMBERSHIP_ACTIONS:
+        return
+    if action == 'pre_clear':
+        # NOTE: Cleared relations are not given, so they are taken before they're gone
+        related = instance.chat_set if reverse else instance.users
+        pk_set = set(related.values_list('pk', flat=True))
+    if not pk_set:
+        return
+    if reverse:
+        changes = {instance.pk: sorted(pk_set)}
+    else:
+        changes = {user_id: [instance.pk] for user_id in pk_set}
+    # NOTE: Connections are told only once changes are committed
+    transaction.on_commit(lambda: notify_membership_changes(MEMBERSHIP_ACTIONS[action], changes))
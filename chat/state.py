@@ -0,0 +1,448 @@
+import json
+import weakref
+from collections import defaultdict, deque
+from typing import Iterable, Optional
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels_redis.core import RedisChannelLayer
+from django.conf import settings
+
+from chat.utils import get_node_group_name, get_user_group_name
+from common.tools.sync import delete_layer_keys
+
+# NOTE: Marks the unread counters of a user (or the members of a chat) as loaded, so empty ones are not loaded again
+LOADED_FIELD = '_'
+
+JOIN_SCRIPT = """
+    local count = redis.call('hincrby', KEYS[1], ARGV[1], 1)
+    redis.call('expire', KEYS[1], ARGV[2])
+    return count
+"""
+
+LEAVE_SCRIPT = """
+    local count = redis.call('hincrby', KEYS[1], ARGV[1], -1)
+    if count <= 0 then
+        redis.call('hdel', KEYS[1], ARGV[1])
+    end
+    return count
+"""
+
+LOAD_UNREAD_SCRIPT = """
+    redis.call('del', KEYS[1])
+    redis.call('hset', KEYS[1], unpack(ARGV, 2))
+    redis.call('expire', KEYS[1], ARGV[1])
+"""
+
+INCREMENT_UNREAD_SCRIPT = """
+    local counts = {}
+    for index, key in ipairs(KEYS) do
+        if redis.call('exists', key) == 1 then
+            counts[index] = redis.call('hincrby', key, ARGV[1], 1)
+        else
+            counts[index] = -1
+        end
+    end
+    return counts
+"""
+
+LOAD_MEMBERS_SCRIPT = """
+    redis.call('del', KEYS[1])
+    redis.call('sadd', KEYS[1], unpack(ARGV, 2))
+    redis.call('expire', KEYS[1], ARGV[1])
+"""
+
+SET_UNREAD_SCRIPT = """
+    if redis.call('exists', KEYS[1]) == 0 then
+        return -1
+    end
+    local previous = redis.call('hget', KEYS[1], ARGV[1]) or 0
+    redis.call('hset', KEYS[1], ARGV[1], ARGV[2])
+    return tonumber(previous)
+"""
+
+REMEMBER_MESSAGE_SCRIPT = """
+    redis.call('rpush', KEYS[1], ARGV[1])
+    redis.call('ltrim', KEYS[1], -tonumber(ARGV[2]), -1)
+    redis.call('expire', KEYS[1], ARGV[3])
+"""
+
+
+class ChatState:
+    """
+    Ephemeral state of the chats shared by every connection: who is connected to each chat, how many messages
+    each user has not read yet in every chat, the members of every chat and the last messages of every chat (so
+    reconnections and messages don't need to query the database).
+    Unread counters are loaded from the database the first time a user connects and then kept up to date, so they
+    are unknown (`None`) for users not loaded. Members are loaded the first time they're needed and dropped whenever
+    they change.
+    """
+
+    async def join(self, chat_id: int, user_id: int) -> int:
+        """
+        Registers a connection of the user to the chat, returning the number of connections of the user to it.
+        """
+
+        raise NotImplementedError
+
+    async def leave(self, chat_id: int, user_id: int) -> int:
+        """
+        Unregisters a connection of the user to the chat, returning the number of connections of the user left.
+        """
+
+        raise NotImplementedError
+
+    async def get_present(self, chat_id: int) -> list[int]:
+        """
+        Returns the users connected to the chat.
+        """
+
+        raise NotImplementedError
+
+    async def get_unread(self, user_id: int) -> Optional[dict[int, int]]:
+        raise NotImplementedError
+
+    async def load_unread(self, user_id: int, counts: dict[int, int]):
+        raise NotImplementedError
+
+    async def forget_unread(self, user_id: int):
+        """
+        Drops the unread counters of the user, so they are loaded again from the database.
+        """
+
+        raise NotImplementedError
+
+    async def get_members(self, chat_id: int) -> Optional[set[int]]:
+        raise NotImplementedError
+
+    async def load_members(self, chat_id: int, user_ids: Iterable[int]):
+        raise NotImplementedError
+
+    async def forget_members(self, chat_id: int):
+        """
+        Drops the members of the chat, so they are loaded again from the database.
+        """
+
+        raise NotImplementedError
+
+    async def increment_unread(self, chat_id: int, user_ids: Iterable[int]) -> dict[int, Optional[int]]:
+        """
+        Adds a message to the unread counters of the chat for given users, returning their new counters.
+        """
+
+        raise NotImplementedError
+
+    async def set_unread(self, chat_id: int, user_id: int, count: int) -> Optional[int]:
+        """
+        Sets the unread counter of the chat for the user, returning the previous one.
+        """
+
+        raise NotImplementedError
+
+    async def remember_message(self, chat_id: int, message: dict):
+        """
+        Keeps given serialized message among the last `CHAT_REPLAY_BUFFER_SIZE` ones of the chat.
+        """
+
+        raise NotImplementedError
+
+    async def get_recent_messages(self, chat_id: int) -> list[dict]:
+        """
+        Returns the last serialized messages of the chat kept, oldest first.
+        """
+
+        raise NotImplementedError
+
+    async def set_draining(self, node: str, draining: bool):
+        """
+        Marks the ASGI node as draining (so it doesn't accept connections) for `CHAT_DRAIN_EXPIRY` seconds, or not.
+        """
+
+        raise NotImplementedError
+
+    async def is_draining(self, node: str) -> bool:
+        raise NotImplementedError
+
+    async def flush(self):
+        raise NotImplementedError
+
+
+class MemoryChatState(ChatState):
+    """
+    State kept in the memory of the process, along with :class:`channels.layers.InMemoryChannelLayer`.
+    """
+
+    def __init__(self):
+        self.presence = defaultdict(dict)
+        self.unread = {}
+        self.members = {}
+        self.messages = {}
+        self.draining = set()
+
+    async def join(self, chat_id: int, user_id: int) -> int:
+        connections = self.presence[chat_id]
+        connections[user_id] = connections.get(user_id, 0) + 1
+        return connections[user_id]
+
+    async def leave(self, chat_id: int, user_id: int) -> int:
+        connections = self.presence[chat_id]
+        count = connections.get(user_id, 0) - 1
+        if count <= 0:
+            connections.pop(user_id, None)
+        else:
+            connections[user_id] = count
+        return count
+
+    async def get_present(self, chat_id: int) -> list[int]:
+        return sorted(self.presence[chat_id])
+
+    async def get_unread(self, user_id: int) -> Optional[dict[int, int]]:
+        counts = self.unread.get(user_id)
+        return None if counts is None else dict(counts)
+
+    async def load_unread(self, user_id: int, counts: dict[int, int]):
+        self.unread[user_id] = dict(counts)
+
+    async def forget_unread(self, user_id: int):
+        self.unread.pop(user_id, None)
+
+    async def get_members(self, chat_id: int) -> Optional[set[int]]:
+        members = self.members.get(chat_id)
+        return None if members is None else set(members)
+
+    async def load_members(self, chat_id: int, user_ids: Iterable[int]):
+        self.members[chat_id] = set(user_ids)
+
+    async def forget_members(self, chat_id: int):
+        self.members.pop(chat_id, None)
+
+    async def increment_unread(self, chat_id: int, user_ids: Iterable[int]) -> dict[int, Optional[int]]:
+        counts = {}
+        for user_id in user_ids:
+            if user_id not in self.unread:
+                counts[user_id] = None
+                continue
+            counts[user_id] = self.unread[user_id][chat_id] = self.unread[user_id].get(chat_id, 0) + 1
+        return counts
+
+    async def set_unread(self, chat_id: int, user_id: int, count: int) -> Optional[int]:
+        if user_id not in self.unread:
+            return None
+        previous = self.unread[user_id].get(chat_id, 0)
+        self.unread[user_id][chat_id] = count
+        return previous
+
+    async def remember_message(self, chat_id: int, message: dict):
+        if chat_id not in self.messages:
+            self.messages[chat_id] = deque(maxlen=settings.CHAT_REPLAY_BUFFER_SIZE)
+        self.messages[chat_id].append(dict(message))
+
+    async def get_recent_messages(self, chat_id: int) -> list[dict]:
+        return [dict(message) for message in self.messages.get(chat_id, ())]
+
+    async def set_draining(self, node: str, draining: bool):
+        if draining:
+            self.draining.add(node)
+        else:
+            self.draining.discard(node)
+
+    async def is_draining(self, node: str) -> bool:
+        return node in self.draining
+
+    async def flush(self):
+        self.presence.clear()
+        self.unread.clear()
+        self.members.clear()
+        self.messages.clear()
+        self.draining.clear()
+
+
+class RedisChatState(ChatState):
+    """
+    State kept in Redis through the connections of :class:`channels_redis.core.RedisChannelLayer`, so every process
+    shares it without opening any other connection.
+
+    Parameters
+    ----------
+    channel_layer: :class:`channels_redis.core.RedisChannelLayer`
+        Channel layer whose connections are used.
+    """
+
+    def __init__(self, channel_layer: RedisChannelLayer):
+        self.channel_layer = channel_layer
+        self.prefix = f'{channel_layer.prefix}:chat:'
+
+    def get_presence_key(self, chat_id: int) -> str:
+        return f'{self.prefix}presence:{chat_id}'
+
+    def get_unread_key(self, user_id: int) -> str:
+        return f'{self.prefix}unread:{user_id}'
+
+    def get_members_key(self, chat_id: int) -> str:
+        return f'{self.prefix}members:{chat_id}'
+
+    def get_messages_key(self, chat_id: int) -> str:
+        return f'{self.prefix}messages:{chat_id}'
+
+    def get_draining_key(self, node: str) -> str:
+        return f'{self.prefix}draining:{node}'
+
+    async def execute(self, key: str, script: str, args: list):
+        index = self.channel_layer.consistent_hash(key)
+        async with self.channel_layer.connection(index) as connection:
+            return await connection.eval(script, keys=[key], args=args)
+
+    async def join(self, chat_id: int, user_id: int) -> int:
+        return await self.execute(
+            self.get_presence_key(chat_id), JOIN_SCRIPT, [user_id, settings.CHAT_PRESENCE_EXPIRY],
+        )
+
+    async def leave(self, chat_id: int, user_id: int) -> int:
+        return await self.execute(self.get_presence_key(chat_id), LEAVE_SCRIPT, [user_id])
+
+    async def get_present(self, chat_id: int) -> list[int]:
+        key = self.get_presence_key(chat_id)
+        async with self.channel_layer.connection(self.channel_layer.consistent_hash(key)) as connection:
+            return sorted(int(user_id) for user_id in await connection.hkeys(key))
+
+    async def get_unread(self, user_id: int) -> Optional[dict[int, int]]:
+        key = self.get_unread_key(user_id)
+        async with self.channel_layer.connection(self.channel_layer.consistent_hash(key)) as connection:
+            counts = await connection.hgetall(key, encoding='utf-8')
+        if not counts:
+            return None
+        return {int(chat_id): int(count) for chat_id, count in counts.items() if chat_id != LOADED_FIELD}
+
+    async def load_unread(self, user_id: int, counts: dict[int, int]):
+        args = [settings.CHAT_UNREAD_EXPIRY, LOADED_FIELD, 0]
+        for chat_id, count in counts.items():
+            args.extend((chat_id, count))
+        await self.execute(self.get_unread_key(user_id), LOAD_UNREAD_SCRIPT, args)
+
+    async def forget_unread(self, user_id: int):
+        key = self.get_unread_key(user_id)
+        async with self.channel_layer.connection(self.channel_layer.consistent_hash(key)) as connection:
+            await connection.delete(key)
+
+    async def get_members(self, chat_id: int) -> Optional[set[int]]:
+        key = self.get_members_key(chat_id)
+        async with self.channel_layer.connection(self.channel_layer.consistent_hash(key)) as connection:
+            members = await connection.smembers(key, encoding='utf-8')
+        if not members:
+            return None
+        return {int(user_id) for user_id in members if user_id != LOADED_FIELD}
+
+    async def load_members(self, chat_id: int, user_ids: Iterable[int]):
+        await self.execute(
+            self.get_members_key(chat_id), LOAD_MEMBERS_SCRIPT, [settings.CHAT_UNREAD_EXPIRY, LOADED_FIELD, *user_ids],
+        )
+
+    async def forget_members(self, chat_id: int):
+        key = self.get_members_key(chat_id)
+        async with self.channel_layer.connection(self.channel_layer.consistent_hash(key)) as connection:
+            await connection.delete(key)
+
+    async def increment_unread(self, chat_id: int, user_ids: Iterable[int]) -> dict[int, Optional[int]]:
+        # NOTE: Counters are incremented with a single call per Redis host
+        shards = defaultdict(list)
+        for user_id in user_ids:
+            shards[self.channel_layer.consistent_hash(self.get_unread_key(user_id))].append(user_id)
+        counts = {}
+        for index, shard in shards.items():
+            async with self.channel_layer.connection(index) as connection:
+                results = await connection.eval(
+                    INCREMENT_UNREAD_SCRIPT, keys=[self.get_unread_key(user_id) for user_id in shard], args=[chat_id],
+                )
+            counts.update({user_id: None if count < 0 else count for user_id, count in zip(shard, results)})
+        return counts
+
+    async def set_unread(self, chat_id: int, user_id: int, count: int) -> Optional[int]:
+        previous = await self.execute(self.get_unread_key(user_id), SET_UNREAD_SCRIPT, [chat_id, count])
+        return None if previous < 0 else previous
+
+    async def remember_message(self, chat_id: int, message: dict):
+        await self.execute(
+            self.get_messages_key(chat_id), REMEMBER_MESSAGE_SCRIPT,
+            [json.dumps(message), settings.CHAT_REPLAY_BUFFER_SIZE, settings.CHAT_REPLAY_BUFFER_EXPIRY],
+        )
+
+    async def get_recent_messages(self, chat_id: int) -> list[dict]:
+        key = self.get_messages_key(chat_id)
+        async with self.channel_layer.connection(self.channel_layer.consistent_hash(key)) as connection:
+            return [json.loads(message) for message in await connection.lrange(key, 0, -1)]
+
+    async def set_draining(self, node: str, draining: bool):
+        key = self.get_draining_key(node)
+        async with self.channel_layer.connection(self.channel_layer.consistent_hash(key)) as connection:
+            if draining:
+                await connection.set(key, 1, expire=settings.CHAT_DRAIN_EXPIRY)
+            else:
+                await connection.delete(key)
+
+    async def is_draining(self, node: str) -> bool:
+        key = self.get_draining_key(node)
+        async with self.channel_layer.connection(self.channel_layer.consistent_hash(key)) as connection:
+            return bool(await connection.exists(key))
+
+    async def flush(self):
+        await delete_layer_keys(self.channel_layer, f'{self.prefix}*')
+
+
+_states = weakref.WeakKeyDictionary()
+
+
+def get_chat_state(channel_layer) -> ChatState:
+    """
+    Returns the chat state stored along with given channel layer.
+    """
+
+    if channel_layer not in _states:
+        if isinstance(channel_layer, RedisChannelLayer):
+            _states[channel_layer] = RedisChatState(channel_layer)
+        else:
+            _states[channel_layer] = MemoryChatState()
+    return _states[channel_layer]
+
+
+def notify_unread_changes(chat_id: int, user_id: int, count: int):
+    """
+    Sets the unread counter of the chat for the user and sends the change to every connection of the user.
+
+    Parameters
+    ----------
+    chat_id: :class:`int`
+        Identifier of the chat.
+    user_id: :class:`int`
+        Identifier of the user.
+    count: :class:`int`
+        Messages not read yet.
+    """
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    previous = async_to_sync(get_chat_state(channel_layer).set_unread)(chat_id, user_id, count)
+    async_to_sync(channel_layer.group_send)(
+        get_user_group_name(user_id),
+        {
+            'type': 'chat_unread_changed',
+            'chat': chat_id,
+            'count': count,
+            'delta': None if previous is None else count - previous,
+        },
+    )
+
+
+async def drain_node(node: str):
+    """
+    Stops the ASGI node from accepting chat connections and tells the ones it has to reconnect to another node.
+
+    Parameters
+    ----------
+    node: :class:`str`
+        Name of the node.
+    """
+
+    channel_layer = get_channel_layer()
+    await get_chat_state(channel_layer).set_draining(node, True)
+    await channel_layer.group_send(get_node_group_name(node), {'type': 'chat_drain'})
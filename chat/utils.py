@@ -0,0 +1,59 @@
+from typing import Optional
+
+from django.conf import settings
+from django.core import signing
+
+RESUME_TOKEN_SALT = 'chat.resume'
+
+
+def get_chat_group_name(chat_id: int) -> str:
+    """
+    Name of the channel layer group of the connections to a chat.
+    """
+
+    return f'chat_{chat_id}'
+
+
+def get_user_group_name(user_id: int) -> str:
+    """
+    Name of the channel layer group of every chat connection of a user.
+    """
+
+    return f'chat_user_{user_id}'
+
+
+def get_members_group_name(chat_id: int) -> str:
+    """
+    Name of the channel layer group of every chat connection of the members of a chat, connected to it or not.
+    """
+
+    return f'chat_members_{chat_id}'
+
+
+def get_node_group_name(node: str) -> str:
+    """
+    Name of the channel layer group of every chat connection to an ASGI node.
+    """
+
+    return f'chat_node_{node}'
+
+
+def make_resume_token(user_id: int, chat_id: int, last_seen_id: Optional[int]) -> str:
+    """
+    Signs the position of a user in a chat, so they can resume it from another node.
+    """
+
+    return signing.dumps({'user': user_id, 'chat': chat_id, 'last_seen_id': last_seen_id}, salt=RESUME_TOKEN_SALT)
+
+
+def load_resume_token(token: Optional[str]) -> Optional[dict]:
+    """
+    Returns the position signed by given resume token, or None if not valid or expired.
+    """
+
+    if not token:
+        return None
+    try:
+        return signing.loads(token, salt=RESUME_TOKEN_SALT, max_age=settings.CHAT_RESUME_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
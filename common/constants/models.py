@@ -32,3 +32,6 @@ ROLEPLAY_SESSION = 'roleplay.Session'
 # Chat
 CHAT = 'chat.Chat'
 CHAT_MESSAGE = 'chat.ChatMessage'
+CHAT_ROLL_RECORD = 'chat.RollRecord'
+CHAT_READ_MARKER = 'chat.ReadMarker'
+CHAT_ARCHIVE = 'chat.ChatArchive'
@@ -1,5 +1,7 @@
+from .buffers import WriteBehindBuffer
+from .layers import delete_layer_keys
 from .models import async_manager_func
 
 __all__ = [
-    'async_manager_func',
+    'async_manager_func', 'delete_layer_keys', 'WriteBehindBuffer',
 ]
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+
+LOGGER = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Keeps model instances in memory and inserts them with a single `bulk_create` every `max_latency` milliseconds or
+    once `max_size` instances are waiting, whatever comes first.
+
+    Parameters
+    ----------
+    model: :class:`models.Model`
+        Django model of the instances buffered.
+    max_size: :class:`int`
+        Number of instances that triggers a flush.
+    max_latency: :class:`int`
+        Milliseconds an instance can wait before being inserted.
+    """
+
+    def __init__(self, model, max_size: int, max_latency: int):
+        self.model = model
+        self.max_size = max_size
+        self.max_latency = max_latency
+        self.pending = []
+        self._timer = None
+
+    def __len__(self):
+        return len(self.pending)
+
+    async def add(self, instance) -> asyncio.Future:
+        """
+        Queues an instance to be inserted, returning a future with the instance once it's inserted (or `None` if it
+        couldn't be).
+        """
+
+        written = asyncio.get_running_loop().create_future()
+        self.pending.append((instance, written))
+        if len(self.pending) >= self.max_size:
+            await self.flush()
+        else:
+            self._schedule()
+        return written
+
+    def _schedule(self):
+        loop = asyncio.get_running_loop()
+        # NOTE: A timer from a closed loop would never fire, so it's scheduled again on the running one
+        if self._timer is None or self._timer.done() or self._timer.get_loop() is not loop:
+            self._timer = loop.create_task(self._flush_later())
+
+    def _cancel_timer(self):
+        timer, self._timer = self._timer, None
+        if timer is not None and timer is not asyncio.current_task() and timer.get_loop() is asyncio.get_running_loop():
+            timer.cancel()
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_latency / 1000)
+        await self.flush()
+
+    async def flush(self) -> list:
+        """
+        Inserts every pending instance and returns the ones inserted.
+        """
+
+        # NOTE: Pending list is swapped before awaiting so instances added meanwhile go to the next batch
+        pending, self.pending = self.pending, []
+        self._cancel_timer()
+        if not pending:
+            return []
+        instances = await database_sync_to_async(self.write)([instance for instance, _written in pending])
+        for instance, (_instance, written) in zip(instances, pending):
+            # NOTE: Futures of a closed loop (e.g. flushed on exit) have nobody waiting for them
+            if not written.done() and not written.get_loop().is_closed():
+                written.set_result(instance)
+        return [instance for instance in instances if instance is not None]
+
+    def write(self, instances: list) -> list:
+        """
+        Inserts given instances, returning them with `None` in place of the ones that couldn't be inserted.
+        Failed batches are split in halves and tried again, so just the instances that can't be inserted are lost.
+        """
+
+        try:
+            return self.model.objects.bulk_create(instances)
+        except Exception:
+            if len(instances) == 1:
+                LOGGER.exception('Unable to write %s record, discarding it.', self.model.__name__)
+                return [None]
+            middle = len(instances) // 2
+            return self.write(instances[:middle]) + self.write(instances[middle:])
@@ -0,0 +1,31 @@
+# NOTE: Keys asked to Redis per `SCAN` call and deleted per `DEL` call
+SCAN_COUNT = 1000
+
+
+async def delete_layer_keys(channel_layer, pattern: str, count: int = SCAN_COUNT) -> int:
+    """
+    Deletes every key matching given pattern in every host of a Redis channel layer, returning how many were deleted.
+    Keys are walked with `SCAN` instead of `KEYS`, so Redis is never blocked while looking for them.
+
+    Parameters
+    ----------
+    channel_layer: :class:`channels_redis.core.RedisChannelLayer`
+        Channel layer whose connections are used.
+    pattern: :class:`str`
+        Glob-style pattern of the keys.
+    count: :class:`int`
+        Keys read and deleted at once.
+    """
+
+    deleted = 0
+    for index in range(channel_layer.ring_size):
+        async with channel_layer.connection(index) as connection:
+            keys = []
+            async for key in connection.iscan(match=pattern, count=count):
+                keys.append(key)
+                if len(keys) >= count:
+                    deleted += await connection.delete(*keys)
+                    keys = []
+            if keys:
+                deleted += await connection.delete(*keys)
+    return deleted
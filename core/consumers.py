@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import Optional, Union
 
@@ -6,6 +7,7 @@ from channels.auth import login
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from django.utils.translation import gettext_lazy as _
+from pydantic import ValidationError
 
 from common.enums import WebSocketCloseCodes
 from registration.models import User
@@ -14,11 +16,14 @@ from registration.models import User
 class TypedConsumerMixin:
     """
     This mixin checks for received data and checks that all required fields are present.
+    Every frame is decoded just once and given already decoded to `receive_json`.
 
     Parameters
     ----------
+    schema_class: :class:`pydantic.BaseModel`
+        The schema used to validate the data within the event loop. Preferred over `serializer_class`.
     serializer_class: :class:`rest_framework.serializers.Serializer`
-        The serializer class used to validate the data.
+        The serializer class used to validate the data, intended for complex messages since it needs a thread.
 
     Methods
     -------
@@ -27,8 +32,11 @@ class TypedConsumerMixin:
     check_data(serializer):
         Checks that the data is valid using serializer's `is_valid` method.
         Returns True if the data is valid, False otherwise.
+    validate_content(content):
+        Returns the validated content or None if it's not valid.
     """
 
+    schema_class = None
     serializer_class = None
 
     def get_serializer(self, data):
@@ -37,7 +45,9 @@ class TypedConsumerMixin:
         """
 
         if not self.serializer_class:
-            raise NotImplementedError('You must either define `serializer_class` or override `get_serializer`.')
+            raise NotImplementedError(
+                'You must either define `schema_class`, `serializer_class` or override `get_serializer`.'
+            )
         return self.serializer_class(data=data)
 
     async def check_data(self, serializer):
@@ -47,12 +57,24 @@ class TypedConsumerMixin:
 
         return await sync_to_async(serializer.is_valid)()
 
+    async def validate_content(self, content) -> Optional[dict]:
+        """
+        Validates the decoded content, returning it (with values parsed by the schema, if any) or None if not valid.
+        """
+
+        if self.schema_class:
+            try:
+                return self.schema_class.parse_obj(content).dict(exclude_unset=True)
+            except ValidationError:
+                return None
+        serializer = self.get_serializer(content)
+        check = await self.check_data(serializer)
+        return content if check else None
+
     async def receive(self, text_data=None, bytes_data=None, **kwargs):
-        if text_data:
-            data = json.loads(text_data)
-            serializer = self.get_serializer(data)
-            check = await self.check_data(serializer)
-            if not check:
+        if text_data or bytes_data:
+            content = await self.validate_content(await self.decode_json(text_data or bytes_data))
+            if content is None:
                 await self.send_json({
                     'type': 'error',
                     'content': {
@@ -60,6 +82,7 @@ class TypedConsumerMixin:
                     },
                 })
                 return await super().close(code=WebSocketCloseCodes.INVALID_FRAME_PAYLOAD_DATA.value)
+            return await self.receive_json(content, **kwargs)
         return await super().receive(text_data, bytes_data, **kwargs)
 
 
@@ -68,17 +91,25 @@ class HandlerJsonWebsocketConsumer(TypedConsumerMixin, AsyncJsonWebsocketConsume
     This consumer will get a `type` parameter within a JSON and call the function.
     If function does not exists returns error.
     If type is not given returns error message.
+
+    Parameters
+    ----------
+    handler_types: Optional[Iterable[:class:`str`]]
+        Types clients are allowed to call, if given. Any other type is handled as non-existent, so channel layer
+        handlers cannot be called from the outside.
     """
 
+    handler_types = None
+
     async def handler(self, content):
         func = content['type']
-        if not hasattr(self, func):
+        if not hasattr(self, func) or (self.handler_types is not None and func not in self.handler_types):
             content = {
                 'type': 'error',
                 'content': {'message': _('given type does not exist.').capitalize()},
             }
-            await super().send_json(content)
-            await super().close(code=WebSocketCloseCodes.INVALID_FRAME_PAYLOAD_DATA.value)
+            await self.send_json(content)
+            await self.close(code=WebSocketCloseCodes.INVALID_FRAME_PAYLOAD_DATA.value)
         else:
             func = getattr(self, func)
             del content['type']
@@ -89,6 +120,97 @@ class HandlerJsonWebsocketConsumer(TypedConsumerMixin, AsyncJsonWebsocketConsume
         await self.handler(content, **kwargs)
 
 
+class BatchSendMixin:
+    """
+    Lets a consumer coalesce outbound frames, once `batching` is enabled, into a single
+    `{"type": "batch", "events": [...]}` frame sent every `batch_max_latency` milliseconds or as soon as
+    `batch_max_size` frames are waiting, whatever comes first.
+    Frames sent directly go after any frame waiting, so order is kept.
+
+    Parameters
+    ----------
+    batching: :class:`bool`
+        Whether frames given to `send_batched` are coalesced or sent right away.
+    batch_max_latency: :class:`int`
+        Milliseconds a frame can wait before being sent.
+    batch_max_size: :class:`int`
+        Number of frames that triggers a batch.
+    """
+
+    batching = False
+    batch_max_latency = 20
+    batch_max_size = 50
+    _batch = ()
+    _batch_timer = None
+
+    async def send_batched(self, data: Union[str, bytes]):
+        """
+        Sends an already encoded frame, coalescing it with others if batching is enabled.
+        """
+
+        if not self.batching:
+            if isinstance(data, bytes):
+                return await self.send(bytes_data=data)
+            return await self.send(text_data=data)
+        if not self._batch:
+            self._batch = []
+        self._batch.append(data)
+        if len(self._batch) >= self.batch_max_size:
+            return await self.flush_batch()
+        if self._batch_timer is None:
+            self._batch_timer = asyncio.get_running_loop().create_task(self._flush_batch_later())
+
+    async def _flush_batch_later(self):
+        await asyncio.sleep(self.batch_max_latency / 1000)
+        await self.flush_batch()
+
+    async def flush_batch(self):
+        """
+        Sends every frame waiting as a single batch frame.
+        """
+
+        events, self._batch = self._batch, []
+        timer, self._batch_timer = self._batch_timer, None
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        if not events:
+            return
+        frame = self.encode_batch(events)
+        if isinstance(frame, bytes):
+            return await super().send(bytes_data=frame)
+        await super().send(text_data=frame)
+
+    def encode_batch(self, events: list):
+        """
+        Joins already encoded frames into a single batch frame.
+        """
+
+        # NOTE: Events are already encoded, so they're joined as they are instead of being decoded again
+        return f'{{"type":"batch","events":[{",".join(events)}]}}'
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        if self._batch:
+            await self.flush_batch()
+        return await super().send(text_data, bytes_data, close)
+
+    async def send_json(self, content, close=False):
+        if self._batch:
+            await self.flush_batch()
+        return await super().send_json(content, close)
+
+    async def close(self, code=None):
+        if self._batch:
+            await self.flush_batch()
+        return await super().close(code)
+
+    async def disconnect(self, code):
+        timer, self._batch_timer = self._batch_timer, None
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        self._batch = []
+        return await super().disconnect(code)
+
+
 class TokenAuthenticationMixin:
     authentication_backend: str = 'django.contrib.auth.backends.ModelBackend'
 
@@ -99,13 +221,16 @@ class TokenAuthenticationMixin:
             return user.first()
         return None
 
-    async def authenticate(self, text_data: Optional[Union[str, bytes]]) -> Optional[User]:
-        json_data = json.loads(text_data)
+    async def authenticate(self, text_data: Optional[Union[str, bytes, dict]]) -> Optional[User]:
+        json_data = text_data if isinstance(text_data, dict) else json.loads(text_data)
         if 'token' not in json_data:
             return None
         # Authenticating by given token
         user: User = await self.get_user(json_data['token'])
         if user:
-            await login(self.scope, user, backend=self.authentication_backend)
-            await database_sync_to_async(self.scope['session'].save)()
+            await self.login_user(user)
         return user
+
+    async def login_user(self, user: User):
+        await login(self.scope, user, backend=self.authentication_backend)
+        await database_sync_to_async(self.scope['session'].save)()
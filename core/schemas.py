@@ -0,0 +1,23 @@
+from typing import Optional
+
+from pydantic import BaseModel, Extra, Field
+
+
+class WebSocketMessageSchema(BaseModel):
+    """
+    Schema for messages received by consumers, validated without leaving the event loop.
+
+    Parameters
+    ----------
+    type: :class:`str`
+        Type of execution.
+    content: Optional[:class:`dict`]
+        Content of the message.
+    """
+
+    type: str = Field(max_length=255)
+    content: Optional[dict] = None
+
+    class Config:
+        # NOTE: Extra keys (e.g. `token`) are kept so handlers receive them
+        extra = Extra.allow
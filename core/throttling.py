@@ -0,0 +1,148 @@
+import time
+import weakref
+from typing import Optional
+
+from channels_redis.core import RedisChannelLayer
+from django.core.exceptions import ImproperlyConfigured
+
+from common.tools.sync import delete_layer_keys
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+CONSUME_SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('hmget', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('hset', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('expire', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+"""
+
+
+def parse_rate(rate: Optional[str]) -> Optional[tuple[int, float]]:
+    """
+    Parses a rate like DRF does (`'<requests>/<period>'`, period being `s`, `m`, `h` or `d`) into the capacity of the
+    bucket and the tokens refilled per second.
+    """
+
+    if rate is None:
+        return None
+    try:
+        num, period = rate.split('/')
+        capacity = int(num)
+        return capacity, capacity / PERIODS[period[0]]
+    except (KeyError, IndexError, ValueError):
+        raise ImproperlyConfigured(f'Invalid rate `{rate}`.')
+
+
+class TokenBucket:
+    """
+    Allows bursts of up to `capacity` actions, refilling `rate` tokens every second.
+
+    Parameters
+    ----------
+    capacity: :class:`int`
+        Maximum number of tokens.
+    rate: :class:`float`
+        Tokens refilled per second.
+    """
+
+    def __init__(self, capacity: int, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def consume(self) -> float:
+        """
+        Takes a token, returning 0 if there was one or else the seconds to wait until there is one.
+        """
+
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class TokenBuckets:
+    """
+    Token buckets shared by every connection, identified by key.
+    """
+
+    async def consume(self, key: str, capacity: int, rate: float) -> float:
+        raise NotImplementedError
+
+    async def flush(self):
+        raise NotImplementedError
+
+
+class MemoryTokenBuckets(TokenBuckets):
+    """
+    Buckets kept in the memory of the process, along with :class:`channels.layers.InMemoryChannelLayer`.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+
+    async def consume(self, key: str, capacity: int, rate: float) -> float:
+        bucket = self.buckets.get(key)
+        if bucket is None or (bucket.capacity, bucket.rate) != (capacity, rate):
+            bucket = self.buckets[key] = TokenBucket(capacity, rate)
+        return bucket.consume()
+
+    async def flush(self):
+        self.buckets.clear()
+
+
+class RedisTokenBuckets(TokenBuckets):
+    """
+    Buckets kept in Redis through the connections of :class:`channels_redis.core.RedisChannelLayer`, so every process
+    shares them without opening any other connection.
+
+    Parameters
+    ----------
+    channel_layer: :class:`channels_redis.core.RedisChannelLayer`
+        Channel layer whose connections are used.
+    """
+
+    def __init__(self, channel_layer: RedisChannelLayer):
+        self.channel_layer = channel_layer
+        self.prefix = f'{channel_layer.prefix}:throttle:'
+
+    async def consume(self, key: str, capacity: int, rate: float) -> float:
+        key = f'{self.prefix}{key}'
+        async with self.channel_layer.connection(self.channel_layer.consistent_hash(key)) as connection:
+            wait = await connection.eval(CONSUME_SCRIPT, keys=[key], args=[capacity, rate, time.time()])
+        return float(wait)
+
+    async def flush(self):
+        await delete_layer_keys(self.channel_layer, f'{self.prefix}*')
+
+
+_buckets = weakref.WeakKeyDictionary()
+
+
+def get_token_buckets(channel_layer) -> TokenBuckets:
+    """
+    Returns the token buckets stored along with given channel layer.
+    """
+
+    if channel_layer not in _buckets:
+        if isinstance(channel_layer, RedisChannelLayer):
+            _buckets[channel_layer] = RedisTokenBuckets(channel_layer)
+        else:
+            _buckets[channel_layer] = MemoryTokenBuckets()
+    return _buckets[channel_layer]
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/stable/ref/settings/
 """
 
 import os
+import socket
 from distutils.util import strtobool as to_bool
 from pathlib import Path
 
@@ -388,6 +389,15 @@ REST_FRAMEWORK = {
     'ALLOWED_VERSIONS': ['1'],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 30,
+    # Token bucket rates, premium users get the `<scope>_premium` rate if given
+    'DEFAULT_THROTTLE_RATES': {
+        'roll': os.getenv('ROLL_THROTTLE_RATE', '60/min'),
+        'roll_premium': os.getenv('ROLL_PREMIUM_THROTTLE_RATE', '240/min'),
+        'roll_distribution': os.getenv('ROLL_DISTRIBUTION_THROTTLE_RATE', '20/min'),
+        'roll_distribution_premium': os.getenv('ROLL_DISTRIBUTION_PREMIUM_THROTTLE_RATE', '80/min'),
+        'roll_simulation': os.getenv('ROLL_SIMULATION_THROTTLE_RATE', '10/min'),
+        'roll_simulation_premium': os.getenv('ROLL_SIMULATION_PREMIUM_THROTTLE_RATE', '40/min'),
+    },
 }
 
 # Settings for drf_spectacular
@@ -484,6 +494,82 @@ BOT_TOKEN = os.getenv('BOT_TOKEN')
 BOT_COMMAND_PREFIX = os.getenv('BOT_COMMAND_PREFIX', '..')
 BOT_DESCRIPTION = os.getenv('BOT_DESCRIPTION', 'Oil & Rope Bot: Managing sessions was never this easy!')
 
+# Dice Settings
+# Limits for any dice roll, bigger rolls are rejected before being executed
+
+DICE_MAX_LENGTH = int(os.getenv('DICE_MAX_LENGTH', '100'))
+DICE_MAX_TERMS = int(os.getenv('DICE_MAX_TERMS', '20'))
+DICE_MAX_DICE = int(os.getenv('DICE_MAX_DICE', '1000'))
+DICE_MAX_FACES = int(os.getenv('DICE_MAX_FACES', '1000'))
+DICE_MAX_SIMULATED_DICE = int(os.getenv('DICE_MAX_SIMULATED_DICE', '10000000'))
+DICE_MAX_TRIALS = int(os.getenv('DICE_MAX_TRIALS', '10000'))
+
+# Counters of the dice stream of a chat reserved at once by each connection
+
+DICE_COUNTER_BLOCK_SIZE = int(os.getenv('DICE_COUNTER_BLOCK_SIZE', '32'))
+
+# Limits for calculating the exact probability distribution of a dice roll
+
+DICE_DISTRIBUTION_MAX_DICE = int(os.getenv('DICE_DISTRIBUTION_MAX_DICE', '200'))
+DICE_DISTRIBUTION_MAX_OUTCOMES = int(os.getenv('DICE_DISTRIBUTION_MAX_OUTCOMES', '5000'))
+
+# Rolls are stored in batches, every given milliseconds or as soon as the given number of rolls is waiting
+
+ROLL_RECORD_BUFFER_SIZE = int(os.getenv('ROLL_RECORD_BUFFER_SIZE', '100'))
+ROLL_RECORD_BUFFER_LATENCY = int(os.getenv('ROLL_RECORD_BUFFER_LATENCY', '500'))
+
+# Chat Settings
+# Messages older than given days are moved into compressed archives by `manage.py archivechatmessages`
+
+CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv('CHAT_ARCHIVE_AFTER_DAYS', '90'))
+CHAT_ARCHIVE_BATCH_SIZE = int(os.getenv('CHAT_ARCHIVE_BATCH_SIZE', '1000'))
+
+# Seconds presence and unread counters are kept in the channel layer without being refreshed
+
+CHAT_PRESENCE_EXPIRY = int(os.getenv('CHAT_PRESENCE_EXPIRY', '86400'))
+CHAT_UNREAD_EXPIRY = int(os.getenv('CHAT_UNREAD_EXPIRY', '86400'))
+
+# Last messages of every chat kept in the channel layer to replay them on reconnect, longer gaps are read from the
+# database up to the given number of messages
+
+CHAT_REPLAY_BUFFER_SIZE = int(os.getenv('CHAT_REPLAY_BUFFER_SIZE', '100'))
+CHAT_REPLAY_BUFFER_EXPIRY = int(os.getenv('CHAT_REPLAY_BUFFER_EXPIRY', '86400'))
+CHAT_REPLAY_MAX_MESSAGES = int(os.getenv('CHAT_REPLAY_MAX_MESSAGES', '500'))
+
+# Name of this ASGI node, `manage.py drainchat` moves its connections to other nodes for the given seconds and
+# clients have the given seconds to resume their chat elsewhere
+
+CHAT_NODE_NAME = os.getenv('CHAT_NODE_NAME', socket.gethostname())
+CHAT_DRAIN_EXPIRY = int(os.getenv('CHAT_DRAIN_EXPIRY', '120'))
+CHAT_RESUME_TOKEN_MAX_AGE = int(os.getenv('CHAT_RESUME_TOKEN_MAX_AGE', '300'))
+
+# Connections that ask for batches get chat events every given milliseconds or as soon as the given number is waiting
+
+CHAT_BATCH_MAX_LATENCY = int(os.getenv('CHAT_BATCH_MAX_LATENCY', '20'))
+CHAT_BATCH_MAX_SIZE = int(os.getenv('CHAT_BATCH_MAX_SIZE', '50'))
+
+# Token bucket rates for messages and rolls sent through websockets, per connection (by tier) and per chat
+
+CHAT_THROTTLE_RATES = {
+    'connection': os.getenv('CHAT_CONNECTION_THROTTLE_RATE', '5/s'),
+    'connection_premium': os.getenv('CHAT_CONNECTION_PREMIUM_THROTTLE_RATE', '10/s'),
+    'chat': os.getenv('CHAT_THROTTLE_RATE', '30/s'),
+}
+
+# Roleplay Settings
+# Seconds the places of a world are cached, they are refreshed anyway as soon as any of them changes
+
+PLACE_TREE_CACHE_TIMEOUT = int(os.getenv('PLACE_TREE_CACHE_TIMEOUT', '86400'))
+
+# Places inserted per query when importing worlds and read per query when exporting them
+
+PLACE_IMPORT_BATCH_SIZE = int(os.getenv('PLACE_IMPORT_BATCH_SIZE', '1000'))
+PLACE_EXPORT_CHUNK_SIZE = int(os.getenv('PLACE_EXPORT_CHUNK_SIZE', '1000'))
+
+# Bytes of an exported world kept in memory, bigger documents are written to a temporary file before being sent
+
+PLACE_EXPORT_MAX_MEMORY_SIZE = int(os.getenv('PLACE_EXPORT_MAX_MEMORY_SIZE', str(1024 * 1024)))
+
 # Extra stuff just for fun
 SLOGANS = (
     'Being Ahead through Natural 20',
@@ -6,7 +6,7 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.dispatch import receiver
 from django.shortcuts import resolve_url
 from django.utils import timezone
@@ -17,6 +17,8 @@ from common.constants import models as constants
 from common.files.upload import default_upload_to
 from core.models import TracingMixin
 
+from .utils import bot_identity
+
 if TYPE_CHECKING:
     from roleplay.models import Place as PlaceModel
     from roleplay.models import Session as SessionModel
@@ -31,7 +33,7 @@ class User(AbstractUser):
 
     @classmethod
     def get_bot(cls):
-        return cls.objects.get(username='Oil & Rope Bot')
+        return bot_identity.user
 
     @property
     def discord_user(self):
@@ -131,3 +133,34 @@ def create_profile_post_save_receiver(instance, **kwargs):
 
     if kwargs.get('created', False):
         Profile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def bot_identity_receiver(instance, **kwargs):
+    """
+    Forgets the cached Oil & Rope Bot once it changes.
+    """
+
+    if bot_identity.is_bot(instance):
+        bot_identity.clear()
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def bot_identity_profile_receiver(instance, **kwargs):
+    """
+    Forgets the cached Oil & Rope Bot once its profile changes, since it's serialized along with it.
+    """
+
+    if bot_identity.is_bot_id(instance.user_id):
+        bot_identity.clear()
+
+
+@receiver(post_migrate)
+def bot_identity_post_migrate_receiver(**kwargs):
+    """
+    Forgets the cached Oil & Rope Bot when the database is flushed or migrated, since the bot may be recreated.
+    """
+
+    bot_identity.clear()
@@ -0,0 +1,59 @@
+import copy
+
+from django.apps import apps
+from django.conf import settings
+
+from common.constants import models as constants
+
+
+class BotIdentity:
+    """
+    Resolves the Oil & Rope Bot user just once per process.
+    The user, its identifier and its serialized forms are kept in memory until the bot is saved or deleted.
+    """
+
+    def __init__(self):
+        self._user = None
+        self._data = {}
+
+    @property
+    def user(self):
+        """
+        Bot user, identified by `settings.DEFAULT_FROM_EMAIL`.
+        """
+
+        if self._user is None:
+            User = apps.get_model(constants.REGISTRATION_USER)
+            self._user = User.objects.get(email=settings.DEFAULT_FROM_EMAIL)
+        return self._user
+
+    @property
+    def id(self) -> int:
+        return self.user.pk
+
+    def serialize(self, serializer_class) -> dict:
+        """
+        Returns a copy of the bot serialized by given serializer class, so callers can't change the cached one.
+
+        Parameters
+        ----------
+        serializer_class: :class:`rest_framework.serializers.Serializer`
+            Serializer used to represent the bot.
+        """
+
+        if serializer_class not in self._data:
+            self._data[serializer_class] = serializer_class(self.user).data
+        return copy.deepcopy(self._data[serializer_class])
+
+    def is_bot(self, user) -> bool:
+        return user.email == settings.DEFAULT_FROM_EMAIL or self.is_bot_id(user.pk)
+
+    def is_bot_id(self, user_id: int) -> bool:
+        return self._user is not None and user_id == self._user.pk
+
+    def clear(self):
+        self._user = None
+        self._data = {}
+
+
+bot_identity = BotIdentity()
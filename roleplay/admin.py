@@ -1,5 +1,6 @@
 from django.contrib import admin
-from mptt.admin import DraggableMPTTAdmin
+from django.utils.html import format_html
+from django.utils.translation import gettext_lazy as _
 
 from core.admin import make_private, make_public
 
@@ -17,14 +18,19 @@ class DomainAdmin(admin.ModelAdmin):
 
 
 @admin.register(models.Place)
-class PlaceAdmin(DraggableMPTTAdmin):
+class PlaceAdmin(admin.ModelAdmin):
     date_hierarchy = 'entry_created_at'
-    list_display = ('tree_actions', 'indented_title', '__str__', 'site_type', 'entry_created_at', 'entry_updated_at')
+    list_display = ('indented_title', '__str__', 'site_type', 'entry_created_at', 'entry_updated_at')
     list_display_links = ('indented_title', '__str__')
     list_filter = ('site_type',)
+    ordering = ('tree_id', 'path')
     readonly_fields = ('entry_created_at', 'entry_updated_at')
     search_fields = ['name__icontains']
 
+    @admin.display(description=_('title'))
+    def indented_title(self, obj):
+        return format_html('<div style="text-indent: {}px">{}</div>', obj.level * 20, obj)
+
 
 class PlayerInCampaignInline(admin.TabularInline):
     model = models.PlayerInCampaign
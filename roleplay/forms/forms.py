@@ -12,6 +12,7 @@ from common.files import utils
 from common.forms.mixins import FormCapitalizeMixin
 from common.forms.widgets import DateTimeWidget, DateWidget
 from registration.models import User
+from roleplay.utils.trees import PlaceNode
 
 from .. import enums, models
 from .layout import CampaignFormLayout, PlaceLayout, SessionFormLayout, WorldFormLayout
@@ -22,13 +23,15 @@ Chat = apps.get_model(constants.CHAT)
 
 
 class PlaceForm(forms.ModelForm):
-    def __init__(self, parent_site_queryset=None, submit_text=_('create'), *args, **kwargs):
+    def __init__(self, parent_site_queryset=None, submit_text=_('create'), *args, parent_sites=None, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.fields['parent_site'].label = _('this place belongs to...').capitalize()
         self.fields['parent_site'].required = True
         if parent_site_queryset and isinstance(parent_site_queryset, QuerySet):
             self.fields['parent_site'].queryset = parent_site_queryset
+        if parent_sites is not None:
+            self.set_parent_sites(parent_sites)
 
         # NOTE: Using Meta options `help_texts` does not translate the help text.
         self.fields['image'].help_text = _('A picture is worth a thousand words. Max size file %(max_size)s MiB.') % {
@@ -40,6 +43,15 @@ class PlaceForm(forms.ModelForm):
         self.helper.include_media = True
         self.helper.layout = PlaceLayout(submit_text)
 
+    def set_parent_sites(self, parent_sites: list[PlaceNode]):
+        """
+        Limits parent sites to given places of a cached tree, so they are not read from the database to be rendered.
+        """
+
+        field = self.fields['parent_site']
+        field.queryset = models.Place.objects.filter(pk__in=[node.id for node in parent_sites])
+        field.choices = [('', field.empty_label), *((node.id, node.name) for node in parent_sites)]
+
     class Meta:
         exclude = ('owner', )
         model = models.Place
@@ -0,0 +1,92 @@
+from typing import TYPE_CHECKING
+
+from django.apps import apps
+from django.db.models import F, Q, QuerySet, TextField, Value
+from django.db.models.functions import Concat, Substr
+
+from common.constants import models as constants
+
+if TYPE_CHECKING:
+    from roleplay.models import Place
+
+PATH_SEPARATOR = '.'
+# NOTE: Identifiers are zero padded, so sorting paths sorts siblings by identifier too
+PATH_STEP_LENGTH = 10
+
+
+def make_path(parent_path: str, pk: int) -> str:
+    return f'{parent_path}{pk:0{PATH_STEP_LENGTH}d}{PATH_SEPARATOR}'
+
+
+def split_path(path: str) -> list[int]:
+    return [int(step) for step in path.split(PATH_SEPARATOR) if step]
+
+
+class PathHierarchy:
+    """
+    Answers the tree queries of :class:`~roleplay.models.Place` from the materialized path of every place, the
+    identifiers of its ancestors and its own one. Ancestors are read by primary key and descendants by path prefix,
+    both through an index.
+
+    Paths are the only storage of the tree: they're written by :func:`update_path` (and by world imports), and read
+    by the galleries and trees of worlds too, so there's no other backend to switch to.
+    """
+
+    @property
+    def model(self):
+        return apps.get_model(constants.ROLEPLAY_PLACE)
+
+    def get_ancestors(self, place: 'Place', ascending: bool = False, include_self: bool = False) -> QuerySet:
+        ancestors = split_path(place.path)
+        if not include_self:
+            ancestors = ancestors[:-1]
+        return self.model.objects.filter(pk__in=ancestors).order_by('-path' if ascending else 'path')
+
+    def get_descendants(self, place: 'Place', include_self: bool = False) -> QuerySet:
+        # NOTE: Places without path are not saved yet, an empty prefix would match every place
+        if not place.path:
+            return self.model.objects.none()
+        queryset = self.model.objects.filter(path__startswith=place.path)
+        if not include_self:
+            queryset = queryset.exclude(pk=place.pk)
+        return queryset.order_by('path')
+
+    def get_children(self, place: 'Place') -> QuerySet:
+        return self.model.objects.filter(parent_site=place.pk).order_by('path')
+
+    def get_family(self, place: 'Place') -> QuerySet:
+        if not place.path:
+            return self.model.objects.none()
+        ancestors = split_path(place.path)[:-1]
+        return self.model.objects.filter(Q(pk__in=ancestors) | Q(path__startswith=place.path)).order_by('path')
+
+    def get_root(self, place: 'Place') -> 'Place':
+        if place.parent_site_id is None:
+            return place
+        return self.model.objects.get(pk=split_path(place.path)[0])
+
+
+def update_path(place: 'Place'):
+    """
+    Sets the path, world and level of given place (and of the places inside it, if it was moved) from the ones of its
+    parent, so just the moved places are written instead of renumbering the whole tree.
+    """
+
+    Place = apps.get_model(constants.ROLEPLAY_PLACE)
+    parent_path = ''
+    if place.parent_site_id is not None:
+        parent_path = Place.objects.filter(pk=place.parent_site_id).values_list('path', flat=True).get()
+    path = make_path(parent_path, place.pk)
+    if path == place.path:
+        return
+    steps = split_path(path)
+    tree_id, level = steps[0], len(steps) - 1
+    if place.path:
+        Place.objects.filter(path__startswith=place.path).update(
+            path=Concat(Value(path), Substr('path', len(place.path) + 1), output_field=TextField()),
+            tree_id=tree_id,
+            level=F('level') + level - (len(split_path(place.path)) - 1),
+        )
+    else:
+        Place.objects.filter(pk=place.pk).update(path=path, tree_id=tree_id, level=level)
+    place.path, place.tree_id, place.level = path, tree_id, level
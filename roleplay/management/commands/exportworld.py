@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from roleplay.models import Place
+from roleplay.utils.worlds import FORMATS, export_world
+
+
+class Command(BaseCommand):
+    help = (
+        'Writes a world (or any place) with every place inside it as a JSON or CSV document that can be imported with '
+        '`importworld`. Places are read in chunks, so worlds of any size can be exported.'
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument('place', help='Identifier of the world or place.', type=int)
+        parser.add_argument(
+            '--format',
+            help='Format of the document.',
+            choices=FORMATS,
+            default='json',
+        )
+        parser.add_argument(
+            '--output',
+            help='Path to write the document to, the standard output if not given.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            place = Place.objects.get(pk=options['place'])
+        except Place.DoesNotExist:
+            raise CommandError('Given place does not exist.')
+        if not options['output']:
+            for chunk in export_world(place, options['format']):
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for chunk in export_world(place, options['format']):
+                output.write(chunk)
@@ -0,0 +1,49 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from core.exceptions import OilAndRopeException
+from registration.models import User
+from roleplay.utils.worlds import FORMATS, import_world
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates a world from a JSON or CSV document of places in a single transaction. '
+        'The document is read piece by piece, so worlds of any size can be imported.'
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument('file', help='Path to the document, `-` to read it from the standard input.')
+        parser.add_argument('owner', help='Username of the owner of the world.')
+        parser.add_argument(
+            '--format',
+            help='Format of the document, guessed from the extension of the file if not given.',
+            choices=FORMATS,
+        )
+        parser.add_argument(
+            '--public',
+            help='Makes the world part of the community.',
+            action='store_true',
+        )
+        parser.add_argument(
+            '--batch-size',
+            help='Places inserted per query.',
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError('Given owner does not exist.')
+        format = options['format'] or ('csv' if options['file'].endswith('.csv') else 'json')
+        stream = sys.stdin if options['file'] == '-' else open(options['file'], encoding='utf-8', newline='')
+        try:
+            world, count = import_world(stream, owner, format, options['public'], options['batch_size'])
+        except OilAndRopeException as ex:
+            raise CommandError(ex.message)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(self.style.SUCCESS(f'World {world.pk} imported with {count} places.'))
@@ -1,7 +1,5 @@
 from django.db import models
 from django.utils import timezone
-from mptt.models import TreeManager
-from mptt.querysets import TreeQuerySet
 
 from .enums import DomainTypes, SiteTypes
 
@@ -53,7 +51,7 @@ class SessionQuerySet(models.QuerySet):
 SessionManager = models.Manager.from_queryset(SessionQuerySet)
 
 
-class PlaceQuerySet(TreeQuerySet):
+class PlaceQuerySet(models.QuerySet):
     def community_places(self):
         """
         Union places without user (community).
@@ -67,4 +65,7 @@ class PlaceQuerySet(TreeQuerySet):
         return super().filter(site_type=SiteTypes.WORLD)
 
 
-PlaceManager = TreeManager.from_queryset(PlaceQuerySet)
+class PlaceManager(models.Manager.from_queryset(PlaceQuerySet)):
+    def get_queryset(self):
+        # NOTE: Places are listed in tree order, so every place is followed by the places inside it
+        return super().get_queryset().order_by('tree_id', 'path')
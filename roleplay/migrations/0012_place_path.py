@@ -0,0 +1,32 @@
+# Generated by Django 4.1.2 on 2026-10-17 14:09
+
+from django.db import migrations, models
+
+from common.constants import models as constants
+from roleplay.hierarchy import make_path
+
+
+def generate_paths(apps, schema_editor):
+    # NOTE: Places are sorted by level, so the path of the parent is always ready before its children need it
+    Place = apps.get_model(constants.ROLEPLAY_PLACE)
+    places = list(Place.objects.order_by('level', 'pk').only('id', 'parent_site'))
+    paths = {}
+    for place in places:
+        place.path = paths[place.id] = make_path(paths.get(place.parent_site_id, ''), place.id)
+    Place.objects.bulk_update(places, fields=['path'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roleplay', '0011_remove_place_user_alter_place_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255, verbose_name='path'),
+        ),
+        migrations.RunPython(code=generate_paths, reverse_code=migrations.RunPython.noop),
+    ]
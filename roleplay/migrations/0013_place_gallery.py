@@ -0,0 +1,30 @@
+# Generated by Django 4.1.2 on 2026-10-17 14:12
+
+from django.db import migrations, models
+
+from common.constants import models as constants
+
+
+def generate_galleries(apps, schema_editor):
+    Place = apps.get_model(constants.ROLEPLAY_PLACE)
+    worlds = list(Place.objects.filter(parent_site__isnull=True).only('id', 'path'))
+    for world in worlds:
+        places = Place.objects.filter(path__startswith=world.path).exclude(image='').order_by('path')
+        world.gallery = list(places.values_list('image', flat=True))
+    Place.objects.bulk_update(worlds, fields=['gallery'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roleplay', '0012_place_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='gallery',
+            field=models.JSONField(default=list, editable=False, verbose_name='gallery'),
+        ),
+        migrations.RunPython(code=generate_galleries, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.1.2 on 2026-10-17 14:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from common.constants import models as constants
+from roleplay.hierarchy import split_path
+
+
+def generate_trees(apps, schema_editor):
+    Place = apps.get_model(constants.ROLEPLAY_PLACE)
+    places = list(Place.objects.only('id', 'path'))
+    for place in places:
+        steps = split_path(place.path)
+        place.tree_id, place.level = steps[0], len(steps) - 1
+    Place.objects.bulk_update(places, fields=['tree_id', 'level'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roleplay', '0013_place_gallery'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='place',
+            name='lft',
+        ),
+        migrations.RemoveField(
+            model_name='place',
+            name='rght',
+        ),
+        migrations.AlterField(
+            model_name='place',
+            name='level',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='level'),
+        ),
+        migrations.AlterField(
+            model_name='place',
+            name='parent_site',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children_sites', to='roleplay.place', verbose_name='parent site'),
+        ),
+        migrations.AlterField(
+            model_name='place',
+            name='path',
+            field=models.TextField(db_index=True, default='', editable=False, verbose_name='path'),
+        ),
+        migrations.AlterField(
+            model_name='place',
+            name='tree_id',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='tree'),
+        ),
+        migrations.RunPython(code=generate_trees, reverse_code=migrations.RunPython.noop),
+    ]
@@ -9,7 +9,6 @@ from django.db.models.signals import m2m_changed
 from django.shortcuts import resolve_url
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
-from mptt.models import MPTTModel, TreeForeignKey
 
 from bot.models import Channel
 from common.constants import models as constants
@@ -17,6 +16,7 @@ from common.files.upload import default_upload_to
 from common.validators import validate_file_size
 from core.models import TracingMixin
 from roleplay.enums import RoleplaySystems
+from roleplay.hierarchy import PathHierarchy
 
 from . import managers
 from .enums import ICON_RESOLVERS, DomainTypes, SiteTypes
@@ -64,8 +64,7 @@ class Domain(TracingMixin):
         return f'{self.name} [{domain_type.label.title()}]'
 
 
-# TODO: MPTTModel is unmaintained, we need to change it
-class Place(MPTTModel, TracingMixin):
+class Place(TracingMixin):
     """
     Declares where did the creature grown, how it was, what does it belong to?
     Also used for declaring a World.
@@ -86,12 +85,19 @@ class Place(MPTTModel, TracingMixin):
         The person who created this map.
     is_public: :class:`bool`
         Declares if Place is public.
+    path: :class:`str`
+        Identifiers of the ancestors of the place and its own one, kept up to date on save.
+    tree_id: :class:`int`
+        Identifier of the world the place belongs to, kept up to date on save.
+    level: :class:`int`
+        Number of ancestors of the place, kept up to date on save.
+    gallery: list[:class:`str`]
+        Images of every place of a world, just kept for worlds.
     """
 
+    HIERARCHY = PathHierarchy()
     ICON_RESOLVERS = ICON_RESOLVERS
 
-    objects = managers.PlaceManager()
-
     name = models.CharField(verbose_name=_('name'), max_length=100, null=False, blank=False)
     description = RichTextField(verbose_name=_('description'), null=False, blank=True)
     site_type = models.PositiveSmallIntegerField(
@@ -100,7 +106,7 @@ class Place(MPTTModel, TracingMixin):
     image = models.ImageField(
         verbose_name=_('image'), upload_to=default_upload_to, null=False, blank=True, validators=[validate_file_size]
     )
-    parent_site = TreeForeignKey(
+    parent_site = models.ForeignKey(
         to='self', verbose_name=_('parent site'), on_delete=models.CASCADE, null=True, blank=True,
         related_name='children_sites', db_index=True
     )
@@ -109,21 +115,69 @@ class Place(MPTTModel, TracingMixin):
         db_index=True,
     )
     is_public = models.BooleanField(verbose_name=_('public'), default=False)
+    # NOTE: Paths have no length limit, so trees can be as deep as needed
+    path = models.TextField(verbose_name=_('path'), default='', editable=False, db_index=True)
+    tree_id = models.PositiveIntegerField(verbose_name=_('tree'), default=0, editable=False, db_index=True)
+    level = models.PositiveIntegerField(verbose_name=_('level'), default=0, editable=False)
+    gallery = models.JSONField(verbose_name=_('gallery'), default=list, editable=False)
+
+    objects = managers.PlaceManager()
+
+    class Meta:
+        verbose_name = _('place')
+        verbose_name_plural = _('places')
+        ordering = ['name', '-entry_created_at', '-entry_updated_at']
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        """
+        Validates the place.
+        """
+
+        if self.pk is not None and self.parent_site_id is not None and self.path:
+            parent_path = Place.objects.filter(pk=self.parent_site_id).values_list('path', flat=True).first()
+            if parent_path and parent_path.startswith(self.path):
+                raise ValidationError(_('a place cannot be inside itself.').capitalize())
+
+    def get_absolute_url(self):
+        return resolve_url('roleplay:place:detail', pk=self.pk)
 
     @cached_property
     def images(self):
-        images = []
-        if self.image:
-            images.extend([self.image])
-        images.extend([obj.image for obj in self.get_descendants().filter(image__isnull=False) if obj.image])
-        return images
+        """
+        Images of the place and every place inside it. Worlds read them from their gallery without any query.
+        """
+
+        if self.parent_site_id is None:
+            names = self.gallery
+        else:
+            names = self.get_descendants(include_self=True).exclude(image='').values_list('image', flat=True)
+        field = self._meta.get_field('image')
+        return [field.attr_class(self, field, name) for name in names]
+
+    def get_ancestors(self, ascending=False, include_self=False):
+        return self.HIERARCHY.get_ancestors(self, ascending=ascending, include_self=include_self)
+
+    def get_descendants(self, include_self=False):
+        return self.HIERARCHY.get_descendants(self, include_self=include_self)
+
+    def get_descendant_count(self):
+        return self.get_descendants().count()
+
+    def get_children(self):
+        return self.HIERARCHY.get_children(self)
+
+    def get_family(self):
+        return self.HIERARCHY.get_family(self)
+
+    def get_root(self):
+        return self.HIERARCHY.get_root(self)
 
     def resolve_icon(self):
         return '<i class="{}"></i>'.format(self.ICON_RESOLVERS.get(self.site_type, ''))
 
-    def get_absolute_url(self):
-        return resolve_url('roleplay:place:detail', pk=self.pk)
-
     @property
     def is_house(self):
         return self.site_type == SiteTypes.HOUSE
@@ -196,17 +250,6 @@ class Place(MPTTModel, TracingMixin):
     def is_world(self):
         return self.site_type == SiteTypes.WORLD
 
-    class MPTTMeta:
-        parent_attr = 'parent_site'
-
-    class Meta:
-        verbose_name = _('place')
-        verbose_name_plural = _('places')
-        ordering = ['name', '-entry_created_at', '-entry_updated_at']
-
-    def __str__(self):
-        return self.name
-
 
 class Race(TracingMixin):
     """
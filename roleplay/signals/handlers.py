@@ -1,11 +1,14 @@
 from django.apps import apps
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from django.dispatch import receiver
 
 from common.constants import models as constants
+from roleplay.hierarchy import split_path, update_path
+from roleplay.utils.trees import invalidate_place_tree, schedule_world_gallery_update, update_world_gallery
 
 Chat = apps.get_model(constants.CHAT)
 Campaign = apps.get_model(constants.ROLEPLAY_CAMPAIGN)
+Place = apps.get_model(constants.ROLEPLAY_PLACE)
 
 
 @receiver(pre_save, sender=Campaign)
@@ -20,3 +23,70 @@ def campaign_pre_save(sender, instance, *args, **kwargs):
             name=f'{instance.name} Chat',
             discord_id=instance.discord_channel_id,
         )
+
+
+@receiver(post_init, sender=Place)
+def place_post_init(sender, instance, *args, **kwargs):
+    """
+    Keeps the tree, the parent and the image the place was loaded with, so just what changed is refreshed on save.
+    """
+
+    # NOTE: Read from `__dict__` so deferred fields are not loaded
+    instance._loaded_tree_id = instance.__dict__.get('tree_id')
+    instance._loaded_parent_site_id = instance.__dict__.get('parent_site_id')
+    instance._loaded_image = get_image_name(instance.__dict__.get('image'))
+
+
+@receiver(pre_save, sender=Place)
+def place_pre_save(sender, instance, *args, **kwargs):
+    """
+    Checks the place is not moved inside itself before writing it.
+    """
+
+    if not kwargs.get('raw') and instance.pk is not None and is_place_moved(instance):
+        instance.clean()
+
+
+@receiver(post_save, sender=Place)
+def place_post_save(sender, instance, created, *args, **kwargs):
+    """
+    Updates the path of the place (just if it's new or it was moved) and the gallery of its world (just if its image
+    changed or it was moved), and discards its cached tree (and the ones of its previous world, if it was moved).
+    """
+
+    # NOTE: Fixtures are loaded in any order, so their paths and galleries are taken as they are
+    if not kwargs.get('raw'):
+        loaded_path = instance.path
+        if not instance.path or is_place_moved(instance):
+            update_path(instance)
+        image = get_image_name(instance.image)
+        if image != instance._loaded_image or (created and image) or loaded_path not in ('', instance.path):
+            for world_id in {split_path(path)[0] for path in (loaded_path, instance.path) if path}:
+                gallery = update_world_gallery(world_id)
+                if world_id == instance.pk:
+                    instance.gallery = gallery
+    for tree_id in {instance.tree_id, instance._loaded_tree_id} - {None}:
+        invalidate_place_tree(tree_id)
+    instance._loaded_tree_id = instance.tree_id
+    instance._loaded_parent_site_id = instance.parent_site_id
+    instance._loaded_image = get_image_name(instance.image)
+
+
+@receiver(post_delete, sender=Place)
+def place_post_delete(sender, instance, *args, **kwargs):
+    """
+    Removes the image of the place from the gallery of its world, once for every world however many places are
+    deleted along with it.
+    """
+
+    if instance.parent_site_id is not None and instance.image:
+        schedule_world_gallery_update(split_path(instance.path)[0])
+    invalidate_place_tree(instance.tree_id)
+
+
+def is_place_moved(instance) -> bool:
+    return instance.parent_site_id != instance._loaded_parent_site_id
+
+
+def get_image_name(image) -> str:
+    return getattr(image, 'name', image) or ''
@@ -1,6 +1,13 @@
+import hashlib
+import heapq
 import random
 import re
+import secrets
+import statistics
 from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate
 from typing import Optional
 
 from django.conf import settings
@@ -8,14 +15,102 @@ from django.utils.translation import gettext_lazy as _
 
 from core.exceptions import OilAndRopeException
 
-DICE_ROLL_PATTERN = r'^((\d+|\d*[dD]\d+)([-+](\d+|\d*[dD]\d+))*)$'
+try:
+    import numpy
+except ImportError:
+    # NOTE: NumPy is optional, bulk rolls fall back to `random.choices` blocks
+    numpy = None
+
+# Dice may be followed by modifiers in this order: reroll (`r1`), explode (`!`) and keep/drop (`kh3`, `kl1`, `dl1`...)
+DICE_PATTERN = r'\d*[dD]\d+(?:[rR]\d+)?!?(?:(?:[kK][hHlL]?|[dD][hHlL])\d+)?'
+DICE_ROLL_PATTERN = rf'^((\d+|{DICE_PATTERN})([-+](\d+|{DICE_PATTERN}))*)$'
 DICE_REGEX = re.compile(DICE_ROLL_PATTERN)
 
+# NOTE: Once the whole expression has been validated by `DICE_REGEX` this one is used to tokenize it term by term
+DICE_TERM_REGEX = re.compile(
+    r'(?P<sign>[-+]?)(?:(?P<count>\d*)d(?P<faces>\d+)(?:r(?P<reroll>\d+))?(?P<explode>!)?'
+    r'(?:(?P<selection>kh|kl|k|dh|dl)(?P<selection_count>\d+))?|(?P<number>\d+))'
+)
+
+# Number of compiled plans kept in memory, most used expressions (`1d20`, `4d6`...) will always be here
+PLAN_CACHE_SIZE = 1024
+
+# Maximum number of dice drawn at once by the NumPy backend, bigger simulations are split in chunks of this size
+BULK_CHUNK_SIZE = 2 ** 20
+
+# Percentiles given by default for a probability distribution
+DISTRIBUTION_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Maximum number of times exploding dice are rolled again, so `1d1!` cannot loop forever
+EXPLODE_MAX_ITERATIONS = 100
+
+
+def generate_seed() -> str:
+    """
+    Generates a new random seed (as hexadecimal string) for :class:`CounterRandom` streams.
+    """
+
+    return secrets.token_hex(32)
+
+
+class CounterRandom(random.Random):
+    """
+    Counter-based random generator.
+    Every `(seed, counter)` pair gives an independent and reproducible stream, so a roll can be replayed just by
+    storing the counter used, and reserving a new counter costs nothing compared to storing every rolled die.
+
+    The stream is built hashing the counter and a block index with `BLAKE2b` keyed by the seed.
+
+    Parameters
+    ----------
+    seed: :class:`str`
+        Hexadecimal secret seed, see :func:`generate_seed`.
+    counter: :class:`int`
+        Position of the stream.
+    """
+
+    def __init__(self, seed: str, counter: int):
+        self._key = bytes.fromhex(seed)
+        self.counter = counter
+        super().__init__()
+
+    def seed(self, *args, **kwargs):
+        # NOTE: Stream is fully given by `seed` and `counter`, so seeding just rewinds it
+        self._block = 0
+        self._buffer = b''
+
+    def getstate(self):
+        return self.counter, self._block, self._buffer
+
+    def setstate(self, state):
+        self.counter, self._block, self._buffer = state
+
+    def _read(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            digest = hashlib.blake2b(
+                self.counter.to_bytes(16, 'big') + self._block.to_bytes(8, 'big'), key=self._key,
+            ).digest()
+            self._buffer += digest
+            self._block += 1
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def getrandbits(self, k: int) -> int:
+        if k < 0:
+            raise ValueError('number of bits must be non-negative')
+        value = int.from_bytes(self._read((k + 7) // 8), 'big')
+        return value >> (-k % 8)
+
+    def random(self) -> float:
+        return self.getrandbits(53) * 2 ** -53
+
 
 def is_dice_roll(roll: str) -> Optional[re.Match]:
     """
     Checks by pattern if roll is a valid dice roll.
     This includes `nDy`, `ndy` and mixes with numbers `+` and `-`.
+    Dice can use modifiers such as `4d6kh3` (keep highest), `2d20kl1` (keep lowest), `4d6dl1` (drop lowest),
+    `4d6dh1` (drop highest), `1d6!` (exploding) and `1d20r1` (reroll once values equal or lower than given one).
 
     Parameters
     ----------
@@ -27,6 +122,542 @@ def is_dice_roll(roll: str) -> Optional[re.Match]:
     return matcher
 
 
+@dataclass(frozen=True)
+class DiceTerm:
+    """
+    A single term of a dice expression, either a dice roll (`+2d4`) or a plain number (`-1`).
+
+    Parameters
+    ----------
+    key: :class:`str`
+        Term as written in the expression including its sign, used as key for the results.
+    sign: :class:`int`
+        `1` for additions and `-1` for subtractions.
+    count: :class:`int`
+        Number of dice to roll, for plain numbers this is the number itself.
+    faces: Optional[:class:`int`]
+        Faces of the dice, `None` for plain numbers.
+    reroll: :class:`int`
+        Dice showing this value or lower are rolled once again.
+    explode: :class:`bool`
+        Dice showing its highest face are rolled again and added to the pool.
+    selection: Optional[:class:`str`]
+        Either `kh` (keep highest), `kl` (keep lowest), `dh` (drop highest) or `dl` (drop lowest).
+    selection_count: :class:`int`
+        Number of dice kept or dropped by `selection`.
+    """
+
+    key: str
+    sign: int
+    count: int
+    faces: Optional[int] = None
+    reroll: int = 0
+    explode: bool = False
+    selection: Optional[str] = None
+    selection_count: int = 0
+
+    @property
+    def is_dice(self) -> bool:
+        return self.faces is not None
+
+    @property
+    def has_modifiers(self) -> bool:
+        return bool(self.reroll or self.explode or self.selection)
+
+    @property
+    def max_dice(self) -> int:
+        """
+        Most dice this term can roll, every exploding die may be rolled again up to `EXPLODE_MAX_ITERATIONS` times.
+        """
+
+        if self.explode:
+            return self.count * (EXPLODE_MAX_ITERATIONS + 1)
+        return self.count
+
+    def roll(self, rng: random.Random = random) -> list[int]:
+        """
+        Executes this term and returns all rolled numbers.
+        If keep/drop modifiers are given, only kept dice are returned.
+        """
+
+        if not self.is_dice:
+            return [self.count]
+        # NOTE: `choices` draws the whole pool in a single call instead of calling `randint` once per die
+        values = rng.choices(range(1, self.faces + 1), k=self.count)
+        if self.reroll:
+            values = [rng.randint(1, self.faces) if value <= self.reroll else value for value in values]
+        if self.explode:
+            values = self._explode(values, rng)
+        if self.selection:
+            values = self._select(values)
+        return values
+
+    def _explode(self, values: list[int], rng: random.Random) -> list[int]:
+        faces = range(1, self.faces + 1)
+        exploding = values.count(self.faces)
+        iterations = 0
+        while exploding and iterations < EXPLODE_MAX_ITERATIONS:
+            extra_values = rng.choices(faces, k=exploding)
+            values.extend(extra_values)
+            exploding = extra_values.count(self.faces)
+            iterations += 1
+        return values
+
+    def _select(self, values: list[int]) -> list[int]:
+        # NOTE: Selection algorithms are O(n log k) instead of sorting the whole pool
+        if self.selection == 'kh':
+            return heapq.nlargest(self.selection_count, values)
+        if self.selection == 'kl':
+            return heapq.nsmallest(self.selection_count, values)
+        kept = max(len(values) - self.selection_count, 0)
+        if self.selection == 'dh':
+            return heapq.nsmallest(kept, values)
+        return heapq.nlargest(kept, values)
+
+    def roll_totals(self, trials: int, rng: random.Random = random) -> list[int]:
+        """
+        Executes this term `trials` times and returns the signed total of each trial.
+        Pools are drawn as NumPy arrays if available so no Python object is built per die.
+
+        Parameters
+        ----------
+        trials: :class:`int`
+            Number of times this term is rolled.
+        rng: :class:`random.Random`
+            Random generator used for the rolls, it also seeds the NumPy generator.
+        """
+
+        if not self.is_dice:
+            return [self.sign * self.count] * trials
+        if self.has_modifiers:
+            return [self.sign * sum(self.roll(rng)) for _n in range(trials)]
+        if numpy is not None:
+            return self._roll_totals_numpy(trials, rng)
+        faces = range(1, self.faces + 1)
+        return [self.sign * sum(rng.choices(faces, k=self.count)) for _n in range(trials)]
+
+    def distribution(self) -> tuple[int, tuple[float, ...]]:
+        """
+        Returns the exact probability mass function of this term as the lowest reachable value and the probability of
+        every value from there on.
+        """
+
+        if not self.is_dice:
+            return self.sign * self.count, (1.0, )
+        pmf = pool_distribution(self.count, self.faces)
+        if self.sign < 0:
+            return -self.count * self.faces, pmf[::-1]
+        return self.count, pmf
+
+    def _roll_totals_numpy(self, trials: int, rng: random.Random) -> list[int]:
+        generator = numpy.random.default_rng(rng.getrandbits(64))
+        chunk = max(1, BULK_CHUNK_SIZE // max(self.count, 1))
+        totals = []
+        for start in range(0, trials, chunk):
+            size = min(chunk, trials - start)
+            pool = generator.integers(1, self.faces, size=(size, self.count), endpoint=True, dtype=numpy.int64)
+            totals.extend((pool.sum(axis=1) * self.sign).tolist())
+        return totals
+
+
+@dataclass(frozen=True)
+class RollPlan:
+    """
+    Immutable representation of a compiled dice expression.
+    Plans are built once by :func:`compile_roll` and can be executed as many times as needed without parsing again.
+
+    Parameters
+    ----------
+    expression: :class:`str`
+        Normalized expression the plan was compiled from.
+    terms: tuple[:class:`DiceTerm`]
+        Terms of the expression in order of appearance.
+    """
+
+    expression: str
+    terms: tuple[DiceTerm, ...]
+
+    @property
+    def cost(self) -> 'RollCost':
+        """
+        Estimated cost of executing this plan once.
+        """
+
+        dice_terms = [term for term in self.terms if term.is_dice]
+        return RollCost(
+            terms=len(self.terms),
+            dice=sum(term.max_dice for term in dice_terms),
+            faces=max((term.faces for term in dice_terms), default=0),
+        )
+
+    def get_keys(self, roll: str) -> tuple[str, ...]:
+        """
+        Returns the terms of given expression as written by the user, which only differs from the normalized one in
+        letter case.
+
+        Parameters
+        ----------
+        roll: :class:`str`
+            Expression as written, see :func:`clean_roll`.
+        """
+
+        if roll == self.expression:
+            return tuple(term.key for term in self.terms)
+        # NOTE: Lowercasing keeps every character in place, so spans of the normalized terms match the written ones
+        return tuple(roll[match.start():match.end()] for match in DICE_TERM_REGEX.finditer(self.expression))
+
+    def execute(self, rng: random.Random = random,
+                keys: Optional[tuple[str, ...]] = None) -> tuple[int, defaultdict[str, list[int]]]:
+        """
+        Rolls every term of the plan.
+
+        Parameters
+        ----------
+        rng: :class:`random.Random`
+            Random generator used for the rolls, defaults to the global `random` module.
+        keys: Optional[tuple[:class:`str`]]
+            Key of the results of every term, the normalized terms if not given.
+        """
+
+        total = 0
+        rolls = defaultdict(list)
+        for term, key in zip(self.terms, keys or (term.key for term in self.terms)):
+            values = term.roll(rng)
+            total += term.sign * sum(values)
+            # NOTE: Repeated terms (`1d6+1d6+1d6`) share the key so their values are accumulated
+            rolls[key].extend(values)
+        return total, rolls
+
+    def simulate(self, trials: int, rng: random.Random = random) -> list[int]:
+        """
+        Rolls the whole plan `trials` times and returns the total of each trial.
+        Individual dice are not kept, which makes this suitable for huge pools and Monte Carlo simulations.
+
+        Parameters
+        ----------
+        trials: :class:`int`
+            Number of times the expression is rolled.
+        rng: :class:`random.Random`
+            Random generator used for the rolls, defaults to the global `random` module.
+        """
+
+        totals = [0] * trials
+        for term in self.terms:
+            totals = [total + value for total, value in zip(totals, term.roll_totals(trials, rng))]
+        return totals
+
+
+@dataclass(frozen=True)
+class RollCost:
+    """
+    Size of a dice roll, used to reject expressions that would exhaust the worker before executing them.
+
+    Parameters
+    ----------
+    terms: :class:`int`
+        Number of terms in the expression.
+    dice: :class:`int`
+        Most dice rolled, counting every exploding die as rolled again `EXPLODE_MAX_ITERATIONS` times.
+    faces: :class:`int`
+        Faces of the biggest die.
+    """
+
+    terms: int
+    dice: int
+    faces: int
+
+    def check(self, expression: str, trials: int = 1):
+        """
+        Raises :class:`~core.exceptions.OilAndRopeException` if any limit given by settings is exceeded.
+
+        Parameters
+        ----------
+        expression: :class:`str`
+            Expression this cost belongs to, used for the error message.
+        trials: :class:`int`
+            Times the expression is going to be rolled.
+        """
+
+        limits = (
+            (self.terms, settings.DICE_MAX_TERMS, _('dice roll `%(roll)s` exceeds the limit of %(limit)s terms.')),
+            (self.dice, settings.DICE_MAX_DICE, _('dice roll `%(roll)s` exceeds the limit of %(limit)s dice.')),
+            (self.faces, settings.DICE_MAX_FACES, _('dice roll `%(roll)s` exceeds the limit of %(limit)s faces.')),
+            (
+                self.dice * trials, settings.DICE_MAX_SIMULATED_DICE,
+                _('rolling `%(roll)s` that many times exceeds the limit of %(limit)s dice.'),
+            ),
+        )
+        for value, limit, msg in limits:
+            if value > limit:
+                msg = msg % {'roll': expression, 'limit': limit}
+                raise OilAndRopeException(msg.capitalize())
+
+
+@dataclass(frozen=True)
+class RollSimulation:
+    """
+    Results of rolling an expression several times.
+
+    Parameters
+    ----------
+    expression: :class:`str`
+        Normalized expression rolled.
+    totals: list[:class:`int`]
+        Total of each trial.
+    minimum: :class:`int`
+        Lowest total rolled.
+    maximum: :class:`int`
+        Highest total rolled.
+    mean: :class:`float`
+        Arithmetic mean of the totals.
+    stdev: :class:`float`
+        Population standard deviation of the totals.
+    """
+
+    expression: str
+    totals: list[int]
+    minimum: int
+    maximum: int
+    mean: float
+    stdev: float
+
+
+@dataclass(frozen=True)
+class RollDistribution:
+    """
+    Exact probability distribution of an expression.
+
+    Parameters
+    ----------
+    expression: :class:`str`
+        Normalized expression.
+    minimum: :class:`int`
+        Lowest possible total.
+    pmf: tuple[:class:`float`]
+        Probability of every total from `minimum` to `maximum`.
+    """
+
+    expression: str
+    minimum: int
+    pmf: tuple[float, ...]
+
+    @property
+    def maximum(self) -> int:
+        return self.minimum + len(self.pmf) - 1
+
+    @property
+    def probabilities(self) -> dict[int, float]:
+        return {self.minimum + index: probability for index, probability in enumerate(self.pmf)}
+
+    @property
+    def mean(self) -> float:
+        return sum((self.minimum + index) * probability for index, probability in enumerate(self.pmf))
+
+    @property
+    def variance(self) -> float:
+        mean = self.mean
+        return sum(((self.minimum + index - mean) ** 2) * probability for index, probability in enumerate(self.pmf))
+
+    def percentile(self, percent: float) -> int:
+        """
+        Returns the lowest total whose cumulative probability reaches given percent.
+        """
+
+        threshold = percent / 100
+        for index, cumulative in enumerate(accumulate(self.pmf)):
+            # NOTE: Small tolerance for float rounding on the accumulated probabilities
+            if cumulative >= threshold - 1e-12:
+                return self.minimum + index
+        return self.maximum
+
+    @property
+    def percentiles(self) -> dict[int, int]:
+        return {percent: self.percentile(percent) for percent in DISTRIBUTION_PERCENTILES}
+
+
+def clean_roll(roll: str) -> str:
+    """
+    Removes `settings.BOT_COMMAND_PREFIX` (if given) and dangling whitespaces, keeping the expression as written.
+
+    Parameters
+    ----------
+    roll: :class:`str`
+        Given dice roll pattern.
+    """
+
+    if roll.startswith(f'{settings.BOT_COMMAND_PREFIX}roll'):
+        roll = roll.replace(f'{settings.BOT_COMMAND_PREFIX}roll', '', 1)
+    return roll.strip()
+
+
+def normalize_roll(roll: str) -> str:
+    """
+    Cleans and normalizes the expression so equivalent rolls share the same compiled plan.
+
+    Parameters
+    ----------
+    roll: :class:`str`
+        Given dice roll pattern.
+    """
+
+    return clean_roll(roll).lower()
+
+
+def get_roll_plan(roll: str, trials: int = 1) -> RollPlan:
+    """
+    Normalizes and compiles given expression checking its size against the limits given by settings
+    (`DICE_MAX_LENGTH`, `DICE_MAX_TERMS`, `DICE_MAX_DICE`, `DICE_MAX_FACES` and `DICE_MAX_SIMULATED_DICE`).
+    This is the entry point that must be used before executing any roll coming from users.
+
+    Parameters
+    ----------
+    roll: :class:`str`
+        Given dice roll pattern.
+    trials: :class:`int`
+        Times the expression is going to be rolled.
+    """
+
+    roll = normalize_roll(roll)
+    # NOTE: Length is checked before parsing so huge payloads never reach the regular expressions
+    if len(roll) > settings.DICE_MAX_LENGTH:
+        msg = _('dice roll exceeds the limit of %(limit)s characters.') % {
+            'limit': settings.DICE_MAX_LENGTH,
+        }
+        raise OilAndRopeException(msg.capitalize())
+
+    plan = compile_roll(roll)
+    plan.cost.check(plan.expression, trials)
+    return plan
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def compile_roll(roll: str) -> RollPlan:
+    """
+    Parses given (already normalized) expression into a :class:`RollPlan`.
+    Results are kept in a bounded LRU cache so common expressions are only parsed once.
+
+    Parameters
+    ----------
+    roll: :class:`str`
+        Normalized dice roll pattern, see :func:`normalize_roll`.
+    """
+
+    if not is_dice_roll(roll):
+        msg = _('dice roll `%(roll)s` syntax is incorrect.') % {
+            'roll': roll,
+        }
+        raise OilAndRopeException(msg.capitalize())
+
+    terms = []
+    for match in DICE_TERM_REGEX.finditer(roll):
+        sign = -1 if match['sign'] == '-' else 1
+        if match['faces'] is None:
+            terms.append(DiceTerm(key=match[0], sign=sign, count=int(match['number'])))
+            continue
+        faces = int(match['faces'])
+        if faces < 1:
+            msg = _('dice `%(dice)s` must have at least one face.') % {
+                'dice': match[0],
+            }
+            raise OilAndRopeException(msg.capitalize())
+        count = int(match['count']) if match['count'] else 1
+        # NOTE: `k3` is just a shortcut for `kh3`
+        selection = 'kh' if match['selection'] == 'k' else match['selection']
+        terms.append(DiceTerm(
+            key=match[0],
+            sign=sign,
+            count=count,
+            faces=faces,
+            reroll=int(match['reroll'] or 0),
+            explode=bool(match['explode']),
+            selection=selection,
+            selection_count=int(match['selection_count'] or 0),
+        ))
+    return RollPlan(expression=roll, terms=tuple(terms))
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def pool_distribution(count: int, faces: int) -> tuple[float, ...]:
+    """
+    Returns the probability of every total of rolling `count` dice of `faces` faces, starting at `count`.
+    Each die is convolved in linear time using prefix sums since the distribution of a single die is uniform.
+    Pools are memoized so `100d20` reuses `99d20` and so on.
+
+    Parameters
+    ----------
+    count: :class:`int`
+        Number of dice.
+    faces: :class:`int`
+        Faces of each die.
+    """
+
+    if count == 0:
+        return (1.0, )
+    previous = pool_distribution(count - 1, faces)
+    prefix = list(accumulate(previous, initial=0.0))
+    # NOTE: Probability of total `n` is the sum of the previous `faces` totals, which is a difference of prefix sums
+    upper = prefix[1:] + [prefix[-1]] * (faces - 1)
+    lower = [0.0] * (faces - 1) + prefix[:-1]
+    return tuple((high - low) / faces for high, low in zip(upper, lower))
+
+
+def convolve(first: tuple[float, ...], second: tuple[float, ...]) -> tuple[float, ...]:
+    """
+    Convolves two probability mass functions.
+    """
+
+    result = [0.0] * (len(first) + len(second) - 1)
+    for index, probability in enumerate(first):
+        if not probability:
+            continue
+        for offset, other_probability in enumerate(second):
+            result[index + offset] += probability * other_probability
+    return tuple(result)
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def plan_distribution(plan: RollPlan) -> RollDistribution:
+    """
+    Computes the exact distribution of a compiled plan convolving the distribution of each of its terms.
+    Limits are given by `settings.DICE_DISTRIBUTION_MAX_DICE` and `settings.DICE_DISTRIBUTION_MAX_OUTCOMES`.
+
+    Parameters
+    ----------
+    plan: :class:`RollPlan`
+        Compiled dice roll.
+    """
+
+    if any(term.has_modifiers for term in plan.terms):
+        msg = _('distribution of dice roll `%(roll)s` cannot be calculated since it uses modifiers.') % {
+            'roll': plan.expression,
+        }
+        raise OilAndRopeException(msg.capitalize())
+
+    dice = sum(term.count for term in plan.terms if term.is_dice)
+    outcomes = sum(term.count * (term.faces - 1) for term in plan.terms if term.is_dice) + 1
+    if dice > settings.DICE_DISTRIBUTION_MAX_DICE or outcomes > settings.DICE_DISTRIBUTION_MAX_OUTCOMES:
+        msg = _('dice roll `%(roll)s` is too big to calculate its distribution.') % {
+            'roll': plan.expression,
+        }
+        raise OilAndRopeException(msg.capitalize())
+
+    # NOTE: Dice with same faces and sign are merged into a single pool (`2d6+3d6` is `5d6`) to save convolutions
+    pools = defaultdict(int)
+    minimum = 0
+    for term in plan.terms:
+        if term.is_dice:
+            pools[(term.sign, term.faces)] += term.count
+        else:
+            minimum += term.sign * term.count
+
+    pmf = (1.0, )
+    for (sign, faces), count in pools.items():
+        term_minimum, term_pmf = DiceTerm(key='', sign=sign, count=count, faces=faces).distribution()
+        minimum += term_minimum
+        pmf = term_pmf if len(pmf) == 1 else convolve(pmf, term_pmf)
+    return RollDistribution(expression=plan.expression, minimum=minimum, pmf=pmf)
+
+
 def roll_dice_logic(d_roll: str) -> list[int]:
     """
     This method will execute a dice roll and return the result as a list with all rolled numbers.
@@ -38,14 +669,11 @@ def roll_dice_logic(d_roll: str) -> list[int]:
         E.g. `1d20`, `4D6`, ...
     """
 
-    escaped_d_roll = re.sub(r'[-+]', '', d_roll)
-    d_number, d_face = re.split(r'[dD]', escaped_d_roll)
-    d_face = int(d_face)
-    d_number = int(d_number) if d_number else 1
-    return [random.randint(1, d_face) for _n in range(0, d_number)]
+    plan = get_roll_plan(d_roll.lstrip('+-'))
+    return plan.terms[0].roll()
 
 
-def roll_dice(roll: str) -> tuple[int, defaultdict[str, list[int]]]:
+def roll_dice(roll: str, rng: random.Random = random) -> tuple[int, defaultdict[str, list[int]]]:
     """
     This function separates and executes the rolling, addition and subtraction needed.
     It also checks if roll comes with `settings.BOT_COMMAND_PREFIX` and if so, it will
@@ -55,36 +683,76 @@ def roll_dice(roll: str) -> tuple[int, defaultdict[str, list[int]]]:
     ----------
     roll: :class:`str`
         Given dice roll pattern.
+    rng: :class:`random.Random`
+        Random generator used for the rolls, e.g. a :class:`CounterRandom` to make the roll reproducible.
     """
 
-    if roll.startswith(f'{settings.BOT_COMMAND_PREFIX}roll'):
-        roll = roll.replace(f'{settings.BOT_COMMAND_PREFIX}roll', '').strip()
+    roll = clean_roll(roll)
+    plan = get_roll_plan(roll)
+    # NOTE: Results are keyed by the terms as written (`2D6`), the plan is shared with their normalized version
+    return plan.execute(rng, plan.get_keys(roll))
 
-    if not is_dice_roll(roll):
-        msg = _('dice roll `%(roll)s` syntax is incorrect.') % {
-            'roll': roll,
-        }
+
+def replay_roll(roll: str, seed: str, counter: int) -> tuple[int, defaultdict[str, list[int]]]:
+    """
+    Executes again a roll made with a :class:`CounterRandom` stream, giving exactly the same results.
+
+    Parameters
+    ----------
+    roll: :class:`str`
+        Given dice roll pattern.
+    seed: :class:`str`
+        Seed of the stream.
+    counter: :class:`int`
+        Counter used by the roll.
+    """
+
+    return roll_dice(roll, CounterRandom(seed, counter))
+
+
+def simulate_roll(roll: str, trials: int, rng: random.Random = random) -> RollSimulation:
+    """
+    Rolls given expression `trials` times and returns the totals among some summary stats.
+
+    Parameters
+    ----------
+    roll: :class:`str`
+        Given dice roll pattern.
+    trials: :class:`int`
+        Number of times the expression is rolled, up to `DICE_MAX_TRIALS`.
+    rng: :class:`random.Random`
+        Random generator used for the rolls, defaults to the global `random` module.
+    """
+
+    if trials < 1:
+        msg = _('number of trials must be greater than zero.')
+        raise OilAndRopeException(msg.capitalize())
+    # NOTE: Checked on its own, since rolls without dice (e.g. `5`) cost nothing to roll but still make a total each
+    if trials > settings.DICE_MAX_TRIALS:
+        msg = _('number of trials exceeds the limit of %(limit)s.') % {'limit': settings.DICE_MAX_TRIALS}
         raise OilAndRopeException(msg.capitalize())
 
-    # First of all we separate dice rolls since they work differently
-    dice_rolls = re.findall(r'[-+]?\d*[dD]\d+', roll)
-    dice_rolls_result = defaultdict(list)
-    for d_roll in dice_rolls:
-        dice_rolls_result[d_roll] = roll_dice_logic(d_roll)
-        # NOTE: If we removed rolled dices is easier later to continue the logic
-        roll = roll.replace(d_roll, '')
-
-    # Number rolls are easier since it's just addition or subtraction
-    number_rolls = re.findall(r'[-+]?\d+', roll)
-    for number in number_rolls:
-        dice_rolls_result[number] = [int(number)]
-
-    final_result = 0
-    for key, value in dice_rolls_result.items():
-        # NOTE: Doll doesn't work with negative numbers but list of positive int, we just sum and subtract
-        if key.startswith('-') and len(value) >= 1:
-            final_result -= sum(value)
-        else:
-            final_result += sum(value)
+    plan = get_roll_plan(roll, trials)
+    totals = plan.simulate(trials, rng)
+    return RollSimulation(
+        expression=plan.expression,
+        totals=totals,
+        minimum=min(totals),
+        maximum=max(totals),
+        mean=statistics.fmean(totals),
+        stdev=statistics.pstdev(totals),
+    )
+
+
+def roll_distribution(roll: str) -> RollDistribution:
+    """
+    Returns the exact probability distribution of given expression.
+
+    Parameters
+    ----------
+    roll: :class:`str`
+        Given dice roll pattern.
+    """
 
-    return final_result, dice_rolls_result
+    plan = get_roll_plan(roll)
+    return plan_distribution(plan)
@@ -0,0 +1,167 @@
+import threading
+import time
+import weakref
+from functools import partial
+from typing import Iterator, NamedTuple, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from common.constants import models as constants
+from roleplay.hierarchy import make_path
+
+TREE_VERSION_KEY = 'roleplay:place_tree_version:{tree_id}'
+TREE_KEY = 'roleplay:place_tree:{tree_id}:{version}'
+
+# NOTE: Gallery updates waiting for the transaction of the thread (as connections are) to be committed, by world
+_pending_gallery_updates = threading.local()
+
+
+class PlaceNode(NamedTuple):
+    id: int
+    parent: Optional[int]
+    name: str
+    site_type: int
+    image: str
+    level: int
+
+
+class PlaceTree:
+    """
+    Compact list of the places of a world in tree order, so every place is followed by the places inside it.
+
+    Parameters
+    ----------
+    tree_id: :class:`int`
+        Identifier of the world of the tree.
+    version: :class:`int`
+        Stamp of the tree when it was read, it changes every time any of its places changes.
+    nodes: list[:class:`PlaceNode`]
+        Places of the tree.
+    """
+
+    def __init__(self, tree_id: int, version: int, nodes: list[PlaceNode]):
+        self.tree_id = tree_id
+        self.version = version
+        self.nodes = nodes
+
+    def __iter__(self) -> Iterator[PlaceNode]:
+        return iter(self.nodes)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def ids(self) -> list[int]:
+        return [node.id for node in self.nodes]
+
+    def get_descendants(self, place_id: int, include_self: bool = False,
+                        depth: Optional[int] = None) -> list[PlaceNode]:
+        """
+        Returns the places inside given place, up to `depth` levels below it if given.
+        """
+
+        index = next((index for index, node in enumerate(self.nodes) if node.id == place_id), None)
+        if index is None:
+            return []
+        place = self.nodes[index]
+        descendants = [place] if include_self else []
+        for node in self.nodes[index + 1:]:
+            # NOTE: Descendants go right after the place, the first place not below it is out of its subtree
+            if node.level <= place.level:
+                break
+            if depth is None or node.level - place.level <= depth:
+                descendants.append(node)
+        return descendants
+
+
+def get_place_tree_version(tree_id: int) -> int:
+    """
+    Returns the stamp of the current version of given tree.
+    """
+
+    key = TREE_VERSION_KEY.format(tree_id=tree_id)
+    version = cache.get(key)
+    if version is None:
+        # NOTE: Versions are stamps instead of counters, so a lost version never brings back an older tree
+        version = time.time_ns()
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def get_place_tree_cache_key(tree_id: int, *parts) -> str:
+    """
+    Returns a key to cache data built from the current version of given tree, so it's discarded along with it.
+    """
+
+    key = TREE_KEY.format(tree_id=tree_id, version=get_place_tree_version(tree_id))
+    return ':'.join(str(part) for part in (key, *parts))
+
+
+def get_place_tree(tree_id: int) -> PlaceTree:
+    """
+    Returns the places of given tree, reading them just when any of them changed since the last time.
+    """
+
+    version = get_place_tree_version(tree_id)
+    key = TREE_KEY.format(tree_id=tree_id, version=version)
+    nodes = cache.get(key)
+    if nodes is None:
+        Place = apps.get_model(constants.ROLEPLAY_PLACE)
+        rows = Place.objects.filter(tree_id=tree_id).order_by('path').values_list(
+            'id', 'parent_site_id', 'name', 'site_type', 'image', 'level',
+        )
+        nodes = [PlaceNode(*row) for row in rows]
+        cache.set(key, nodes, timeout=settings.PLACE_TREE_CACHE_TIMEOUT)
+    return PlaceTree(tree_id, version, nodes)
+
+
+def invalidate_place_tree(tree_id: int):
+    """
+    Stamps given tree with a new version, so every cached data of the older one is discarded.
+    """
+
+    key = TREE_VERSION_KEY.format(tree_id=tree_id)
+    cache.set(key, time.time_ns(), timeout=None)
+    # NOTE: Stamped again on commit, since other requests still read (and cache) the old tree until then
+    transaction.on_commit(lambda: cache.set(key, time.time_ns(), timeout=None))
+
+
+def update_world_gallery(world_id: int) -> list[str]:
+    """
+    Stores the images of every place of given world in its gallery, so they are read along with the world.
+    """
+
+    Place = apps.get_model(constants.ROLEPLAY_PLACE)
+    places = Place.objects.filter(path__startswith=make_path('', world_id)).exclude(image='').order_by('path')
+    gallery = list(places.values_list('image', flat=True))
+    Place.objects.filter(pk=world_id).update(gallery=gallery)
+    return gallery
+
+
+def run_world_gallery_update(world_id: int):
+    get_pending_gallery_updates().pop(world_id, None)
+    update_world_gallery(world_id)
+
+
+def get_pending_gallery_updates() -> weakref.WeakValueDictionary:
+    if not hasattr(_pending_gallery_updates, 'callbacks'):
+        _pending_gallery_updates.callbacks = weakref.WeakValueDictionary()
+    return _pending_gallery_updates.callbacks
+
+
+def schedule_world_gallery_update(world_id: int):
+    """
+    Updates the gallery of given world once the current transaction is committed, just once however many of its
+    places change in the meantime (e.g. when a place is deleted along with every place inside it).
+    """
+
+    pending = get_pending_gallery_updates()
+    if world_id in pending:
+        return
+    # NOTE: Callbacks are weakly referenced, so the ones discarded by a rollback are not pending anymore
+    callback = pending[world_id] = partial(run_world_gallery_update, world_id)
+    transaction.on_commit(callback)
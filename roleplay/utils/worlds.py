@@ -0,0 +1,245 @@
+import csv
+import io
+import json
+import posixpath
+import re
+import tempfile
+from typing import BinaryIO, Iterable, Iterator, Optional, TextIO
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from common.constants import models as constants
+from core.exceptions import OilAndRopeException
+from roleplay.enums import SiteTypes
+from roleplay.hierarchy import make_path, split_path
+from roleplay.utils.trees import invalidate_place_tree, update_world_gallery
+
+FIELDS = ('id', 'parent', 'name', 'description', 'site_type', 'image')
+FORMATS = ('json', 'csv')
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def read_json_places(stream: TextIO, chunk_size: int = 65536) -> Iterator[dict]:
+    """
+    Parses a JSON array of places piece by piece, yielding every place as soon as it's read so the document is never
+    fully loaded in memory.
+    """
+
+    buffer = stream.read(chunk_size).lstrip()
+    if not buffer:
+        return
+    if not buffer.startswith('['):
+        raise OilAndRopeException(_('world document is not valid JSON.').capitalize())
+    decoder = json.JSONDecoder()
+    position = 1
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            place, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # NOTE: Place is split between chunks, it's decoded again along with the next chunk
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                raise OilAndRopeException(_('world document is not valid JSON.').capitalize())
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield place
+
+
+def read_csv_places(stream: TextIO) -> Iterator[dict]:
+    for row in csv.DictReader(stream):
+        yield {field: value for field, value in row.items() if value != ''}
+
+
+def read_places(stream: TextIO, format: str) -> Iterator[dict]:
+    if format == 'csv':
+        return read_csv_places(stream)
+    return read_json_places(stream)
+
+
+def clean_place(place: dict, number: int) -> dict:
+    """
+    Validates a place of a world document, returning its values.
+    """
+
+    msg = _('place #%(number)s is not valid.') % {'number': number}
+    if not isinstance(place, dict) or place.get('id') in (None, ''):
+        raise OilAndRopeException(msg.capitalize())
+    name = place.get('name')
+    if not isinstance(name, str) or not name or len(name) > 100:
+        raise OilAndRopeException(msg.capitalize())
+    try:
+        site_type = int(place.get('site_type', SiteTypes.TOWN))
+    except (TypeError, ValueError):
+        raise OilAndRopeException(msg.capitalize())
+    if site_type not in SiteTypes.values:
+        raise OilAndRopeException(msg.capitalize())
+    image = str(place.get('image') or '')
+    if image and not is_place_image(image):
+        raise OilAndRopeException(msg.capitalize())
+    parent = place.get('parent')
+    return {
+        'id': str(place['id']),
+        'parent': str(parent) if parent not in (None, '') else None,
+        'name': name,
+        'description': str(place.get('description') or ''),
+        'site_type': site_type,
+        'image': image,
+    }
+
+
+def is_place_image(image: str) -> bool:
+    """
+    Checks given image fits in its field and it's a path inside the upload directory of places, so documents can't
+    point to any other file of the storage.
+    """
+
+    Place = apps.get_model(constants.ROLEPLAY_PLACE)
+    directory = f'{Place._meta.app_label}/{Place._meta.model_name}/'
+    if len(image) > Place._meta.get_field('image').max_length:
+        return False
+    return posixpath.normpath(image) == image and image.startswith(directory) and len(image) > len(directory)
+
+
+def import_world(stream: TextIO, owner, format: str = 'json', is_public: bool = False,
+                 batch_size: Optional[int] = None) -> tuple:
+    """
+    Creates a world from a document of places, parents always before their children, in a single transaction.
+    Places are inserted in batches and the gallery of the world is updated just once at the end.
+    Returns the world and the number of places created.
+
+    Parameters
+    ----------
+    stream: :class:`TextIO`
+        Document with the places, either a JSON array of objects or a CSV file, both with fields `id`, `parent`,
+        `name`, `description`, `site_type` and `image`. The first place is the world.
+    owner: :class:`~registration.models.User`
+        Owner of every place.
+    format: :class:`str`
+        Either `json` or `csv`.
+    is_public: :class:`bool`
+        Whether the places belong to the community.
+    batch_size: Optional[:class:`int`]
+        Places inserted per query, `PLACE_IMPORT_BATCH_SIZE` if not given.
+    """
+
+    Place = apps.get_model(constants.ROLEPLAY_PLACE)
+    batch_size = batch_size or settings.PLACE_IMPORT_BATCH_SIZE
+    with transaction.atomic():
+        world = None
+        # NOTE: Identifier and path of every place inserted, by its identifier in the document
+        inserted = {}
+        batch = {}
+        for number, place in enumerate(read_places(stream, format), start=1):
+            place = clean_place(place, number)
+            if place['id'] in inserted or place['id'] in batch:
+                msg = _('place #%(number)s is not valid.') % {'number': number}
+                raise OilAndRopeException(msg.capitalize())
+            values = {key: place[key] for key in ('name', 'description', 'site_type', 'image')}
+            if world is None:
+                if place['parent'] is not None:
+                    msg = _('place #%(number)s belongs to an unknown place.') % {'number': number}
+                    raise OilAndRopeException(msg.capitalize())
+                # NOTE: World is created as any other place, so it gets its own tree
+                world = Place.objects.create(owner=owner, is_public=is_public, **values)
+                inserted[place['id']] = (world.pk, world.path)
+                continue
+            if place['parent'] in batch:
+                # NOTE: Parent must be inserted to know its identifier
+                insert_places(batch, inserted)
+                batch = {}
+            if place['parent'] not in inserted:
+                msg = _('place #%(number)s belongs to an unknown place.') % {'number': number}
+                raise OilAndRopeException(msg.capitalize())
+            parent_pk, parent_path = inserted[place['parent']]
+            batch[place['id']] = (parent_path, Place(
+                owner=owner, is_public=is_public, parent_site_id=parent_pk, tree_id=world.tree_id,
+                level=len(split_path(parent_path)), **values,
+            ))
+            if len(batch) >= batch_size:
+                insert_places(batch, inserted)
+                batch = {}
+        if world is None:
+            raise OilAndRopeException(_('world document is empty.').capitalize())
+        insert_places(batch, inserted)
+        update_world_gallery(world.pk)
+        invalidate_place_tree(world.tree_id)
+        world.refresh_from_db()
+    return world, len(inserted)
+
+
+def insert_places(batch: dict, inserted: dict):
+    """
+    Inserts given places at once and sets their paths from the ones of their parents.
+    """
+
+    if not batch:
+        return
+    Place = apps.get_model(constants.ROLEPLAY_PLACE)
+    places = Place.objects.bulk_create([place for parent_path, place in batch.values()])
+    for (key, (parent_path, _place)), place in zip(batch.items(), places):
+        place.path = make_path(parent_path, place.pk)
+        inserted[key] = (place.pk, place.path)
+    Place.objects.bulk_update(places, fields=['path'])
+
+
+def export_world(place, format: str = 'json', chunk_size: Optional[int] = None) -> Iterator[str]:
+    """
+    Writes given place and every place inside it as a document that can be imported again, piece by piece so the
+    world is never fully loaded in memory.
+    """
+
+    Place = apps.get_model(constants.ROLEPLAY_PLACE)
+    chunk_size = chunk_size or settings.PLACE_EXPORT_CHUNK_SIZE
+    rows = Place.objects.filter(path__startswith=place.path).order_by('path').values_list(
+        'id', 'parent_site_id', 'name', 'description', 'site_type', 'image',
+    ).iterator(chunk_size=chunk_size)
+    # NOTE: The exported place is the world of the document, whatever place it belongs to
+    rows = ((pk, parent if pk != place.pk else None, *values) for pk, parent, *values in rows)
+    if format == 'csv':
+        return write_csv_places(rows, chunk_size)
+    return write_json_places(rows, chunk_size)
+
+
+def export_world_document(place, format: str = 'json', chunk_size: Optional[int] = None) -> BinaryIO:
+    """
+    Writes the document of :func:`export_world` to a file, just kept in memory while it's small. So the database is
+    read before the response starts, since ASGI servers send responses from the event loop, where it can't be read.
+    """
+
+    document = tempfile.SpooledTemporaryFile(max_size=settings.PLACE_EXPORT_MAX_MEMORY_SIZE)
+    for chunk in export_world(place, format=format, chunk_size=chunk_size):
+        document.write(chunk.encode('utf-8'))
+    document.seek(0)
+    return document
+
+
+def write_json_places(rows: Iterable[tuple], chunk_size: int) -> Iterator[str]:
+    yield '['
+    separator = '\n'
+    lines = []
+    for row in rows:
+        lines.append(separator + json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False))
+        separator = ',\n'
+        if len(lines) >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines) + '\n]\n'
+
+
+def write_csv_places(rows: Iterable[tuple], chunk_size: int) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    for number, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if number % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -30,6 +30,7 @@ from . import enums, filters, forms
 from .forms.layout import SessionFormLayout
 from .mixins import UserInAllWithRelatedNameMixin
 from .utils.invitations import send_campaign_invitations
+from .utils.trees import get_place_tree
 
 LOGGER = logging.getLogger(__name__)
 
@@ -57,8 +58,9 @@ class PlaceCreateView(LoginRequiredMixin, OwnerRequiredMixin, CreateView):
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
+        parent_site = self.get_parent_site()
         kwargs.update({
-            'parent_site_queryset': self.get_parent_site().get_descendants(include_self=True),
+            'parent_sites': get_place_tree(parent_site.tree_id).get_descendants(parent_site.pk, include_self=True),
         })
         return kwargs
 
@@ -76,7 +78,7 @@ class PlaceUpdateView(LoginRequiredMixin, OwnerRequiredMixin, UpdateView):
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs.update({
-            'parent_site_queryset': self.object.get_root().get_family(),
+            'parent_sites': get_place_tree(self.object.tree_id).nodes,
             'submit_text': _('update'),
         })
         return kwargs
@@ -101,7 +103,9 @@ class PlaceDetailView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['world_structure'] = self.object.get_descendants(include_self=True)
+        context['world_structure'] = get_place_tree(self.object.tree_id).get_descendants(
+            self.object.pk, include_self=True,
+        )
 
         return context
 
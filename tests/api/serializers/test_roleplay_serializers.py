@@ -95,6 +95,36 @@ class TestPlaceSerializer(TestCase):
 
         self.assertEqual(len(children_obj), len(serialized_result['children']))
 
+    def test_serializer_tree_is_built_with_one_query_ok(self):
+        obj = baker.make_recipe('roleplay.place')
+        children = baker.make_recipe('roleplay.place', _quantity=3, parent_site=obj)
+        grandchild = baker.make_recipe('roleplay.place', parent_site=children[1])
+        obj.refresh_from_db()
+
+        with self.assertNumQueries(1):
+            serialized_result = self.serializer(obj).data
+
+        expected_children = list(obj.get_children().values_list('pk', flat=True))
+        self.assertListEqual(expected_children, [child['id'] for child in serialized_result['children']])
+        child = next(child for child in serialized_result['children'] if child['id'] == children[1].pk)
+        self.assertEqual([grandchild.pk], [place['id'] for place in child['children']])
+        self.assertEqual([], child['children'][0]['children'])
+
+    def test_serializer_tree_with_depth_ok(self):
+        obj = baker.make_recipe('roleplay.place')
+        child = baker.make_recipe('roleplay.place', parent_site=obj)
+        baker.make_recipe('roleplay.place', parent_site=child)
+        obj.refresh_from_db()
+
+        serialized_result = self.serializer(obj, context={'depth': 1}).data
+
+        self.assertEqual([child.pk], [place['id'] for place in serialized_result['children']])
+        self.assertListEqual([], serialized_result['children'][0]['children'])
+
+        serialized_result = self.serializer(obj, context={'depth': 0}).data
+
+        self.assertListEqual([], serialized_result['children'])
+
 
 class TestRaceSerializer(TestCase):
     @classmethod
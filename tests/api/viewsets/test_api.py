@@ -1,9 +1,14 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
 from django.shortcuts import resolve_url
+from django.test import override_settings
 from model_bakery import baker
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from api import get_version
+from core.throttling import get_token_buckets
 
 
 class TestApiVersionView(APITestCase):
@@ -170,6 +175,211 @@ class TestRollView(APITestCase):
 
         self.assertEqual(status.HTTP_200_OK, response.status_code)
 
+    def test_user_logged_post_method_with_too_many_dice_ko(self):
+        self.client.force_login(self.user)
+        data = {
+            'roll': '999999999d999999999',
+        }
+        response = self.client.post(self.url, data=data)
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertListEqual(
+            [f'Dice roll `999999999d999999999` exceeds the limit of {settings.DICE_MAX_DICE} dice.'],
+            response.json(),
+        )
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'roll': '2/min', 'roll_premium': '3/min'},
+})
+class TestRollViewThrottling(APITestCase):
+    resolver = 'api:utils:roll_dice'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make_recipe('registration.user')
+        cls.premium_user = baker.make_recipe('registration.premium_user')
+        cls.url = resolve_url(cls.resolver)
+
+    def setUp(self):
+        async_to_sync(get_token_buckets(get_channel_layer()).flush)()
+
+    def roll(self, times: int) -> list[int]:
+        return [self.client.post(self.url, data={'roll': '1d20'}).status_code for _ in range(times)]
+
+    def test_requests_are_throttled_ok(self):
+        self.client.force_login(self.user)
+
+        self.assertEqual([status.HTTP_200_OK] * 2 + [status.HTTP_429_TOO_MANY_REQUESTS], self.roll(3))
+
+    def test_throttled_response_has_retry_after_ok(self):
+        self.client.force_login(self.user)
+        self.roll(2)
+        response = self.client.post(self.url, data={'roll': '1d20'})
+
+        self.assertLessEqual(int(response.headers['Retry-After']), 30)
+
+    def test_premium_users_get_premium_rate_ok(self):
+        self.client.force_login(self.premium_user)
+
+        self.assertEqual([status.HTTP_200_OK] * 3 + [status.HTTP_429_TOO_MANY_REQUESTS], self.roll(4))
+
+    def test_users_are_throttled_separately_ok(self):
+        self.client.force_login(self.user)
+        self.roll(2)
+        self.client.force_login(self.premium_user)
+
+        self.assertEqual([status.HTTP_200_OK], self.roll(1))
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'roll': '5/min', 'roll_distribution': '1/min'},
+})
+class TestRollDistributionViewThrottling(APITestCase):
+    resolver = 'api:utils:roll_distribution'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make_recipe('registration.user')
+        cls.url = resolve_url(cls.resolver)
+
+    def setUp(self):
+        async_to_sync(get_token_buckets(get_channel_layer()).flush)()
+
+    def test_requests_are_throttled_ok(self):
+        self.client.force_login(self.user)
+
+        responses = [self.client.post(self.url, data={'roll': '2d6'}).status_code for _ in range(2)]
+
+        self.assertEqual([status.HTTP_200_OK, status.HTTP_429_TOO_MANY_REQUESTS], responses)
+
+    def test_rolls_are_throttled_separately_ok(self):
+        self.client.force_login(self.user)
+        self.client.post(self.url, data={'roll': '2d6'})
+
+        response = self.client.post(resolve_url('api:utils:roll_dice'), data={'roll': '2d6'})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+
+class TestRollDistributionView(APITestCase):
+    resolver = 'api:utils:roll_distribution'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make_recipe('registration.user')
+        cls.url = resolve_url(cls.resolver)
+
+    def test_anonymous_access_ko(self):
+        response = self.client.post(self.url)
+
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+
+    def test_user_logged_get_method_ko(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+
+        self.assertEqual(status.HTTP_405_METHOD_NOT_ALLOWED, response.status_code)
+
+    def test_user_logged_post_method_with_invalid_data_ko(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, data={'roll': '1d20+'})
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertListEqual(['Dice roll `1d20+` syntax is incorrect.'], response.json())
+
+    def test_user_logged_post_method_too_big_roll_ko(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, data={'roll': '300d20'})
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertListEqual(['Dice roll `300d20` is too big to calculate its distribution.'], response.json())
+
+    def test_user_logged_post_method_with_valid_data_ok(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, data={'roll': '2d4+1'})
+        data = response.json()
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(3, data['minimum'])
+        self.assertEqual(9, data['maximum'])
+        self.assertAlmostEqual(6.0, data['mean'])
+        self.assertAlmostEqual(2.5, data['variance'])
+        self.assertAlmostEqual(0.25, data['distribution']['6'])
+        self.assertEqual(6, data['percentiles']['50'])
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'roll': '5/min', 'roll_simulation': '1/min'},
+})
+class TestRollSimulationViewThrottling(APITestCase):
+    resolver = 'api:utils:roll_simulation'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make_recipe('registration.user')
+        cls.url = resolve_url(cls.resolver)
+
+    def setUp(self):
+        async_to_sync(get_token_buckets(get_channel_layer()).flush)()
+
+    def test_requests_are_throttled_ok(self):
+        self.client.force_login(self.user)
+
+        responses = [self.client.post(self.url, data={'roll': '2d6', 'trials': 10}).status_code for _ in range(2)]
+
+        self.assertEqual([status.HTTP_200_OK, status.HTTP_429_TOO_MANY_REQUESTS], responses)
+
+
+class TestRollSimulationView(APITestCase):
+    resolver = 'api:utils:roll_simulation'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make_recipe('registration.user')
+        cls.url = resolve_url(cls.resolver)
+
+    def test_anonymous_access_ko(self):
+        response = self.client.post(self.url)
+
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+
+    def test_user_logged_get_method_ko(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+
+        self.assertEqual(status.HTTP_405_METHOD_NOT_ALLOWED, response.status_code)
+
+    def test_user_logged_post_method_with_invalid_data_ko(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, data={'roll': '1d20+', 'trials': 10})
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertListEqual(['Dice roll `1d20+` syntax is incorrect.'], response.json())
+
+    @override_settings(DICE_MAX_TRIALS=10)
+    def test_user_logged_post_method_too_many_trials_ko(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, data={'roll': '5', 'trials': 11})
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertListEqual(['Number of trials exceeds the limit of 10.'], response.json())
+
+    def test_user_logged_post_method_with_valid_data_ok(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, data={'roll': '2d4+1', 'trials': 50})
+        data = response.json()
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('2d4+1', data['roll'])
+        self.assertEqual(50, len(data['totals']))
+        self.assertEqual(min(data['totals']), data['minimum'])
+        self.assertEqual(max(data['totals']), data['maximum'])
+        self.assertTrue(3 <= data['minimum'] <= data['mean'] <= data['maximum'] <= 9)
+
 
 class TestAPIDoc(APITestCase):
     redoc_docs_url = resolve_url('api:redoc')
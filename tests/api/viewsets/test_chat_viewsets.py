@@ -1,7 +1,12 @@
+from datetime import timedelta
 from typing import TYPE_CHECKING
+from unittest import mock
 
+from django.utils import timezone
+from freezegun import freeze_time
 from model_bakery import baker
-from rest_framework.status import HTTP_200_OK, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
+from rest_framework.status import (HTTP_200_OK, HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN,
+                                   HTTP_404_NOT_FOUND)
 from rest_framework.test import APITestCase
 
 if TYPE_CHECKING:
@@ -9,6 +14,7 @@ if TYPE_CHECKING:
 
 from django.apps import apps
 
+from chat.archive import archive_messages
 from common.constants import models
 from tests.utils import fake
 
@@ -55,6 +61,85 @@ class TestChatViewSet(APITestCase):
         self.assertEqual(HTTP_404_NOT_FOUND, response.status_code)
 
 
+class TestChatViewSetSummary(APITestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = baker.make_recipe('registration.user')
+        cls.other_user = baker.make_recipe('registration.user')
+        cls.chat = baker.make_recipe('chat.chat')
+        cls.chat.users.add(cls.user, cls.other_user)
+        cls.own_message = baker.make_recipe('chat.message', chat=cls.chat, author=cls.user)
+        cls.messages = baker.make_recipe('chat.message', chat=cls.chat, author=cls.other_user, _quantity=3)
+        cls.url = f'/api/chat/{cls.chat.pk}/'
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_summary_ok(self):
+        response = self.client.get(self.url).json()
+
+        self.assertNotIn('chat_message_set', response)
+        self.assertEqual(4, response['message_count'])
+        self.assertEqual(3, response['unread_count'])
+        self.assertEqual(self.messages[-1].pk, response['last_message']['id'])
+        self.assertEqual(self.messages[-1].message, response['last_message']['message'])
+        self.assertEqual(self.other_user.pk, response['last_message']['author'])
+        self.assertCountEqual([self.user.pk, self.other_user.pk], response['users'])
+
+    def test_empty_chat_summary_ok(self):
+        chat = baker.make_recipe('chat.chat')
+        chat.users.add(self.user)
+        response = self.client.get(f'/api/chat/{chat.pk}/').json()
+
+        self.assertEqual(0, response['message_count'])
+        self.assertEqual(0, response['unread_count'])
+        self.assertIsNone(response['last_message'])
+
+    def test_list_queries_do_not_grow_with_chats_ok(self):
+        for _ in range(3):
+            chat = baker.make_recipe('chat.chat')
+            chat.users.add(self.user)
+            baker.make_recipe('chat.message', chat=chat, _quantity=2)
+        # NOTE: Session, user, count, chats (with summary) and users
+        with self.assertNumQueries(5):
+            self.client.get('/api/chat/')
+
+    def test_read_ok(self):
+        response = self.client.post(f'{self.url}read/')
+
+        self.assertEqual(HTTP_204_NO_CONTENT, response.status_code)
+        self.assertEqual(0, self.client.get(self.url).json()['unread_count'])
+
+    def test_read_up_to_message_ok(self):
+        self.client.post(f'{self.url}read/', data={'message': self.messages[0].pk}, format='json')
+
+        self.assertEqual(2, self.client.get(self.url).json()['unread_count'])
+
+    def test_read_notifies_unread_count_ok(self):
+        with mock.patch('api.viewsets.chat.notify_unread_changes') as mocker_notify:
+            self.client.post(f'{self.url}read/', data={'message': self.messages[0].pk}, format='json')
+
+        mocker_notify.assert_called_once_with(self.chat.pk, self.user.pk, 2)
+
+    def test_read_message_of_other_chat_ko(self):
+        message = baker.make_recipe('chat.message', author=self.user)
+        response = self.client.post(f'{self.url}read/', data={'message': message.pk}, format='json')
+
+        self.assertEqual(HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual(3, self.client.get(self.url).json()['unread_count'])
+
+    def test_read_future_message_ko(self):
+        response = self.client.post(f'{self.url}read/', data={'message': self.messages[-1].pk + 1000}, format='json')
+
+        self.assertEqual(HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_read_non_member_ko(self):
+        chat = baker.make_recipe('chat.chat')
+        response = self.client.post(f'/api/chat/{chat.pk}/read/')
+
+        self.assertEqual(HTTP_404_NOT_FOUND, response.status_code)
+
+
 class TestChatMessageViewSet(APITestCase):
     @classmethod
     def setUpTestData(cls) -> None:
@@ -104,3 +189,159 @@ class TestChatMessageViewSet(APITestCase):
         response = self.client.patch(url, data={'message': fake.sentence()}, format='json')
 
         self.assertEqual(HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_non_member_access_ko(self):
+        chat = baker.make_recipe('chat.chat')
+        baker.make_recipe('chat.message', chat=chat)
+
+        self.client.force_login(self.user)
+        response = self.client.get(f'/api/chat/{chat.pk}/messages/')
+
+        self.assertEqual(HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_non_member_create_ko(self):
+        chat = baker.make_recipe('chat.chat')
+
+        self.client.force_login(self.user)
+        response = self.client.post(f'/api/chat/{chat.pk}/messages/', data={'message': fake.sentence()}, format='json')
+
+        self.assertEqual(HTTP_404_NOT_FOUND, response.status_code)
+        self.assertFalse(ChatMessage.objects.filter(chat=chat).exists())
+
+    def test_list_authors_are_not_queried_per_message_ok(self):
+        baker.make_recipe('chat.message', chat=self.message.chat, _quantity=5)
+        self.client.force_login(self.user)
+        # NOTE: Session, user, membership, count (messages and archives), messages (with authors) and archives
+        with self.assertNumQueries(7):
+            self.client.get(self.url)
+
+
+class TestChatMessageViewSetCursorPagination(APITestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = baker.make_recipe('registration.user')
+        chat = baker.make_recipe('chat.chat')
+        chat.users.add(cls.user)
+        # NOTE: Same creation date for every message, so ties have to be solved by identifier
+        with freeze_time('2022-10-01 12:00:00'):
+            cls.messages = baker.make_recipe('chat.message', chat=chat, _quantity=7)
+        cls.url = f'/api/chat/{chat.pk}/messages/'
+        cls.expected = [message.pk for message in sorted(cls.messages, key=lambda m: m.pk, reverse=True)]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_cursor_pages_ok(self):
+        results = []
+        url = f'{self.url}?cursor=&limit=3'
+        while url:
+            response = self.client.get(url).json()
+            self.assertNotIn('count', response)
+            results.extend(message['id'] for message in response['results'])
+            url = response['next']
+
+        self.assertEqual(self.expected, results)
+
+    def test_cursor_previous_page_ok(self):
+        first_page = self.client.get(f'{self.url}?cursor=&limit=3').json()
+        second_page = self.client.get(first_page['next']).json()
+        previous_page = self.client.get(second_page['previous']).json()
+
+        self.assertIsNone(first_page['previous'])
+        self.assertEqual(first_page['results'], previous_page['results'])
+        self.assertIsNone(previous_page['previous'])
+
+    def test_cursor_sees_no_new_messages_in_older_pages_ok(self):
+        first_page = self.client.get(f'{self.url}?cursor=&limit=3').json()
+        baker.make_recipe('chat.message', chat_id=self.messages[0].chat_id)
+        second_page = self.client.get(first_page['next']).json()
+
+        self.assertEqual(self.expected[3:6], [message['id'] for message in second_page['results']])
+
+    def test_invalid_cursor_ko(self):
+        response = self.client.get(f'{self.url}?cursor={fake.word()}')
+
+        self.assertEqual(HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_limit_offset_is_kept_by_default_ok(self):
+        response = self.client.get(f'{self.url}?limit=3&offset=3').json()
+
+        self.assertEqual(len(self.messages), response['count'])
+        self.assertEqual(self.expected[3:6], [message['id'] for message in response['results']])
+
+
+class TestChatMessageViewSetArchivedHistory(APITestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = baker.make_recipe('registration.user')
+        cls.chat = baker.make_recipe('chat.chat')
+        cls.chat.users.add(cls.user)
+        now = timezone.now()
+        with freeze_time(now - timedelta(days=30)):
+            old_messages = baker.make_recipe('chat.message', chat=cls.chat, _quantity=4)
+        new_messages = baker.make_recipe('chat.message', chat=cls.chat, _quantity=3)
+        archive_messages(now - timedelta(days=1), batch_size=3)
+        cls.url = f'/api/chat/{cls.chat.pk}/messages/'
+        cls.old_messages = old_messages
+        cls.expected = [message.pk for message in reversed(old_messages + new_messages)]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_limit_offset_includes_archived_ok(self):
+        response = self.client.get(f'{self.url}?limit=3&offset=2').json()
+
+        self.assertEqual(len(self.expected), response['count'])
+        self.assertEqual(self.expected[2:5], [message['id'] for message in response['results']])
+
+    def test_cursor_includes_archived_ok(self):
+        results = []
+        url = f'{self.url}?cursor=&limit=2'
+        while url:
+            response = self.client.get(url).json()
+            results.extend(message['id'] for message in response['results'])
+            url = response['next']
+
+        self.assertEqual(self.expected, results)
+
+    def test_archived_messages_of_deleted_authors_ok(self):
+        self.old_messages[0].author.delete()
+        response = self.client.get(f'{self.url}?limit=1&offset={len(self.expected) - 1}')
+
+        self.assertEqual(HTTP_200_OK, response.status_code)
+        self.assertIsNone(response.json()['results'][0]['author'])
+
+    def test_archived_messages_are_counted_in_chat_summary_ok(self):
+        response = self.client.get(f'/api/chat/{self.chat.pk}/').json()
+
+        self.assertEqual(len(self.expected), response['message_count'])
+
+    def test_retrieve_archived_message_ok(self):
+        message = self.old_messages[1]
+        response = self.client.get(f'{self.url}{message.pk}/')
+
+        self.assertEqual(HTTP_200_OK, response.status_code)
+        self.assertEqual(message.message, response.json()['message'])
+        self.assertEqual(message.author_id, response.json()['author']['id'])
+
+    def test_retrieve_message_of_other_chat_ko(self):
+        message = baker.make_recipe('chat.message')
+        response = self.client.get(f'{self.url}{message.pk}/')
+
+        self.assertEqual(HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_read_up_to_archived_message_ok(self):
+        response = self.client.post(
+            f'/api/chat/{self.chat.pk}/read/', data={'message': self.old_messages[1].pk}, format='json',
+        )
+
+        self.assertEqual(HTTP_204_NO_CONTENT, response.status_code)
+        self.assertEqual(3, self.client.get(f'/api/chat/{self.chat.pk}/').json()['unread_count'])
+
+    def test_chat_summary_last_message_is_archived_ok(self):
+        ChatMessage.objects.filter(chat=self.chat).delete()
+        response = self.client.get(f'/api/chat/{self.chat.pk}/').json()
+
+        self.assertEqual(self.old_messages[-1].pk, response['last_message']['id'])
+        self.assertEqual(self.old_messages[-1].message, response['last_message']['message'])
+        self.assertEqual(self.old_messages[-1].author_id, response['last_message']['author'])
@@ -1,16 +1,23 @@
+import csv
+import io
+import json
 from typing import TYPE_CHECKING
 
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.shortcuts import resolve_url
 from model_bakery import baker
-from rest_framework.status import HTTP_200_OK, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
+from rest_framework.status import (HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN,
+                                   HTTP_404_NOT_FOUND)
 from rest_framework.test import APITestCase
 
 from roleplay.enums import SiteTypes
+from roleplay.models import Place
 from tests.utils import generate_place
 
 if TYPE_CHECKING:
     from registration.models import User
-    from roleplay.models import Campaign, Place
+    from roleplay.models import Campaign
 
 
 class TestCampaignViewSet(APITestCase):
@@ -79,3 +86,74 @@ class TestPlaceNestedViewSet(APITestCase):
         response = self.client.get(self.url)
 
         self.assertEqual(HTTP_200_OK, response.status_code)
+
+    def test_retrieve_with_depth_ok(self):
+        generate_place(owner=self.owner, parent_site=self.private_place)
+        url = resolve_url(self.resolver, pk=self.private_world.pk)
+        self.client.force_login(self.owner)
+
+        response = self.client.get(url, {'depth': 1})
+        children = response.json()['children']
+
+        self.assertEqual([self.private_place.pk], [child['id'] for child in children])
+        self.assertEqual([], children[0]['children'])
+
+    def test_retrieve_with_invalid_depth_ok(self):
+        generate_place(owner=self.owner, parent_site=self.private_place)
+        url = resolve_url(self.resolver, pk=self.private_world.pk)
+        self.client.force_login(self.owner)
+
+        response = self.client.get(url, {'depth': 'all'})
+
+        self.assertEqual(1, len(response.json()['children'][0]['children']))
+
+    def test_import_world_ok(self):
+        document = SimpleUploadedFile('world.json', json.dumps([
+            {'id': 1, 'name': 'Earth', 'site_type': SiteTypes.WORLD},
+            {'id': 2, 'parent': 1, 'name': 'Europe', 'site_type': SiteTypes.CONTINENT},
+        ]).encode())
+        self.client.force_login(self.owner)
+
+        response = self.client.post(resolve_url('api:roleplay:place-import-world'), {'file': document})
+
+        self.assertEqual(HTTP_201_CREATED, response.status_code)
+        self.assertEqual(2, response.json()['places'])
+        self.assertEqual(self.owner, Place.objects.get(pk=response.json()['id']).owner)
+
+    def test_import_invalid_world_ko(self):
+        document = SimpleUploadedFile('world.csv', b'id,parent,name\n1,2,Earth\n')
+        self.client.force_login(self.owner)
+
+        response = self.client.post(resolve_url('api:roleplay:place-import-world'), {'file': document})
+
+        self.assertEqual(HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_export_world_ok(self):
+        self.client.force_login(self.owner)
+
+        response = self.client.get(resolve_url('api:roleplay:place-export-world', pk=self.private_world.pk))
+        places = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual(HTTP_200_OK, response.status_code)
+        self.assertListEqual([self.private_world.pk, self.private_place.pk], [place['id'] for place in places])
+
+    async def test_export_world_asgi_ok(self):
+        await sync_to_async(self.async_client.force_login)(self.owner)
+
+        response = await self.async_client.get(
+            resolve_url('api:roleplay:place-export-world', pk=self.private_world.pk), {'file_format': 'csv'},
+        )
+        places = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+        self.assertEqual(HTTP_200_OK, response.status_code)
+        self.assertEqual(f'attachment; filename="place-{self.private_world.pk}.csv"', response['Content-Disposition'])
+        self.assertListEqual(
+            [str(self.private_world.pk), str(self.private_place.pk)], [place['id'] for place in places],
+        )
+
+    def test_export_non_accessible_world_ko(self):
+        self.client.force_login(self.owner)
+
+        response = self.client.get(resolve_url('api:roleplay:place-export-world', pk=self.non_accessible_place.pk))
+
+        self.assertEqual(HTTP_404_NOT_FOUND, response.status_code)
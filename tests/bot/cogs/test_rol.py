@@ -15,6 +15,17 @@ async def test_roll_bad_syntax_ko(bot):
     ), 'Bad syntax passes'
 
 
+@pytest.mark.asyncio
+async def test_roll_too_many_dice_ko(bot, settings):
+    settings.DICE_MAX_DICE = 10
+    roll = f'{bot.command_prefix}roll 11d6'
+    await dpytest.message(roll)
+
+    assert dpytest.verify().message().content(
+        content='Dice roll `11d6` exceeds the limit of 10 dice.'
+    ), 'Too many dice passes'
+
+
 @pytest.mark.asyncio
 async def test_roll_ok(bot):
     roll = f'{bot.command_prefix}roll 20'
@@ -0,0 +1,39 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from freezegun import freeze_time
+from model_bakery import baker
+
+from common.constants import models as constants
+
+ChatArchive = apps.get_model(constants.CHAT_ARCHIVE)
+ChatMessage = apps.get_model(constants.CHAT_MESSAGE)
+
+
+class TestArchiveChatMessagesCommand(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.chat = baker.make_recipe('chat.chat')
+        with freeze_time(timezone.now() - timedelta(days=30)):
+            baker.make_recipe('chat.message', chat=cls.chat, _quantity=2)
+        cls.message = baker.make_recipe('chat.message', chat=cls.chat)
+
+    def test_call_command_ok(self):
+        out = StringIO()
+        call_command('archivechatmessages', '--days', '10', stdout=out)
+
+        self.assertEqual('2 messages archived.\n', out.getvalue())
+        self.assertEqual([self.message.pk], list(ChatMessage.objects.values_list('pk', flat=True)))
+        self.assertEqual(2, ChatArchive.objects.get(chat=self.chat).message_count)
+
+    def test_call_command_nothing_to_archive_ok(self):
+        out = StringIO()
+        call_command('archivechatmessages', '--days', '60', stdout=out)
+
+        self.assertEqual('0 messages archived.\n', out.getvalue())
+        self.assertEqual(3, ChatMessage.objects.count())
@@ -0,0 +1,31 @@
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.management import call_command
+from django.test import TestCase
+
+from chat.state import get_chat_state
+
+
+class TestDrainChatCommand(TestCase):
+
+    def setUp(self):
+        self.state = get_chat_state(get_channel_layer())
+        async_to_sync(self.state.flush)()
+
+    def test_call_command_ok(self):
+        out = StringIO()
+        call_command('drainchat', '--node', 'node-1', stdout=out)
+
+        self.assertEqual('Node node-1 drained.\n', out.getvalue())
+        self.assertTrue(async_to_sync(self.state.is_draining)('node-1'))
+        self.assertFalse(async_to_sync(self.state.is_draining)('node-2'))
+
+    def test_call_command_cancel_ok(self):
+        call_command('drainchat', '--node', 'node-1', stdout=StringIO())
+        out = StringIO()
+        call_command('drainchat', '--node', 'node-1', '--cancel', stdout=out)
+
+        self.assertEqual('Node node-1 accepts connections.\n', out.getvalue())
+        self.assertFalse(async_to_sync(self.state.is_draining)('node-1'))
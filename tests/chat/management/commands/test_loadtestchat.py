@@ -0,0 +1,30 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase
+from model_bakery import baker
+
+
+class TestLoadTestChatCommand(TransactionTestCase):
+
+    def setUp(self):
+        self.chat = baker.make_recipe('chat.chat')
+        self.user = baker.make_recipe('registration.user')
+        self.chat.users.add(self.user)
+
+    def test_call_command_ok(self):
+        out = StringIO()
+        call_command(
+            'loadtestchat', self.chat.pk, self.user.username, '--connections', '1', '5', '--messages', '3', stdout=out,
+        )
+        lines = out.getvalue().splitlines()
+
+        self.assertEqual(2, len(lines))
+        self.assertTrue(lines[0].startswith('1 connections: 3 frames in '))
+        self.assertTrue(lines[1].startswith('5 connections: 15 frames in '))
+
+    def test_call_command_not_member_ko(self):
+        user = baker.make_recipe('registration.user')
+
+        with self.assertRaisesMessage(CommandError, 'Given user is not member of given chat.'):
+            call_command('loadtestchat', self.chat.pk, user.username, stdout=StringIO())
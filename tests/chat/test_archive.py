@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.exceptions import ObjectDoesNotExist
+from django.test import TestCase
+from django.utils import timezone
+from freezegun import freeze_time
+from model_bakery import baker
+
+from chat.archive import ChatHistory, archive_messages, dump_messages, load_messages
+from common.constants import models as constants
+
+ChatArchive = apps.get_model(constants.CHAT_ARCHIVE)
+ChatMessage = apps.get_model(constants.CHAT_MESSAGE)
+
+
+class ArchivedMessagesMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.chat = baker.make_recipe('chat.chat')
+        cls.now = timezone.now()
+        cls.old_messages = []
+        for days in range(10, 3, -1):
+            with freeze_time(cls.now - timedelta(days=days)):
+                cls.old_messages.append(baker.make_recipe('chat.message', chat=cls.chat))
+        cls.new_messages = baker.make_recipe('chat.message', chat=cls.chat, _quantity=3)
+        cls.expected = [message.pk for message in reversed(cls.old_messages + cls.new_messages)]
+
+
+class TestArchiveMessages(ArchivedMessagesMixin, TestCase):
+
+    def test_dump_and_load_messages_ok(self):
+        archive = ChatArchive(chat=self.chat, data=dump_messages(self.new_messages))
+        messages = load_messages(archive)
+
+        self.assertEqual(
+            [(m.pk, m.author_id, m.message, m.entry_created_at) for m in self.new_messages],
+            [(m.pk, m.author_id, m.message, m.entry_created_at) for m in messages],
+        )
+
+    def test_archive_messages_ok(self):
+        archived = archive_messages(self.now - timedelta(days=1), batch_size=3)
+
+        self.assertEqual(len(self.old_messages), archived)
+        self.assertEqual(3, ChatArchive.objects.filter(chat=self.chat).count())
+        self.assertEqual(
+            [m.pk for m in self.new_messages],
+            list(ChatMessage.objects.filter(chat=self.chat).order_by('pk').values_list('pk', flat=True)),
+        )
+        archive = ChatArchive.objects.filter(chat=self.chat).order_by('first_message_at').first()
+        self.assertEqual(3, archive.message_count)
+        self.assertEqual(self.old_messages[0].pk, archive.first_message_id)
+        self.assertEqual([m.pk for m in self.old_messages[:3]], [m.pk for m in load_messages(archive)])
+
+    def test_archive_messages_of_other_chats_ok(self):
+        chat = baker.make_recipe('chat.chat')
+
+        self.assertEqual(0, archive_messages(self.now - timedelta(days=1), batch_size=3, chats=[chat]))
+        self.assertFalse(ChatArchive.objects.exists())
+
+
+class TestChatHistory(ArchivedMessagesMixin, TestCase):
+
+    def setUp(self):
+        archive_messages(self.now - timedelta(days=1), batch_size=3)
+        self.history = ChatHistory(ChatMessage.objects.filter(chat=self.chat), self.chat.pk)
+
+    def test_count_ok(self):
+        self.assertEqual(len(self.expected), self.history.count())
+
+    def test_slices_go_on_with_archives_ok(self):
+        for start in range(0, len(self.expected), 2):
+            with self.subTest(start=start):
+                self.assertEqual(self.expected[start:start + 2], [m.pk for m in self.history[start:start + 2]])
+
+    def test_seek_goes_on_with_archives_ok(self):
+        results = []
+        position = None
+        while True:
+            page = self.history.seek(position, False, 4)
+            if not page:
+                break
+            results.extend(m.pk for m in page)
+            position = [page[-1].entry_created_at, page[-1].pk]
+
+        self.assertEqual(self.expected, results)
+
+    def test_seek_reverse_from_archives_ok(self):
+        oldest = self.old_messages[0]
+        page = self.history.seek([oldest.entry_created_at, oldest.pk], True, 8)
+
+        self.assertEqual(list(reversed(self.expected[-9:-1])), [m.pk for m in page])
+
+    def test_get_ok(self):
+        self.assertEqual(self.new_messages[0], self.history.get(self.new_messages[0].pk))
+        message = self.history.get(self.old_messages[4].pk)
+        self.assertEqual(self.old_messages[4].message, message.message)
+        self.assertEqual(self.old_messages[4].author, message.author)
+
+    def test_get_message_of_other_chat_ko(self):
+        message = baker.make_recipe('chat.message')
+
+        self.assertIsNone(self.history.get(message.pk))
+
+    def test_archived_messages_have_authors_ok(self):
+        message = self.history[len(self.expected) - 1:len(self.expected)][0]
+
+        self.assertEqual(self.old_messages[0].author, message.author)
+
+    def test_archived_messages_of_deleted_authors_ok(self):
+        self.old_messages[0].author.delete()
+        message = self.history[len(self.expected) - 1:len(self.expected)][0]
+
+        self.assertEqual(self.old_messages[0].pk, message.pk)
+        with self.assertNumQueries(0), self.assertRaises(ObjectDoesNotExist):
+            message.author
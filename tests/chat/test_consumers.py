@@ -1,12 +1,24 @@
+import json
+from unittest import mock
+
+import msgpack
+from asgiref.sync import async_to_sync
 from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
 from channels.testing import WebsocketCommunicator
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
 from model_bakery import baker
 from rest_framework.authtoken.models import Token
 
-from chat.consumers import ChatConsumer
+from chat.consumers import ROLL_MESSAGE_BUFFER, ROLL_RECORD_BUFFER, ChatConsumer, flush_roll_buffers
+from chat.models import ChatMessage, RollRecord
+from chat.state import drain_node, get_chat_state
+from chat.utils import get_user_group_name, load_resume_token, make_resume_token
+from common.enums import WebSocketCloseCodes
+from core.throttling import get_token_buckets
 from tests.utils import fake
 
 User = get_user_model()
@@ -25,7 +37,30 @@ class TestChatConsumer(TransactionTestCase):
                 'password': 'th1s1s4s3cur3',
             },
         )
+        self.chat.users.add(self.user)
         self.user_token = Token.objects.create(user=self.user).key
+        async_to_sync(get_chat_state(get_channel_layer()).flush)()
+        async_to_sync(get_token_buckets(get_channel_layer()).flush)()
+        # NOTE: Roll answers are sent once written, so tests don't wait for the whole latency of the buffer
+        latency = mock.patch.object(ROLL_MESSAGE_BUFFER, 'max_latency', 10)
+        latency.start()
+        self.addCleanup(latency.stop)
+
+    def tearDown(self):
+        async_to_sync(flush_roll_buffers)()
+
+    async def connect(self, user, chat=None) -> WebsocketCommunicator:
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        consumer.scope['user'] = user
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': (chat or self.chat).pk,
+        })
+        return consumer
 
     async def test_chat_consumer_connect_ok(self):
         consumer = WebsocketCommunicator(
@@ -158,6 +193,108 @@ class TestChatConsumer(TransactionTestCase):
 
         await consumer.disconnect()
 
+    async def test_authenticated_make_roll_can_be_replayed_ok(self):
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        consumer.scope['user'] = self.user
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': self.chat.pk,
+        })
+        await consumer.receive_from()
+        responses = []
+        for _ in range(2):
+            await consumer.send_json_to({
+                'type': 'make_roll',
+                'chat': self.chat.pk,
+                'message': f'{settings.BOT_COMMAND_PREFIX}roll 10d20',
+            })
+            responses.append(await consumer.receive_json_from())
+        await consumer.disconnect()
+
+        self.assertEqual([0, 1], [response['counter'] for response in responses])
+        for response in responses:
+            result, rolls = await database_sync_to_async(self.chat.replay_roll)('10d20', response['counter'])
+            self.assertEqual(str(result), response['content']['message'])
+            self.assertEqual(rolls, response['roll'])
+
+    async def test_authenticated_make_roll_is_recorded_ok(self):
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        consumer.scope['user'] = self.user
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': self.chat.pk,
+        })
+        await consumer.receive_from()
+        await consumer.send_json_to({
+            'type': 'make_roll',
+            'chat': self.chat.pk,
+            'message': f'{settings.BOT_COMMAND_PREFIX}roll 2d20+4',
+        })
+        response = await consumer.receive_json_from()
+        await consumer.disconnect()
+        await ROLL_RECORD_BUFFER.flush()
+
+        record = await database_sync_to_async(RollRecord.objects.get)(chat=self.chat)
+        self.assertEqual(self.user.pk, record.author_id)
+        self.assertEqual('2d20+4', record.expression)
+        self.assertEqual(response['content']['message'], str(record.total))
+        self.assertEqual(response['roll'], record.results)
+        self.assertEqual(response['counter'], record.counter)
+
+    async def test_authenticated_make_roll_is_part_of_history_ok(self):
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        consumer.scope['user'] = self.user
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': self.chat.pk,
+        })
+        await consumer.receive_from()
+        await consumer.send_json_to({
+            'type': 'make_roll',
+            'chat': self.chat.pk,
+            'message': f'{settings.BOT_COMMAND_PREFIX}roll 2d20+4',
+        })
+        response = await consumer.receive_json_from()
+        await consumer.disconnect()
+
+        message = await database_sync_to_async(ChatMessage.objects.get)(chat=self.chat)
+        self.assertEqual(message.pk, response['content']['id'])
+        self.assertEqual(self.bot.pk, message.author_id)
+        self.assertEqual(response['content']['message'], message.message)
+        self.assertEqual(self.bot.pk, response['content']['author']['id'])
+
+    async def test_authenticated_make_roll_is_written_in_background_ok(self):
+        consumer = await self.connect(self.user)
+        await consumer.receive_from()
+
+        with mock.patch.object(ROLL_MESSAGE_BUFFER, 'max_latency', 60000):
+            await consumer.send_json_to({
+                'type': 'make_roll',
+                'chat': self.chat.pk,
+                'message': f'{settings.BOT_COMMAND_PREFIX}roll 1d20',
+            })
+            self.assertTrue(await consumer.receive_nothing())
+            await consumer.disconnect()
+
+            self.assertFalse(await ChatMessage.objects.filter(chat=self.chat).aexists())
+            self.assertEqual(1, len(ROLL_MESSAGE_BUFFER))
+            await flush_roll_buffers()
+
+        self.assertTrue(await ChatMessage.objects.filter(chat=self.chat, author=self.bot).aexists())
+        self.assertTrue(await RollRecord.objects.filter(chat=self.chat).aexists())
+
     async def test_authenticated_make_roll_incorrect_syntax_ok(self):
         consumer = WebsocketCommunicator(
             application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
@@ -183,6 +320,34 @@ class TestChatConsumer(TransactionTestCase):
 
         await consumer.disconnect()
 
+    async def test_authenticated_make_roll_too_many_dice_ok(self):
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        consumer.scope['user'] = self.user
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': self.chat.pk,
+        })
+        await consumer.receive_from()
+        await consumer.send_json_to({
+            'type': 'make_roll',
+            'chat': self.chat.pk,
+            'message': f'{settings.BOT_COMMAND_PREFIX}roll 999999999d999999999',
+        })
+        response = await consumer.receive_json_from()
+
+        self.assertEqual('group_send_message', response['type'])
+        self.assertEqual(
+            f'Dice roll `999999999d999999999` exceeds the limit of {settings.DICE_MAX_DICE} dice.',
+            response['content']['message'],
+        )
+        self.assertDictEqual({}, response['roll'])
+
+        await consumer.disconnect()
+
     async def test_non_authenticated_with_token_setup_channel_ok(self):
         consumer = WebsocketCommunicator(
             application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
@@ -214,3 +379,580 @@ class TestChatConsumer(TransactionTestCase):
 
         self.assertEqual('info', response['type'])
         self.assertEqual('User not authenticated.', response['content']['message'])
+
+    async def test_token_is_authenticated_once_per_connection_ok(self):
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        with mock.patch.object(ChatConsumer, 'authenticate', autospec=True, side_effect=ChatConsumer.authenticate) \
+                as authenticate:
+            await consumer.connect()
+            await consumer.send_json_to({
+                'type': 'setup_channel_layer',
+                'chat': self.chat.pk,
+                'token': self.user_token,
+            })
+            await consumer.receive_from()
+            await consumer.send_json_to({
+                'type': 'send_message',
+                'chat': self.chat.pk,
+                'message': fake.sentence(),
+            })
+            response = await consumer.receive_json_from()
+            await consumer.disconnect()
+
+        self.assertEqual('group_send_message', response['type'])
+        authenticate.assert_called_once()
+
+    async def test_setup_channel_layer_not_member_ko(self):
+        chat = await database_sync_to_async(baker.make_recipe)('chat.chat')
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        consumer.scope['user'] = self.user
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': chat.pk,
+        })
+        response = await consumer.receive_json_from()
+        closed = await consumer.receive_output()
+
+        self.assertEqual('error', response['type'])
+        self.assertEqual('You are not a member of this chat.', response['content']['message'])
+        self.assertEqual('websocket.close', closed['type'])
+
+    async def test_send_message_to_other_chat_ko(self):
+        chat = await database_sync_to_async(baker.make_recipe)('chat.chat')
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        consumer.scope['user'] = self.user
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': self.chat.pk,
+        })
+        await consumer.receive_from()
+        await consumer.send_json_to({
+            'type': 'send_message',
+            'chat': chat.pk,
+            'message': fake.sentence(),
+        })
+        response = await consumer.receive_json_from()
+
+        self.assertEqual('error', response['type'])
+        self.assertEqual('You are not a member of this chat.', response['content']['message'])
+
+        await consumer.disconnect()
+
+    async def test_channel_layer_handlers_cannot_be_called_by_clients_ko(self):
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        consumer.scope['user'] = self.user
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': self.chat.pk,
+        })
+        await consumer.receive_from()
+        await consumer.send_json_to({
+            'type': 'chat_membership_changed',
+            'chat': self.chat.pk,
+        })
+        response = await consumer.receive_json_from()
+
+        self.assertEqual('error', response['type'])
+        self.assertEqual('Given type does not exist.', response['content']['message'])
+
+    async def test_chat_membership_changes_are_applied_ok(self):
+        chat = await database_sync_to_async(baker.make_recipe)('chat.chat')
+        channel_layer = get_channel_layer()
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        consumer.scope['user'] = self.user
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': self.chat.pk,
+        })
+        await consumer.receive_from()
+        await channel_layer.group_send(get_user_group_name(self.user.pk), {
+            'type': 'chat_membership_changed',
+            'action': 'add',
+            'chats': [chat.pk],
+        })
+        await channel_layer.group_send(get_user_group_name(self.user.pk), {
+            'type': 'chat_membership_changed',
+            'action': 'remove',
+            'chats': [self.chat.pk],
+        })
+        self.assertTrue(await consumer.receive_nothing())
+        await consumer.send_json_to({
+            'type': 'send_message',
+            'chat': self.chat.pk,
+            'message': fake.sentence(),
+        })
+        response = await consumer.receive_json_from()
+
+        self.assertEqual('error', response['type'])
+
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': chat.pk,
+        })
+        response = await consumer.receive_json_from()
+
+        self.assertEqual('Chat connected!', response['content']['message'])
+
+        await consumer.disconnect()
+
+    async def test_setup_channel_layer_invalid_chat_ko(self):
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        consumer.scope['user'] = self.user
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': 'chat',
+        })
+        response = await consumer.receive_json_from()
+
+        self.assertEqual('error', response['type'])
+        self.assertEqual('Invalid data', response['content']['message'])
+
+    async def test_send_message_is_encoded_once_for_every_connection_ok(self):
+        message = fake.sentence()
+        consumers = []
+        for _ in range(2):
+            consumer = WebsocketCommunicator(
+                application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+                path=self.url,
+            )
+            consumer.scope['user'] = self.user
+            await consumer.connect()
+            await consumer.send_json_to({
+                'type': 'setup_channel_layer',
+                'chat': self.chat.pk,
+            })
+            await consumer.receive_from()
+            consumers.append(consumer)
+        with mock.patch.object(ChatConsumer, 'encode_json', wraps=ChatConsumer.encode_json) as encode_json:
+            await consumers[0].send_json_to({
+                'type': 'send_message',
+                'chat': self.chat.pk,
+                'message': message,
+            })
+            responses = [await consumer.receive_from() for consumer in consumers]
+        for consumer in consumers:
+            await consumer.disconnect()
+
+        encode_json.assert_called_once()
+        self.assertEqual(responses[0], responses[1])
+        response = json.loads(responses[0])
+        self.assertEqual(message, response['content']['message'])
+        self.assertEqual(self.user.pk, response['content']['author']['id'])
+
+    async def test_setup_channel_layer_sends_presence_and_unread_ok(self):
+        other_user = await database_sync_to_async(baker.make_recipe)('registration.user')
+        await database_sync_to_async(self.chat.users.add)(other_user)
+        await database_sync_to_async(baker.make_recipe)('chat.message', chat=self.chat, author=other_user)
+        consumer = await self.connect(self.user)
+        response = await consumer.receive_json_from()
+        await consumer.disconnect()
+
+        self.assertEqual([self.user.pk], response['content']['present'])
+        self.assertEqual({str(self.chat.pk): 1}, response['content']['unread'])
+
+    async def test_presence_changes_are_sent_to_other_users_ok(self):
+        other_user = await database_sync_to_async(baker.make_recipe)('registration.user')
+        await database_sync_to_async(self.chat.users.add)(other_user)
+        consumer = await self.connect(self.user)
+        await consumer.receive_from()
+        other_consumer = await self.connect(other_user)
+        response = await other_consumer.receive_json_from()
+
+        self.assertEqual([self.user.pk, other_user.pk], response['content']['present'])
+
+        response = await consumer.receive_json_from()
+
+        self.assertEqual('presence', response['type'])
+        self.assertEqual({'chat': self.chat.pk, 'user': other_user.pk, 'online': True}, response['content'])
+
+        await other_consumer.disconnect()
+        response = await consumer.receive_json_from()
+
+        self.assertEqual({'chat': self.chat.pk, 'user': other_user.pk, 'online': False}, response['content'])
+        self.assertEqual([self.user.pk], await get_chat_state(get_channel_layer()).get_present(self.chat.pk))
+
+        await consumer.disconnect()
+
+    async def test_presence_does_not_change_with_more_connections_ok(self):
+        other_user = await database_sync_to_async(baker.make_recipe)('registration.user')
+        await database_sync_to_async(self.chat.users.add)(other_user)
+        consumer = await self.connect(self.user)
+        await consumer.receive_from()
+        other_consumers = [await self.connect(other_user) for _ in range(2)]
+        for other_consumer in other_consumers:
+            await other_consumer.receive_from()
+        await consumer.receive_from()
+        await other_consumers[0].disconnect()
+
+        self.assertTrue(await consumer.receive_nothing())
+
+        await other_consumers[1].disconnect()
+        await consumer.disconnect()
+
+    async def test_typing_is_sent_to_other_users_ok(self):
+        other_user = await database_sync_to_async(baker.make_recipe)('registration.user')
+        await database_sync_to_async(self.chat.users.add)(other_user)
+        consumer = await self.connect(self.user)
+        await consumer.receive_from()
+        other_consumer = await self.connect(other_user)
+        await other_consumer.receive_from()
+        await consumer.receive_from()
+        await consumer.send_json_to({
+            'type': 'typing',
+            'chat': self.chat.pk,
+        })
+        response = await other_consumer.receive_json_from()
+
+        self.assertEqual('typing', response['type'])
+        self.assertEqual({'chat': self.chat.pk, 'user': self.user.pk, 'typing': True}, response['content'])
+        self.assertTrue(await consumer.receive_nothing())
+
+        await consumer.disconnect()
+        await other_consumer.disconnect()
+
+    async def test_unread_counters_are_sent_as_deltas_ok(self):
+        other_user = await database_sync_to_async(baker.make_recipe)('registration.user')
+        other_chat = await database_sync_to_async(baker.make_recipe)('chat.chat')
+        await database_sync_to_async(self.chat.users.add)(other_user)
+        await database_sync_to_async(other_chat.users.add)(other_user)
+        consumer = await self.connect(self.user)
+        await consumer.receive_from()
+        # NOTE: Users get the counters of every chat they're member of, even if connected to another one
+        other_consumer = await self.connect(other_user, other_chat)
+        await other_consumer.receive_from()
+        await consumer.send_json_to({
+            'type': 'send_message',
+            'chat': self.chat.pk,
+            'message': fake.sentence(),
+        })
+        await consumer.receive_from()
+        response = await other_consumer.receive_json_from()
+
+        self.assertEqual('unread', response['type'])
+        self.assertEqual({'chat': self.chat.pk, 'delta': 1}, response['content'])
+        self.assertTrue(await consumer.receive_nothing())
+
+        await consumer.disconnect()
+        await other_consumer.disconnect()
+
+    async def test_unread_members_are_queried_once_ok(self):
+        consumer = await self.connect(self.user)
+        await consumer.receive_from()
+        with mock.patch.object(
+            ChatConsumer, 'get_chat_members', new_callable=mock.AsyncMock, return_value={self.user.pk},
+        ) as mocker_members:
+            for _ in range(2):
+                await consumer.send_json_to({
+                    'type': 'send_message',
+                    'chat': self.chat.pk,
+                    'message': fake.sentence(),
+                })
+                await consumer.receive_from()
+        await consumer.disconnect()
+
+        mocker_members.assert_called_once_with(self.chat.pk)
+
+    async def test_chat_events_are_batched_when_asked_ok(self):
+        messages = [fake.sentence() for _ in range(2)]
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        consumer.scope['user'] = self.user
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': self.chat.pk,
+            'batch': True,
+        })
+        await consumer.receive_from()
+        with mock.patch.multiple(ChatConsumer, batch_max_latency=10000, batch_max_size=2):
+            for message in messages:
+                await consumer.send_json_to({
+                    'type': 'send_message',
+                    'chat': self.chat.pk,
+                    'message': message,
+                })
+            response = await consumer.receive_json_from()
+        await consumer.disconnect()
+
+        self.assertEqual('batch', response['type'])
+        self.assertEqual(messages, [event['content']['message'] for event in response['events']])
+
+    async def send_messages(self, consumer, times: int) -> list[str]:
+        types = []
+        for _ in range(times):
+            await consumer.send_json_to({
+                'type': 'send_message',
+                'chat': self.chat.pk,
+                'message': fake.sentence(),
+            })
+            types.append((await consumer.receive_json_from())['type'])
+        return types
+
+    @override_settings(CHAT_THROTTLE_RATES={'connection': '2/min', 'connection_premium': '3/min'})
+    async def test_connection_is_throttled_ok(self):
+        consumer = await self.connect(self.user)
+        await consumer.receive_from()
+        types = await self.send_messages(consumer, 3)
+        await consumer.send_json_to({
+            'type': 'send_message',
+            'chat': self.chat.pk,
+            'message': fake.sentence(),
+        })
+        response = await consumer.receive_json_from()
+
+        self.assertEqual(['group_send_message'] * 2 + ['slow_down'], types)
+        self.assertEqual('slow_down', response['type'])
+        self.assertEqual('You are sending messages too fast, slow down.', response['content']['message'])
+        self.assertGreater(response['content']['retry_after'], 0)
+        self.assertEqual(2, await ChatMessage.objects.filter(chat=self.chat).acount())
+
+        await consumer.disconnect()
+
+    @override_settings(CHAT_THROTTLE_RATES={'connection': '2/min', 'connection_premium': '3/min'})
+    async def test_premium_connection_gets_premium_rate_ok(self):
+        user = await database_sync_to_async(baker.make_recipe)('registration.premium_user')
+        await database_sync_to_async(self.chat.users.add)(user)
+        consumer = await self.connect(user)
+        await consumer.receive_from()
+
+        self.assertEqual(['group_send_message'] * 3 + ['slow_down'], await self.send_messages(consumer, 4))
+
+        await consumer.disconnect()
+
+    @override_settings(CHAT_THROTTLE_RATES={'connection': '10/min', 'chat': '3/min'})
+    async def test_chat_is_throttled_for_every_connection_ok(self):
+        other_user = await database_sync_to_async(baker.make_recipe)('registration.user')
+        await database_sync_to_async(self.chat.users.add)(other_user)
+        consumer = await self.connect(self.user)
+        await consumer.receive_from()
+        types = await self.send_messages(consumer, 2)
+        other_consumer = await self.connect(other_user)
+        await other_consumer.receive_from()
+        await consumer.receive_from()
+        other_types = await self.send_messages(other_consumer, 2)
+
+        self.assertEqual(['group_send_message'] * 2, types)
+        self.assertEqual(['group_send_message', 'slow_down'], other_types)
+
+        await consumer.disconnect()
+        await other_consumer.disconnect()
+
+    async def connect_with_protocol(self, user, protocol: str) -> WebsocketCommunicator:
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+            subprotocols=[protocol],
+        )
+        consumer.scope['user'] = user
+        connected, subprotocol = await consumer.connect()
+        self.assertEqual(protocol, subprotocol)
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': self.chat.pk,
+        })
+        return consumer
+
+    async def test_message_pack_protocol_ok(self):
+        consumer = await self.connect_with_protocol(self.user, 'oilandrope.msgpack')
+        response = msgpack.unpackb(await consumer.receive_from(), strict_map_key=False)
+
+        self.assertEqual('info', response['t'])
+        self.assertEqual('Chat connected!', response['c']['m'])
+
+        await consumer.send_to(bytes_data=msgpack.packb({
+            'type': 'send_message',
+            'chat': self.chat.pk,
+            'message': 'Hi',
+        }))
+        author = msgpack.unpackb(await consumer.receive_from())
+        response = msgpack.unpackb(await consumer.receive_from())
+        await consumer.disconnect()
+
+        self.assertEqual({'t': 'author', 'c': {'i': self.user.pk, 'un': self.user.username}}, {
+            't': author['t'], 'c': {key: author['c'][key] for key in ('i', 'un')},
+        })
+        self.assertEqual('group_send_message', response['t'])
+        self.assertEqual('Hi', response['c']['m'])
+        self.assertEqual(self.user.pk, response['c']['a'])
+
+    async def test_compact_protocol_sends_authors_once_ok(self):
+        consumer = await self.connect_with_protocol(self.user, 'oilandrope.compact')
+        await consumer.receive_from()
+        types = []
+        for _ in range(2):
+            await consumer.send_json_to({
+                'type': 'send_message',
+                'chat': self.chat.pk,
+                'message': fake.sentence(),
+            })
+            types.append((await consumer.receive_json_from())['t'])
+        types.append((await consumer.receive_json_from())['t'])
+        await consumer.disconnect()
+
+        self.assertEqual(['author', 'group_send_message', 'group_send_message'], types)
+
+    async def test_compact_protocols_send_smaller_frames_ok(self):
+        sizes = {}
+        for protocol in ('oilandrope.json', 'oilandrope.compact', 'oilandrope.msgpack'):
+            consumer = await self.connect_with_protocol(self.user, protocol)
+            await consumer.receive_from()
+            frames = []
+            for _ in range(5):
+                await consumer.send_json_to({
+                    'type': 'send_message',
+                    'chat': self.chat.pk,
+                    'message': 'Hi',
+                })
+                frames.append(await consumer.receive_from())
+            if protocol != 'oilandrope.json':
+                # NOTE: Author is sent once, in its own frame
+                frames.append(await consumer.receive_from())
+            await consumer.disconnect()
+            sizes[protocol] = sum(len(frame) for frame in frames)
+
+        self.assertLess(sizes['oilandrope.compact'], sizes['oilandrope.json'] / 2)
+        self.assertLess(sizes['oilandrope.msgpack'], sizes['oilandrope.compact'])
+
+    async def send_and_reconnect(self, times: int) -> tuple[list[dict], WebsocketCommunicator]:
+        consumer = await self.connect(self.user)
+        await consumer.receive_from()
+        messages = []
+        for _ in range(times):
+            await consumer.send_json_to({
+                'type': 'send_message',
+                'chat': self.chat.pk,
+                'message': fake.sentence(),
+            })
+            messages.append((await consumer.receive_json_from())['content'])
+        await consumer.disconnect()
+        return messages, WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+
+    async def replay(self, consumer: WebsocketCommunicator, last_seen_id: int) -> dict:
+        consumer.scope['user'] = self.user
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': self.chat.pk,
+            'last_seen_id': last_seen_id,
+        })
+        await consumer.receive_from()
+        response = await consumer.receive_json_from()
+        await consumer.disconnect()
+        return response
+
+    async def test_missed_messages_are_replayed_from_recent_messages_ok(self):
+        messages, consumer = await self.send_and_reconnect(3)
+        with mock.patch.object(ChatConsumer, 'load_missed_messages') as mocker_load:
+            response = await self.replay(consumer, messages[0]['id'])
+
+        mocker_load.assert_not_called()
+        self.assertEqual('replay', response['type'])
+        self.assertEqual(messages[1:], response['content']['messages'])
+        self.assertTrue(response['content']['complete'])
+
+    async def test_missed_messages_are_replayed_from_database_ok(self):
+        messages, consumer = await self.send_and_reconnect(3)
+        await get_chat_state(get_channel_layer()).flush()
+        response = await self.replay(consumer, messages[0]['id'])
+
+        self.assertEqual(messages[1:], response['content']['messages'])
+        self.assertTrue(response['content']['complete'])
+
+    @override_settings(CHAT_REPLAY_BUFFER_SIZE=1, CHAT_REPLAY_MAX_MESSAGES=1)
+    async def test_too_many_missed_messages_are_not_replayed_ok(self):
+        messages, consumer = await self.send_and_reconnect(3)
+        response = await self.replay(consumer, messages[0]['id'])
+
+        self.assertEqual(messages[1:2], response['content']['messages'])
+        self.assertFalse(response['content']['complete'])
+
+    async def test_drain_node_moves_connections_with_resume_token_ok(self):
+        consumer = await self.connect(self.user)
+        await consumer.receive_from()
+        await consumer.send_json_to({
+            'type': 'send_message',
+            'chat': self.chat.pk,
+            'message': fake.sentence(),
+        })
+        message = (await consumer.receive_json_from())['content']
+        await drain_node(settings.CHAT_NODE_NAME)
+        response = await consumer.receive_json_from()
+        closed = await consumer.receive_output()
+
+        self.assertEqual('reconnect', response['type'])
+        self.assertEqual(
+            {'user': self.user.pk, 'chat': self.chat.pk, 'last_seen_id': message['id']},
+            load_resume_token(response['content']['resume_token']),
+        )
+        self.assertEqual(WebSocketCloseCodes.SERVICE_RESTART.value, closed['code'])
+
+    async def test_draining_node_rejects_connections_ko(self):
+        await get_chat_state(get_channel_layer()).set_draining(settings.CHAT_NODE_NAME, True)
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        connected, code = await consumer.connect()
+
+        self.assertFalse(connected)
+        self.assertEqual(WebSocketCloseCodes.TRY_AGAIN_LATER.value, code)
+
+    async def test_resume_token_authenticates_and_replays_ok(self):
+        messages, consumer = await self.send_and_reconnect(3)
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': self.chat.pk,
+            'resume_token': make_resume_token(self.user.pk, self.chat.pk, messages[0]['id']),
+        })
+        info = await consumer.receive_json_from()
+        response = await consumer.receive_json_from()
+        await consumer.disconnect()
+
+        self.assertEqual('Chat connected!', info['content']['message'])
+        self.assertEqual(messages[1:], response['content']['messages'])
+
+    async def test_invalid_resume_token_ko(self):
+        consumer = WebsocketCommunicator(
+            application=AuthMiddlewareStack(ChatConsumer.as_asgi()),
+            path=self.url,
+        )
+        await consumer.connect()
+        await consumer.send_json_to({
+            'type': 'setup_channel_layer',
+            'chat': self.chat.pk,
+            'resume_token': f'{make_resume_token(self.user.pk, self.chat.pk, None)}x',
+        })
+        response = await consumer.receive_json_from()
+
+        self.assertEqual('User not authenticated.', response['content']['message'])
+
+        await consumer.disconnect()
@@ -4,6 +4,7 @@ from django.test import TestCase
 from model_bakery import baker
 
 from chat import models
+from roleplay.utils.dice import roll_dice
 from tests.mocks.discord import channel_response
 from tests.utils import fake
 
@@ -31,6 +32,25 @@ class TestChat(TestCase):
 
         self.assertIsNotNone(instance.discord_chat)
 
+    def test_each_chat_has_its_own_dice_seed_ok(self):
+        instance = baker.make_recipe('chat.chat')
+
+        self.assertNotEqual(self.instance.dice_seed, instance.dice_seed)
+
+    def test_reserve_dice_counters_ok(self):
+        instance = baker.make_recipe('chat.chat')
+        first_block = instance.reserve_dice_counters(3)
+        second_block = instance.reserve_dice_counters(2)
+
+        self.assertEqual(range(0, 3), first_block)
+        self.assertEqual(range(3, 5), second_block)
+        self.assertEqual(5, self.model.objects.get(pk=instance.pk).dice_counter)
+
+    def test_replay_roll_ok(self):
+        result, rolls = roll_dice('10d20+4d6kh3', self.instance.get_dice_random(7))
+
+        self.assertEqual((result, rolls), self.instance.replay_roll('10d20+4d6kh3', 7))
+
 
 class TestChatMessage(TestCase):
     model = models.ChatMessage
@@ -43,3 +63,29 @@ class TestChatMessage(TestCase):
         expected = f'{self.instance.message} ({self.instance.entry_created_at})'
 
         self.assertEqual(expected, str(self.instance))
+
+
+class TestRollRecord(TestCase):
+    model = models.RollRecord
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instance = baker.make_recipe('chat.roll_record')
+
+    def test_str_ok(self):
+        expected = f'{self.instance.expression} = {self.instance.total} ({self.instance.entry_created_at})'
+
+        self.assertEqual(expected, str(self.instance))
+
+
+class TestReadMarker(TestCase):
+    model = models.ReadMarker
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instance = baker.make(cls.model, last_read_id=5)
+
+    def test_str_ok(self):
+        expected = f'{self.instance.user} ({self.instance.chat_id}: 5)'
+
+        self.assertEqual(expected, str(self.instance))
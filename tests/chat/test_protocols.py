@@ -0,0 +1,65 @@
+import json
+
+import msgpack
+from django.test import SimpleTestCase
+
+from chat.protocols import (CompactJsonProtocol, MessagePackProtocol, WireProtocol, negotiate_protocol,
+                            reference_author, shorten)
+
+
+class TestShorten(SimpleTestCase):
+
+    def test_known_keys_are_shortened_ok(self):
+        content = {'type': 'group_send_message', 'content': {'message': 'Hi', 'other': 1}}
+
+        self.assertEqual({'t': 'group_send_message', 'c': {'m': 'Hi', 'other': 1}}, shorten(content))
+
+    def test_raw_values_are_kept_ok(self):
+        content = {'roll': {'d20': [15]}, 'unread': {'1': 2}, 'events': [{'type': 'a'}]}
+
+        self.assertEqual({'r': {'d20': [15]}, 'ur': {'1': 2}, 'e': [{'t': 'a'}]}, shorten(content))
+
+
+class TestReferenceAuthor(SimpleTestCase):
+
+    def test_author_is_referenced_ok(self):
+        author = {'id': 1, 'username': 'user'}
+        content = {'type': 'group_send_message', 'content': {'message': 'Hi', 'author': author}}
+
+        self.assertEqual(
+            ({'type': 'group_send_message', 'content': {'message': 'Hi', 'author': 1}}, author),
+            reference_author(content),
+        )
+        self.assertEqual(author, content['content']['author'])
+
+    def test_content_without_author_ok(self):
+        content = {'type': 'info', 'content': {'message': 'Hi'}}
+
+        self.assertEqual((content, None), reference_author(content))
+
+
+class TestWireProtocol(SimpleTestCase):
+
+    def test_negotiate_protocol_ok(self):
+        self.assertIsInstance(negotiate_protocol(['unknown', 'oilandrope.msgpack']), MessagePackProtocol)
+        self.assertIsNone(negotiate_protocol(['unknown']))
+
+    def test_json_batch_ok(self):
+        protocol = WireProtocol()
+        events = [protocol.encode({'index': index}) for index in range(2)]
+
+        self.assertEqual(
+            {'type': 'batch', 'events': [{'index': 0}, {'index': 1}]}, json.loads(protocol.encode_batch(events)),
+        )
+
+    def test_compact_json_batch_ok(self):
+        protocol = CompactJsonProtocol()
+        events = [protocol.encode({'i': index}) for index in range(2)]
+
+        self.assertEqual({'t': 'batch', 'e': [{'i': 0}, {'i': 1}]}, json.loads(protocol.encode_batch(events)))
+
+    def test_message_pack_batch_ok(self):
+        protocol = MessagePackProtocol()
+        events = [protocol.encode({'i': index}) for index in range(2)]
+
+        self.assertEqual({'t': 'batch', 'e': [{'i': 0}, {'i': 1}]}, msgpack.unpackb(protocol.encode_batch(events)))
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.test import TestCase
+from model_bakery import baker
+
+from chat.signals.handlers import notify_membership_changes
+from chat.state import get_chat_state
+
+
+@mock.patch('chat.signals.handlers.notify_membership_changes')
+class TestChatUsersM2MChanged(TestCase):
+
+    def setUp(self):
+        self.chat = baker.make_recipe('chat.chat')
+        self.users = baker.make_recipe('registration.user', _quantity=2)
+
+    def test_users_added_are_notified_ok(self, mocker_notify: mock.MagicMock):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chat.users.add(*self.users)
+
+        mocker_notify.assert_called_once_with('add', {user.pk: [self.chat.pk] for user in self.users})
+
+    def test_chats_added_to_user_are_notified_ok(self, mocker_notify: mock.MagicMock):
+        chats = baker.make_recipe('chat.chat', _quantity=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[0].chat_set.add(*chats)
+
+        mocker_notify.assert_called_once_with('add', {self.users[0].pk: sorted(chat.pk for chat in chats)})
+
+    def test_users_removed_are_notified_ok(self, mocker_notify: mock.MagicMock):
+        self.chat.users.add(*self.users)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chat.users.remove(self.users[0])
+
+        mocker_notify.assert_called_once_with('remove', {self.users[0].pk: [self.chat.pk]})
+
+    def test_users_cleared_are_notified_ok(self, mocker_notify: mock.MagicMock):
+        self.chat.users.add(*self.users)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chat.users.clear()
+
+        mocker_notify.assert_called_once_with('remove', {user.pk: [self.chat.pk] for user in self.users})
+
+    def test_changes_are_not_notified_until_commit_ok(self, mocker_notify: mock.MagicMock):
+        self.chat.users.add(*self.users)
+
+        mocker_notify.assert_not_called()
+
+
+class TestNotifyMembershipChanges(TestCase):
+
+    def test_members_of_changed_chats_are_forgotten_ok(self):
+        state = get_chat_state(get_channel_layer())
+        async_to_sync(state.load_members)(1, [1])
+        async_to_sync(state.load_members)(2, [1])
+        notify_membership_changes('add', {2: [1]})
+
+        self.assertIsNone(async_to_sync(state.get_members)(1))
+        self.assertEqual({1}, async_to_sync(state.get_members)(2))
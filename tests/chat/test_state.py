@@ -0,0 +1,115 @@
+from unittest import skipUnless
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
+
+from chat.state import MemoryChatState, RedisChatState
+from common.tools.sync import delete_layer_keys
+from tests.utils import is_redis_available, make_redis_channel_layer
+
+
+class ChatStateTestsMixin:
+
+    async def test_presence_ok(self):
+        self.assertEqual(1, await self.state.join(1, 1))
+        self.assertEqual(2, await self.state.join(1, 1))
+        self.assertEqual(1, await self.state.join(1, 2))
+        self.assertEqual([1, 2], await self.state.get_present(1))
+        self.assertEqual(1, await self.state.leave(1, 1))
+        self.assertEqual(0, await self.state.leave(1, 2))
+        self.assertEqual([1], await self.state.get_present(1))
+
+    async def test_unread_not_loaded_ok(self):
+        self.assertIsNone(await self.state.get_unread(1))
+        self.assertEqual({1: None}, await self.state.increment_unread(1, [1]))
+        self.assertIsNone(await self.state.set_unread(1, 1, 0))
+        self.assertIsNone(await self.state.get_unread(1))
+
+    async def test_unread_loaded_ok(self):
+        await self.state.load_unread(1, {1: 2})
+
+        self.assertEqual({1: 3, 2: None}, await self.state.increment_unread(1, [1, 2]))
+        self.assertEqual({1: 3}, await self.state.get_unread(1))
+        self.assertEqual(3, await self.state.set_unread(1, 1, 0))
+        self.assertEqual({1: 0}, await self.state.get_unread(1))
+
+    async def test_forget_unread_ok(self):
+        await self.state.load_unread(1, {1: 2})
+        await self.state.forget_unread(1)
+
+        self.assertIsNone(await self.state.get_unread(1))
+
+    async def test_members_ok(self):
+        self.assertIsNone(await self.state.get_members(1))
+        await self.state.load_members(1, [1, 2])
+        await self.state.load_members(2, [])
+
+        self.assertEqual({1, 2}, await self.state.get_members(1))
+        self.assertEqual(set(), await self.state.get_members(2))
+        await self.state.forget_members(1)
+        self.assertIsNone(await self.state.get_members(1))
+
+    @override_settings(CHAT_REPLAY_BUFFER_SIZE=2)
+    async def test_recent_messages_are_bounded_ok(self):
+        for message_id in range(3):
+            await self.state.remember_message(1, {'id': message_id})
+
+        self.assertEqual([{'id': 1}, {'id': 2}], await self.state.get_recent_messages(1))
+        self.assertEqual([], await self.state.get_recent_messages(2))
+
+    async def test_draining_ok(self):
+        await self.state.set_draining('node-1', True)
+
+        self.assertTrue(await self.state.is_draining('node-1'))
+        self.assertFalse(await self.state.is_draining('node-2'))
+        await self.state.set_draining('node-1', False)
+        self.assertFalse(await self.state.is_draining('node-1'))
+
+    async def test_flush_ok(self):
+        await self.state.join(1, 1)
+        await self.state.load_unread(1, {1: 2})
+        await self.state.load_members(1, [1])
+        await self.state.flush()
+
+        self.assertEqual([], await self.state.get_present(1))
+        self.assertIsNone(await self.state.get_unread(1))
+        self.assertIsNone(await self.state.get_members(1))
+
+
+class TestMemoryChatState(ChatStateTestsMixin, TestCase):
+
+    def setUp(self):
+        self.state = MemoryChatState()
+
+
+@skipUnless(is_redis_available(), 'Redis is not available.')
+class TestRedisChatState(ChatStateTestsMixin, TestCase):
+
+    def setUp(self):
+        self.layer = make_redis_channel_layer()
+        self.state = RedisChatState(self.layer)
+
+    def tearDown(self):
+        async_to_sync(self.state.flush)()
+
+    async def test_unread_of_users_in_several_hosts_ok(self):
+        await self.state.load_unread(1, {1: 0})
+        await self.state.load_unread(2, {1: 5})
+
+        self.assertEqual({1: 1, 2: 6, 3: None}, await self.state.increment_unread(1, [1, 2, 3]))
+
+    async def test_flush_keeps_keys_of_other_layers_ok(self):
+        other_state = RedisChatState(make_redis_channel_layer())
+        await other_state.join(1, 1)
+        await self.state.join(1, 1)
+        await self.state.flush()
+
+        self.assertEqual([1], await other_state.get_present(1))
+        await other_state.flush()
+
+    async def test_delete_layer_keys_in_batches_ok(self):
+        for chat_id in range(5):
+            await self.state.join(chat_id, 1)
+
+        self.assertEqual(5, await delete_layer_keys(self.layer, f'{self.state.prefix}*', count=2))
+        self.assertEqual([], await self.state.get_present(0))
@@ -0,0 +1,105 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from channels.db import database_sync_to_async
+from django.apps import apps
+from django.conf import settings
+from model_bakery import baker
+
+from common.tools.sync import WriteBehindBuffer
+
+User = apps.get_model(settings.AUTH_USER_MODEL)
+RollRecord = apps.get_model('chat.RollRecord')
+
+
+def prepare_records(size):
+    chat = baker.make_recipe('chat.chat')
+    author = baker.make_recipe('registration.user')
+    return [baker.prepare_recipe('chat.roll_record', chat=chat, author=author) for _ in range(size)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+async def test_write_behind_buffer_flushes_when_full_ok():
+    buffer = WriteBehindBuffer(RollRecord, max_size=3, max_latency=60000)
+    records = await database_sync_to_async(prepare_records)(3)
+    with mock.patch.object(RollRecord.objects, 'bulk_create', wraps=RollRecord.objects.bulk_create) as bulk_create:
+        for record in records:
+            await buffer.add(record)
+
+    bulk_create.assert_called_once()
+    assert 0 == len(buffer)
+    assert 3 == await database_sync_to_async(RollRecord.objects.count)()
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+async def test_write_behind_buffer_flushes_after_latency_ok():
+    buffer = WriteBehindBuffer(RollRecord, max_size=100, max_latency=10)
+    records = await database_sync_to_async(prepare_records)(2)
+    for record in records:
+        await buffer.add(record)
+
+    assert 2 == len(buffer)
+    assert 0 == await database_sync_to_async(RollRecord.objects.count)()
+    await asyncio.sleep(0.1)
+    assert 0 == len(buffer)
+    assert 2 == await database_sync_to_async(RollRecord.objects.count)()
+
+
+@pytest.mark.asyncio
+async def test_write_behind_buffer_flush_empty_ok():
+    buffer = WriteBehindBuffer(RollRecord, max_size=100, max_latency=10)
+
+    assert [] == await buffer.flush()
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+async def test_write_behind_buffer_add_returns_written_instance_ok():
+    buffer = WriteBehindBuffer(RollRecord, max_size=100, max_latency=10)
+    record, = await database_sync_to_async(prepare_records)(1)
+
+    written = await buffer.add(record)
+
+    assert record is await written
+    assert record.pk is not None
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+async def test_write_behind_buffer_discards_just_failed_instances_ok():
+    buffer = WriteBehindBuffer(RollRecord, max_size=100, max_latency=60000)
+    records = await database_sync_to_async(prepare_records)(5)
+    records[3].expression = 'invalid'
+    bulk_create = RollRecord.objects.bulk_create
+
+    def fail_invalid(instances):
+        if any(instance.expression == 'invalid' for instance in instances):
+            raise Exception()
+        return bulk_create(instances)
+
+    with mock.patch.object(RollRecord.objects, 'bulk_create', side_effect=fail_invalid):
+        written = [await buffer.add(record) for record in records]
+        inserted = await buffer.flush()
+
+    assert [record for number, record in enumerate(records) if number != 3] == inserted
+    assert None is await written[3]
+    assert 0 == len(buffer)
+    assert 4 == await database_sync_to_async(RollRecord.objects.count)()
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+async def test_write_behind_buffer_failed_instances_are_not_tried_again_ok():
+    buffer = WriteBehindBuffer(RollRecord, max_size=100, max_latency=60000)
+    records = await database_sync_to_async(prepare_records)(2)
+    with mock.patch.object(RollRecord.objects, 'bulk_create', side_effect=Exception):
+        await buffer.add(records[0])
+        assert [] == await buffer.flush()
+
+    await buffer.add(records[1])
+
+    assert [records[1]] == await buffer.flush()
+    assert 1 == await database_sync_to_async(RollRecord.objects.count)()
@@ -1,8 +1,11 @@
+from unittest import mock
+
 import pytest
 from channels.testing import WebsocketCommunicator
 
 from api.serializers.common import WebSocketMessageSerializer
-from core.consumers import HandlerJsonWebsocketConsumer
+from core.consumers import BatchSendMixin, HandlerJsonWebsocketConsumer
+from core.schemas import WebSocketMessageSchema
 from tests.utils import fake
 
 
@@ -75,3 +78,115 @@ class TestHandlerJsonWebsocketConsumer:
         response = await communicator.receive_json_from()
 
         assert response == {'content': {'message': message}}
+
+    @pytest.mark.asyncio
+    async def test_websocket_handler_not_allowed_function(self, consumer):
+        class ConsumerClass(consumer):
+            handler_types = ('test', )
+
+            async def internal(self, content):  # pragma: no cover
+                return await self.send_json(content)
+
+        communicator = WebsocketCommunicator(ConsumerClass.as_asgi(), '/ws/test/')
+        await communicator.send_json_to({'type': 'internal'})
+        response = await communicator.receive_json_from()
+
+        error_response = {
+            'type': 'error',
+            'content': {'message': 'Given type does not exist.'},
+        }
+        assert response == error_response
+
+
+class TestTypedConsumerMixinSchema:
+    @pytest.fixture(scope='class')
+    def consumer(self):
+        class ConsumerClass(HandlerJsonWebsocketConsumer):
+            schema_class = WebSocketMessageSchema
+
+            async def test(self, content):
+                return await self.send_json(content)
+
+        return ConsumerClass
+
+    @pytest.mark.asyncio
+    async def test_websocket_schema_sends_error(self, consumer):
+        communicator = WebsocketCommunicator(consumer.as_asgi(), '/ws/test/')
+        await communicator.send_json_to({'dump': fake.word()})
+        response = await communicator.receive_json_from()
+
+        assert response == {'type': 'error', 'content': {'message': 'Invalid data'}}
+
+    @pytest.mark.asyncio
+    async def test_websocket_schema_keeps_extra_keys_ok(self, consumer):
+        communicator = WebsocketCommunicator(consumer.as_asgi(), '/ws/test/')
+        token = fake.word()
+        await communicator.send_json_to({'type': 'test', 'token': token})
+        response = await communicator.receive_json_from()
+
+        assert response == {'token': token}
+
+    @pytest.mark.asyncio
+    async def test_websocket_schema_decodes_frame_once_ok(self, consumer):
+        communicator = WebsocketCommunicator(consumer.as_asgi(), '/ws/test/')
+        with mock.patch.object(consumer, 'decode_json', wraps=consumer.decode_json) as decode_json:
+            await communicator.send_json_to({'type': 'test', 'content': {}})
+            await communicator.receive_json_from()
+
+        decode_json.assert_called_once()
+
+
+class TestBatchSendMixin:
+    @pytest.fixture(scope='class')
+    def consumer(self):
+        class ConsumerClass(BatchSendMixin, HandlerJsonWebsocketConsumer):
+            schema_class = WebSocketMessageSchema
+            batching = True
+            batch_max_latency = 10
+            batch_max_size = 2
+
+            async def test(self, content):
+                return await self.send_batched(await self.encode_json(content))
+
+            async def direct(self, content):
+                return await self.send_json(content)
+
+        return ConsumerClass
+
+    @pytest.mark.asyncio
+    async def test_frames_are_batched_by_size_ok(self, consumer):
+        communicator = WebsocketCommunicator(consumer.as_asgi(), '/ws/test/')
+        with mock.patch.object(consumer, 'batch_max_latency', 10000):
+            for index in range(2):
+                await communicator.send_json_to({'type': 'test', 'index': index})
+            response = await communicator.receive_json_from()
+
+        assert response == {'type': 'batch', 'events': [{'index': 0}, {'index': 1}]}
+        assert await communicator.receive_nothing()
+
+    @pytest.mark.asyncio
+    async def test_frames_are_batched_by_latency_ok(self, consumer):
+        communicator = WebsocketCommunicator(consumer.as_asgi(), '/ws/test/')
+        await communicator.send_json_to({'type': 'test', 'index': 0})
+        response = await communicator.receive_json_from()
+
+        assert response == {'type': 'batch', 'events': [{'index': 0}]}
+
+    @pytest.mark.asyncio
+    async def test_direct_frames_go_after_batched_ones_ok(self, consumer):
+        communicator = WebsocketCommunicator(consumer.as_asgi(), '/ws/test/')
+        with mock.patch.object(consumer, 'batch_max_latency', 10000):
+            await communicator.send_json_to({'type': 'test', 'index': 0})
+            await communicator.send_json_to({'type': 'direct', 'index': 1})
+            responses = [await communicator.receive_json_from() for _ in range(2)]
+
+        assert responses == [{'type': 'batch', 'events': [{'index': 0}]}, {'index': 1}]
+
+    @pytest.mark.asyncio
+    async def test_frames_are_not_batched_unless_enabled_ok(self, consumer):
+        communicator = WebsocketCommunicator(consumer.as_asgi(), '/ws/test/')
+        with mock.patch.object(consumer, 'batching', False):
+            await communicator.send_json_to({'type': 'test', 'index': 0})
+            response = await communicator.receive_json_from()
+
+        assert response == {'index': 0}
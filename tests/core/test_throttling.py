@@ -0,0 +1,83 @@
+from unittest import mock
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from core.throttling import MemoryTokenBuckets, RedisTokenBuckets, TokenBucket, parse_rate
+from tests.utils import is_redis_available, make_redis_channel_layer
+
+requires_redis = pytest.mark.skipif(not is_redis_available(), reason='Redis is not available.')
+
+
+class TestParseRate:
+    def test_rate_ok(self):
+        assert parse_rate('120/min') == (120, 2)
+        assert parse_rate('5/s') == (5, 5)
+
+    def test_no_rate_ok(self):
+        assert parse_rate(None) is None
+
+    def test_invalid_rate_ko(self):
+        with pytest.raises(ImproperlyConfigured):
+            parse_rate('120/year')
+
+
+class TestTokenBucket:
+    @mock.patch('core.throttling.time.monotonic')
+    def test_burst_then_wait_ok(self, mocker_monotonic: mock.MagicMock):
+        mocker_monotonic.return_value = 0
+        bucket = TokenBucket(2, 1)
+
+        assert [bucket.consume() for _ in range(3)] == [0, 0, 1]
+
+    @mock.patch('core.throttling.time.monotonic')
+    def test_tokens_are_refilled_ok(self, mocker_monotonic: mock.MagicMock):
+        mocker_monotonic.return_value = 0
+        bucket = TokenBucket(2, 1)
+        bucket.consume()
+        bucket.consume()
+        mocker_monotonic.return_value = 1.5
+
+        assert bucket.consume() == 0
+        assert bucket.consume() == pytest.approx(0.5)
+
+
+class TestMemoryTokenBuckets:
+    @pytest.mark.asyncio
+    async def test_buckets_by_key_ok(self):
+        buckets = MemoryTokenBuckets()
+
+        assert await buckets.consume('a', 1, 1) == 0
+        assert await buckets.consume('a', 1, 1) > 0
+        assert await buckets.consume('b', 1, 1) == 0
+
+
+@requires_redis
+class TestRedisTokenBuckets:
+    @pytest.mark.asyncio
+    async def test_buckets_by_key_ok(self):
+        buckets = RedisTokenBuckets(make_redis_channel_layer())
+
+        assert await buckets.consume('a', 1, 1) == 0
+        assert await buckets.consume('a', 1, 1) > 0
+        assert await buckets.consume('b', 1, 1) == 0
+        await buckets.flush()
+
+    @pytest.mark.asyncio
+    async def test_burst_then_wait_ok(self):
+        buckets = RedisTokenBuckets(make_redis_channel_layer())
+
+        waits = [await buckets.consume('a', 2, 1) for _ in range(3)]
+        await buckets.flush()
+
+        assert waits[:2] == [0, 0]
+        assert 0 < waits[2] <= 1
+
+    @pytest.mark.asyncio
+    async def test_flush_refills_buckets_ok(self):
+        buckets = RedisTokenBuckets(make_redis_channel_layer())
+        await buckets.consume('a', 1, 0.001)
+        await buckets.flush()
+
+        assert await buckets.consume('a', 1, 0.001) == 0
+        await buckets.flush()
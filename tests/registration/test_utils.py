@@ -0,0 +1,70 @@
+from django.apps import apps
+from django.conf import settings
+from django.test import TestCase
+from model_bakery import baker
+
+from api.serializers.registration import BotSerializer, SimpleUserSerializer, UserSerializer
+from common.constants import models as constants
+from registration.utils import BotIdentity, bot_identity
+
+User = apps.get_model(constants.REGISTRATION_USER)
+Profile = apps.get_model(constants.REGISTRATION_PROFILE)
+
+
+class TestBotIdentity(TestCase):
+
+    def setUp(self):
+        self.identity = BotIdentity()
+
+    def tearDown(self):
+        # NOTE: Changes made to the bot are rolled back, so cached data has to go too
+        bot_identity.clear()
+
+    def test_user_is_found_by_email_ok(self):
+        self.assertEqual(User.objects.get(email=settings.DEFAULT_FROM_EMAIL), self.identity.user)
+
+    def test_user_is_cached_ok(self):
+        self.identity.user
+        with self.assertNumQueries(0):
+            self.assertEqual(self.identity.user.pk, self.identity.id)
+
+    def test_serialize_is_cached_ok(self):
+        expected = BotSerializer(User.objects.get(email=settings.DEFAULT_FROM_EMAIL)).data
+        self.identity.serialize(BotSerializer)
+        with self.assertNumQueries(0):
+            self.assertEqual(expected, self.identity.serialize(BotSerializer))
+            self.assertEqual(self.identity.id, self.identity.serialize(SimpleUserSerializer)['id'])
+
+    def test_get_bot_uses_bot_identity_ok(self):
+        bot_identity.user
+        with self.assertNumQueries(0):
+            self.assertEqual(bot_identity.user, User.get_bot())
+
+    def test_saving_bot_clears_cache_ok(self):
+        bot_identity.serialize(SimpleUserSerializer)
+        bot = User.objects.get(email=settings.DEFAULT_FROM_EMAIL)
+        bot.first_name = 'Oil'
+        bot.save(update_fields=['first_name'])
+
+        self.assertEqual('Oil', bot_identity.serialize(SimpleUserSerializer)['first_name'])
+
+    def test_serialize_returns_copy_ok(self):
+        data = bot_identity.serialize(SimpleUserSerializer)
+        data['first_name'] = 'Changed'
+
+        self.assertNotEqual('Changed', bot_identity.serialize(SimpleUserSerializer)['first_name'])
+
+    def test_saving_bot_profile_clears_cache_ok(self):
+        profile, _created = Profile.objects.get_or_create(user=bot_identity.user)
+        bot_identity.serialize(UserSerializer)
+        profile.bio = 'Rolling dice since 2020.'
+        profile.save(update_fields=['bio'])
+
+        self.assertEqual('Rolling dice since 2020.', bot_identity.serialize(UserSerializer)['profile']['bio'])
+
+    def test_saving_other_users_keeps_cache_ok(self):
+        bot_identity.user
+        baker.make_recipe('registration.user')
+
+        with self.assertNumQueries(0):
+            bot_identity.user
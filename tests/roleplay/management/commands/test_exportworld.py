@@ -0,0 +1,37 @@
+import csv
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from roleplay.enums import SiteTypes
+from tests.utils import generate_place
+
+
+class TestExportWorldCommand(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.world = generate_place(site_type=SiteTypes.WORLD)
+        cls.place = generate_place(owner=cls.world.owner, parent_site=cls.world)
+
+    def test_call_command_ok(self):
+        out = StringIO()
+        call_command('exportworld', self.world.pk, stdout=out)
+        places = json.loads(out.getvalue())
+
+        self.assertListEqual([self.world.pk, self.place.pk], [place['id'] for place in places])
+
+    def test_call_command_output_csv_ok(self):
+        with tempfile.NamedTemporaryFile('r', suffix='.csv', newline='') as file:
+            call_command('exportworld', self.world.pk, '--format', 'csv', '--output', file.name, stdout=StringIO())
+            rows = list(csv.DictReader(file))
+
+        self.assertListEqual([str(self.world.pk), str(self.place.pk)], [row['id'] for row in rows])
+        self.assertEqual(str(self.world.pk), rows[1]['parent'])
+
+    def test_unknown_place_ko(self):
+        with self.assertRaisesMessage(CommandError, 'Given place does not exist.'):
+            call_command('exportworld', 0, stdout=StringIO())
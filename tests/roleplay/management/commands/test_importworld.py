@@ -0,0 +1,58 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from model_bakery import baker
+
+from common.constants import models
+from roleplay.enums import SiteTypes
+
+Place = apps.get_model(models.ROLEPLAY_PLACE)
+
+
+class TestImportWorldCommand(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = baker.make_recipe('registration.user')
+
+    def write_document(self, content: str, suffix: str = '.json') -> str:
+        file = tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False)
+        self.addCleanup(file.close)
+        file.write(content)
+        file.flush()
+        return file.name
+
+    def test_call_command_ok(self):
+        path = self.write_document(json.dumps([
+            {'id': 1, 'name': 'Earth', 'site_type': SiteTypes.WORLD},
+            {'id': 2, 'parent': 1, 'name': 'Europe', 'site_type': SiteTypes.CONTINENT},
+        ]))
+        out = StringIO()
+        call_command('importworld', path, self.owner.username, '--public', stdout=out)
+        world = Place.objects.get(owner=self.owner, parent_site__isnull=True)
+
+        self.assertEqual(f'World {world.pk} imported with 2 places.\n', out.getvalue())
+        self.assertTrue(world.is_public)
+
+    def test_call_command_csv_ok(self):
+        path = self.write_document(f'id,parent,name,site_type\n1,,Earth,{SiteTypes.WORLD}\n', suffix='.csv')
+
+        call_command('importworld', path, self.owner.username, stdout=StringIO())
+
+        self.assertTrue(Place.objects.filter(owner=self.owner, name='Earth').exists())
+
+    def test_unknown_owner_ko(self):
+        path = self.write_document('[]')
+
+        with self.assertRaisesMessage(CommandError, 'Given owner does not exist.'):
+            call_command('importworld', path, 'nobody', stdout=StringIO())
+
+    def test_invalid_document_ko(self):
+        path = self.write_document('[]')
+
+        with self.assertRaises(CommandError):
+            call_command('importworld', path, self.owner.username, stdout=StringIO())
@@ -10,6 +10,7 @@ from model_bakery import baker
 from PIL import Image
 
 from roleplay import enums, forms, models
+from roleplay.utils.trees import get_place_tree
 from tests.utils import fake
 
 
@@ -79,6 +80,18 @@ class TestPlaceForm(TestCase):
 
         self.assertEqual(place.owner, self.parent_site.owner)
 
+    def test_parent_sites_from_tree_ok(self):
+        other_site = baker.make_recipe('roleplay.place', owner=self.owner)
+        tree = get_place_tree(self.parent_site.tree_id)
+        form = self.form_class(data=self.data_ok, parent_sites=tree.nodes)
+
+        self.assertListEqual([self.parent_site.pk], [value for value, label in form.fields['parent_site'].choices][1:])
+        self.assertTrue(form.is_valid())
+
+        form = self.form_class(data={**self.data_ok, 'parent_site': other_site.pk}, parent_sites=tree.nodes)
+
+        self.assertFalse(form.is_valid())
+
 
 class TestWorldForm(TestCase):
     form_class = forms.WorldForm
@@ -0,0 +1,142 @@
+from unittest import mock
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from common.constants import models
+from roleplay.enums import SiteTypes
+from roleplay.hierarchy import PathHierarchy, make_path, split_path, update_path
+from tests.utils import generate_place
+
+Place = apps.get_model(models.ROLEPLAY_PLACE)
+
+
+class TestPathHierarchy(TestCase):
+
+    def setUp(self):
+        self.world = generate_place(site_type=SiteTypes.WORLD)
+        self.continent = generate_place(owner=self.world.owner, parent_site=self.world, site_type=SiteTypes.CONTINENT)
+        self.city = generate_place(owner=self.world.owner, parent_site=self.continent, site_type=SiteTypes.CITY)
+        self.island = generate_place(owner=self.world.owner, parent_site=self.world, site_type=SiteTypes.ISLAND)
+        self.other_world = generate_place(owner=self.world.owner, site_type=SiteTypes.WORLD)
+        self.places = [self.world, self.continent, self.city, self.island, self.other_world]
+        for place in self.places:
+            place.refresh_from_db()
+
+    def assertSamePlaces(self, expected_places, places):
+        self.assertListEqual([place.pk for place in expected_places], [place.pk for place in places])
+
+    def test_path_is_set_on_save_ok(self):
+        self.assertEqual(make_path('', self.world.pk), self.world.path)
+        self.assertListEqual([self.world.pk, self.continent.pk, self.city.pk], split_path(self.city.path))
+
+    def test_tree_and_level_are_set_on_save_ok(self):
+        for place, level in zip(self.places, (0, 1, 2, 1, 0)):
+            self.assertEqual(level, place.level)
+        self.assertListEqual([self.world.pk] * 4, [place.tree_id for place in self.places[:-1]])
+        self.assertEqual(self.other_world.pk, self.other_world.tree_id)
+
+    def test_queries_ok(self):
+        hierarchy = PathHierarchy()
+
+        self.assertSamePlaces([self.continent, self.city, self.island], hierarchy.get_descendants(self.world))
+        self.assertSamePlaces(
+            [self.world, self.continent, self.city, self.island],
+            hierarchy.get_descendants(self.world, include_self=True),
+        )
+        self.assertSamePlaces([], hierarchy.get_descendants(self.city))
+        self.assertSamePlaces([self.world, self.continent], hierarchy.get_ancestors(self.city))
+        self.assertSamePlaces([self.continent, self.world], hierarchy.get_ancestors(self.city, ascending=True))
+        self.assertSamePlaces(
+            [self.world, self.continent, self.city], hierarchy.get_ancestors(self.city, include_self=True),
+        )
+        self.assertSamePlaces([], hierarchy.get_ancestors(self.world))
+        self.assertSamePlaces([self.continent, self.island], hierarchy.get_children(self.world))
+        self.assertSamePlaces([self.world, self.continent, self.city], hierarchy.get_family(self.continent))
+        self.assertEqual(self.world, hierarchy.get_root(self.city))
+        self.assertEqual(self.other_world, hierarchy.get_root(self.other_world))
+
+    def test_new_place_writes_just_itself_ok(self):
+        with CaptureQueriesContext(connection) as context:
+            place = generate_place(owner=self.world.owner, parent_site=self.city)
+        updates = [query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE')]
+        path_updates = [sql for sql in updates if '"path"' in sql]
+
+        self.assertEqual(1, len(path_updates))
+        self.assertTrue(path_updates[0].endswith(f'= {place.pk}'))
+        self.assertListEqual([self.world.pk, self.continent.pk, self.city.pk, place.pk], split_path(place.path))
+        self.assertEqual(3, place.level)
+        self.assertEqual(self.world.pk, place.tree_id)
+
+    def test_saving_place_without_moving_it_keeps_its_path_ok(self):
+        self.city.name = 'Madrid'
+
+        with mock.patch('roleplay.signals.handlers.update_path') as mocker:
+            self.city.save()
+
+        mocker.assert_not_called()
+
+        self.assertEqual(make_path(self.continent.path, self.city.pk), Place.objects.get(pk=self.city.pk).path)
+
+    def test_moving_place_updates_paths_of_its_places_ok(self):
+        self.continent.parent_site = self.other_world
+        self.continent.save()
+        self.city.refresh_from_db()
+
+        self.assertListEqual([self.other_world.pk, self.continent.pk, self.city.pk], split_path(self.city.path))
+        self.assertEqual(self.other_world, self.city.get_root())
+        self.assertListEqual([self.other_world.pk] * 2, [self.continent.tree_id, self.city.tree_id])
+        self.assertListEqual([1, 2], [self.continent.level, self.city.level])
+        self.assertSamePlaces([self.world, self.island], self.world.get_descendants(include_self=True))
+
+    def test_moving_place_deeper_updates_levels_of_its_places_ok(self):
+        self.continent.parent_site = self.island
+        self.continent.save()
+        self.city.refresh_from_db()
+
+        self.assertListEqual([2, 3], [self.continent.level, self.city.level])
+        self.assertEqual(self.world.pk, self.city.tree_id)
+
+    def test_moving_place_to_root_makes_it_a_world_ok(self):
+        self.continent.parent_site = None
+        self.continent.save()
+        self.city.refresh_from_db()
+
+        self.assertListEqual([0, 1], [self.continent.level, self.city.level])
+        self.assertListEqual([self.continent.pk] * 2, [self.continent.tree_id, self.city.tree_id])
+
+    def test_moving_place_inside_itself_ko(self):
+        for parent in (self.continent, self.city):
+            self.continent.parent_site = parent
+
+            with self.assertRaises(ValidationError):
+                self.continent.save()
+
+            self.assertEqual(self.world.pk, Place.objects.get(pk=self.continent.pk).parent_site_id)
+
+    def test_deep_tree_ok(self):
+        place = self.world
+        for _ in range(50):
+            place = generate_place(owner=self.world.owner, parent_site=place)
+
+        self.assertEqual(50, place.level)
+        self.assertEqual(51, len(place.get_ancestors(include_self=True)))
+        self.assertEqual(50, self.world.get_descendant_count() - 3)
+
+    def test_path_of_new_place_reads_just_its_parent_ok(self):
+        Place.objects.filter(pk=self.city.pk).update(path='')
+        self.city.path = ''
+
+        with self.assertNumQueries(2):
+            update_path(self.city)
+
+        self.assertEqual(make_path(self.continent.path, self.city.pk), Place.objects.get(pk=self.city.pk).path)
+
+    def test_unsaved_place_has_no_descendants_ok(self):
+        place = Place(name='Harbour', owner=self.world.owner)
+
+        self.assertListEqual([], list(PathHierarchy().get_descendants(place)))
+        self.assertListEqual([], list(PathHierarchy().get_family(place)))
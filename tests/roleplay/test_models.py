@@ -8,7 +8,7 @@ from unittest.mock import MagicMock, patch
 
 from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.db import connection
+from django.db import connection, transaction
 from django.db.utils import DataError, IntegrityError
 from django.test import TestCase
 from django.utils import timezone
@@ -18,6 +18,7 @@ from model_bakery import baker
 from common.constants import models as constants
 from roleplay.enums import DomainTypes, RoleplaySystems, SiteTypes
 from roleplay.models import Campaign, Domain, Place, PlayerInCampaign, Race, RaceUser, Session
+from roleplay.utils.trees import schedule_world_gallery_update
 from tests.mocks import discord
 from tests.utils import fake
 
@@ -144,6 +145,80 @@ class TestPlace(TestCase):
         for place in self.model.objects.all():
             os.unlink(place.image.path)
 
+    def test_world_images_are_read_from_gallery_ok(self):
+        world = generate_place(image='roleplay/place/world.jpg')
+        generate_place(owner=world.owner, parent_site=world)
+        city = generate_place(owner=world.owner, parent_site=world, image='roleplay/place/city.jpg')
+        world = self.model.objects.get(pk=world.pk)
+
+        with self.assertNumQueries(0):
+            images = [image.name for image in world.images]
+
+        self.assertListEqual(['roleplay/place/world.jpg', 'roleplay/place/city.jpg'], images)
+        self.assertListEqual(['roleplay/place/city.jpg'], [image.name for image in city.images])
+
+    def test_world_gallery_is_updated_ok(self):
+        world = generate_place()
+        other_world = generate_place(owner=world.owner)
+        city = generate_place(owner=world.owner, parent_site=world, image='roleplay/place/city.jpg')
+        town = generate_place(owner=world.owner, parent_site=world, image='roleplay/place/town.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            town.delete()
+
+        self.assertListEqual(['roleplay/place/city.jpg'], self.model.objects.get(pk=world.pk).gallery)
+
+        city.parent_site = other_world
+        city.save()
+
+        self.assertListEqual([], self.model.objects.get(pk=world.pk).gallery)
+        self.assertListEqual(['roleplay/place/city.jpg'], self.model.objects.get(pk=other_world.pk).gallery)
+
+    def test_world_gallery_is_not_updated_if_image_and_path_are_kept_ok(self):
+        world = generate_place()
+        city = generate_place(owner=world.owner, parent_site=world, image='roleplay/place/city.jpg')
+        city = self.model.objects.get(pk=city.pk)
+        city.name = 'Madrid'
+
+        with patch('roleplay.signals.handlers.update_world_gallery') as mocker:
+            city.save()
+            generate_place(owner=world.owner, parent_site=world)
+
+        mocker.assert_not_called()
+
+    def test_world_gallery_is_updated_if_image_changes_ok(self):
+        world = generate_place()
+        city = generate_place(owner=world.owner, parent_site=world)
+        city = self.model.objects.get(pk=city.pk)
+        city.image = 'roleplay/place/city.jpg'
+        city.save()
+
+        self.assertListEqual(['roleplay/place/city.jpg'], self.model.objects.get(pk=world.pk).gallery)
+
+    def test_world_gallery_is_updated_once_when_places_are_deleted_ok(self):
+        world = generate_place(image='roleplay/place/world.jpg')
+        continent = generate_place(owner=world.owner, parent_site=world, image='roleplay/place/continent.jpg')
+        for number in range(3):
+            generate_place(owner=world.owner, parent_site=continent, image=f'roleplay/place/city_{number}.jpg')
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            continent.delete()
+
+        self.assertEqual(1, len([callback for callback in callbacks if getattr(callback, 'args', None) == (world.pk,)]))
+        self.assertListEqual(['roleplay/place/world.jpg'], self.model.objects.get(pk=world.pk).gallery)
+
+    def test_world_gallery_update_is_scheduled_again_after_rollback_ok(self):
+        world = generate_place()
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                schedule_world_gallery_update(world.pk)
+                raise IntegrityError
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            schedule_world_gallery_update(world.pk)
+            schedule_world_gallery_update(world.pk)
+
+        self.assertEqual(1, len(callbacks))
+
     @unittest.skipIf('sqlite3' in connection_engine, 'SQLite takes Varchar as Text')
     def test_max_name_length_ko(self):
         name = fake.password(length=101)
@@ -1,8 +1,12 @@
+import random
+
 import pytest
 from django.conf import settings
 
 from core.exceptions import OilAndRopeException
-from roleplay.utils.dice import is_dice_roll, roll_dice
+from roleplay.utils import dice
+from roleplay.utils.dice import (DiceTerm, compile_roll, is_dice_roll, normalize_roll, roll_dice, roll_distribution,
+                                 simulate_roll)
 
 
 def test_is_dice_roll_just_dice_ok():
@@ -112,3 +116,238 @@ def test_dice_roll_simple_roll_ok():
 
     assert result <= 22 and result >= 3
     assert 'd20' in rolls and '+2' in rolls
+
+
+def test_dice_roll_repeated_terms_are_accumulated_ok():
+    roll = '1+1+1d1+1d1'
+    result, rolls = roll_dice(roll)
+
+    assert 4 == result
+    assert [1, 1] == rolls['+1d1']
+
+
+def test_dice_roll_capital_dice_keeps_written_keys_ok():
+    result, rolls = roll_dice('2D1-1+1d1')
+
+    assert 2 == result
+    assert {'2D1': [1, 1], '-1': [1], '+1d1': [1]} == rolls
+
+
+def test_dice_roll_dice_without_faces_ko():
+    with pytest.raises(OilAndRopeException, match='Dice `.+` must have at least one face.'):
+        roll_dice('1d0')
+
+
+def test_compile_roll_is_cached_ok():
+    compile_roll.cache_clear()
+    plan = compile_roll(normalize_roll('4D6+2'))
+
+    assert plan is compile_roll(normalize_roll(' 4d6+2 '))
+    assert 1 == compile_roll.cache_info().misses
+
+
+def test_compile_roll_terms_ok():
+    plan = compile_roll('d20-2d4+3')
+
+    assert (
+        DiceTerm(key='d20', sign=1, count=1, faces=20),
+        DiceTerm(key='-2d4', sign=-1, count=2, faces=4),
+        DiceTerm(key='+3', sign=1, count=3),
+    ) == plan.terms
+
+
+def test_simulate_roll_ok(mocker):
+    mocker.patch.object(dice, 'numpy', None)
+    simulation = simulate_roll('2d6+1', 500)
+
+    assert 500 == len(simulation.totals)
+    assert 3 <= simulation.minimum <= simulation.maximum <= 13
+    assert simulation.minimum <= simulation.mean <= simulation.maximum
+
+
+def test_simulate_roll_subtraction_ok(mocker):
+    mocker.patch.object(dice, 'numpy', None)
+    simulation = simulate_roll('1d1-3d1+2', 10)
+
+    assert [0] * 10 == simulation.totals
+    assert 0 == simulation.stdev
+
+
+def test_simulate_roll_with_numpy_ok():
+    pytest.importorskip('numpy')
+    simulation = simulate_roll('1000d6', 20)
+
+    assert 20 == len(simulation.totals)
+    assert all(1000 <= total <= 6000 for total in simulation.totals)
+
+
+def test_simulate_roll_is_reproducible_with_seeded_rng_ok():
+    first_simulation = simulate_roll('4d6', 50, random.Random(42))
+    second_simulation = simulate_roll('4d6', 50, random.Random(42))
+
+    assert first_simulation.totals == second_simulation.totals
+
+
+def test_simulate_roll_without_trials_ko():
+    with pytest.raises(OilAndRopeException, match='Number of trials must be greater than zero.'):
+        simulate_roll('1d20', 0)
+
+
+def test_simulate_roll_without_dice_too_many_trials_ko(settings):
+    settings.DICE_MAX_TRIALS = 10
+    with pytest.raises(OilAndRopeException, match='Number of trials exceeds the limit of 10.'):
+        simulate_roll('5', 11)
+
+
+def test_roll_distribution_ok():
+    distribution = roll_distribution('2d6-1d4+1')
+
+    assert -1 == distribution.minimum
+    assert 12 == distribution.maximum
+    assert pytest.approx(1) == sum(distribution.pmf)
+    assert pytest.approx(18 / 144) == distribution.probabilities[7]
+    assert pytest.approx(5.5) == distribution.mean
+
+
+def test_roll_distribution_large_pool_ok():
+    distribution = roll_distribution('100d20')
+
+    assert pytest.approx(1050) == distribution.mean
+    assert pytest.approx(3325) == distribution.variance
+    assert 1050 == distribution.percentile(50)
+
+
+def test_roll_distribution_merges_pools_ok():
+    assert roll_distribution('2d6+3d6').pmf == pytest.approx(roll_distribution('5d6').pmf)
+
+
+def test_roll_distribution_too_big_ko(settings):
+    settings.DICE_DISTRIBUTION_MAX_DICE = 10
+    with pytest.raises(OilAndRopeException, match='Dice roll `.+` is too big to calculate its distribution.'):
+        roll_distribution('11d6')
+
+
+@pytest.mark.parametrize('roll', ['4d6kh3', '4d6k3', '2d20kl1', '4d6dl1', '4d6dh1', '1d6!', '1d20r1', '3d6r1!kh2-1'])
+def test_is_dice_roll_with_modifiers_ok(roll):
+    assert is_dice_roll(roll), f'Dice roll with modifiers `{roll}` is not working'
+
+
+@pytest.mark.parametrize('roll', ['4d6kx3', '4d6d', '1d6!!', '4d6kh3kl1', '1!'])
+def test_is_dice_roll_with_incorrect_modifiers_ko(roll):
+    assert not is_dice_roll(roll), f'Incorrect dice roll with modifiers `{roll}` is taken as correct'
+
+
+def test_compile_roll_with_modifiers_ok():
+    term, = compile_roll('3d6r1!k2').terms
+
+    assert DiceTerm(
+        key='3d6r1!k2', sign=1, count=3, faces=6, reroll=1, explode=True, selection='kh', selection_count=2,
+    ) == term
+
+
+def test_dice_roll_keep_highest_ok(mocker):
+    mocker.patch('random.choices', return_value=[2, 6, 1, 4])
+    result, rolls = roll_dice('4d6kh3')
+
+    assert 12 == result
+    assert [6, 4, 2] == rolls['4d6kh3']
+
+
+def test_dice_roll_keep_lowest_ok(mocker):
+    mocker.patch('random.choices', return_value=[17, 3])
+    result, rolls = roll_dice('2d20kl1')
+
+    assert 3 == result
+    assert [3] == rolls['2d20kl1']
+
+
+def test_dice_roll_drop_ok(mocker):
+    mocker.patch('random.choices', return_value=[2, 6, 1, 4])
+
+    assert 12 == roll_dice('4d6dl1')[0]
+    assert 7 == roll_dice('4d6dh1')[0]
+    assert 0 == roll_dice('4d6dh5')[0]
+
+
+def test_dice_roll_reroll_ok(mocker):
+    mocker.patch('random.choices', return_value=[1, 5])
+    mocker.patch('random.randint', return_value=3)
+    result, rolls = roll_dice('2d6r2')
+
+    assert 8 == result
+    assert [3, 5] == rolls['2d6r2']
+
+
+def test_dice_roll_explode_ok(mocker):
+    mocker.patch('random.choices', side_effect=[[6, 2], [6], [3]])
+    result, rolls = roll_dice('2d6!')
+
+    assert 17 == result
+    assert [6, 2, 6, 3] == rolls['2d6!']
+
+
+def test_dice_roll_explode_is_capped_ok():
+    result, rolls = roll_dice('1d1!')
+
+    assert dice.EXPLODE_MAX_ITERATIONS + 1 == result
+    assert dice.EXPLODE_MAX_ITERATIONS + 1 == len(rolls['1d1!'])
+
+
+def test_roll_cost_counts_exploding_dice_ok():
+    cost = compile_roll('2d6!+1d4').cost
+
+    assert 2 * (dice.EXPLODE_MAX_ITERATIONS + 1) + 1 == cost.dice
+
+
+def test_dice_roll_too_many_exploding_dice_ko():
+    with pytest.raises(OilAndRopeException, match='exceeds the limit of .+ dice'):
+        roll_dice('1000d1!')
+
+
+def test_simulate_roll_with_modifiers_ok():
+    simulation = simulate_roll('4d6kh3', 100)
+
+    assert 3 <= simulation.minimum <= simulation.maximum <= 18
+
+
+def test_roll_distribution_with_modifiers_ko():
+    with pytest.raises(OilAndRopeException, match='Distribution of dice roll `.+` cannot be calculated'):
+        roll_distribution('4d6kh3')
+
+
+def test_dice_roll_too_long_ko(settings):
+    settings.DICE_MAX_LENGTH = 10
+    with pytest.raises(OilAndRopeException, match='Dice roll exceeds the limit of 10 characters.'):
+        roll_dice('1+1+1+1+1+1')
+
+
+def test_dice_roll_too_many_terms_ko(settings):
+    settings.DICE_MAX_TERMS = 2
+    with pytest.raises(OilAndRopeException, match='Dice roll `.+` exceeds the limit of 2 terms.'):
+        roll_dice('1d6+1d4+1')
+
+
+def test_dice_roll_too_many_dice_ko(settings):
+    settings.DICE_MAX_DICE = 10
+    with pytest.raises(OilAndRopeException, match='Dice roll `.+` exceeds the limit of 10 dice.'):
+        roll_dice('6d6+5d4')
+
+
+def test_dice_roll_too_many_faces_ko(settings):
+    settings.DICE_MAX_FACES = 100
+    with pytest.raises(OilAndRopeException, match='Dice roll `.+` exceeds the limit of 100 faces.'):
+        roll_dice('1d1000')
+
+
+def test_simulate_roll_too_many_dice_ko(settings):
+    settings.DICE_MAX_SIMULATED_DICE = 1000
+    with pytest.raises(OilAndRopeException, match='Rolling `.+` that many times exceeds the limit of 1000 dice.'):
+        simulate_roll('10d6', 101)
+
+
+def test_roll_cost_ok():
+    cost = compile_roll('4d6kh3-2d20+3').cost
+
+    assert 3 == cost.terms
+    assert 6 == cost.dice
+    assert 20 == cost.faces
@@ -0,0 +1,77 @@
+from django.apps import apps
+from django.test import TestCase
+
+from common.constants import models
+from roleplay.enums import SiteTypes
+from roleplay.utils.trees import get_place_tree, get_place_tree_cache_key, get_place_tree_version
+from tests.utils import generate_place
+
+Place = apps.get_model(models.ROLEPLAY_PLACE)
+
+
+class TestPlaceTree(TestCase):
+
+    def setUp(self):
+        self.world = generate_place(site_type=SiteTypes.WORLD)
+        self.continent = generate_place(owner=self.world.owner, parent_site=self.world, site_type=SiteTypes.CONTINENT)
+        self.city = generate_place(owner=self.world.owner, parent_site=self.continent, site_type=SiteTypes.CITY)
+        self.island = generate_place(owner=self.world.owner, parent_site=self.world, site_type=SiteTypes.ISLAND)
+        self.world.refresh_from_db()
+
+    def test_nodes_are_in_tree_order_ok(self):
+        tree = get_place_tree(self.world.tree_id)
+
+        self.assertListEqual(list(self.world.get_family().values_list('pk', flat=True)), tree.ids)
+        self.assertListEqual([None, self.world.pk, self.continent.pk, self.world.pk], [node.parent for node in tree])
+        self.assertEqual(self.city.name, tree.nodes[2].name)
+
+    def test_tree_is_cached_ok(self):
+        get_place_tree(self.world.tree_id)
+
+        with self.assertNumQueries(0):
+            tree = get_place_tree(self.world.tree_id)
+
+        self.assertEqual(4, len(tree))
+
+    def test_get_descendants_ok(self):
+        tree = get_place_tree(self.world.tree_id)
+
+        self.assertListEqual([self.city.pk], [node.id for node in tree.get_descendants(self.continent.pk)])
+        self.assertListEqual(
+            [self.continent.pk, self.city.pk],
+            [node.id for node in tree.get_descendants(self.continent.pk, include_self=True)],
+        )
+        self.assertListEqual(
+            [self.continent.pk, self.island.pk],
+            [node.id for node in tree.get_descendants(self.world.pk, depth=1)],
+        )
+        self.assertListEqual([], tree.get_descendants(0))
+
+    def test_saving_place_refreshes_tree_ok(self):
+        version = get_place_tree_version(self.world.tree_id)
+        key = get_place_tree_cache_key(self.world.tree_id, 'test')
+        get_place_tree(self.world.tree_id)
+        self.city.name = 'Vice City'
+        self.city.save()
+        tree = get_place_tree(self.world.tree_id)
+
+        self.assertNotEqual(version, tree.version)
+        self.assertNotEqual(key, get_place_tree_cache_key(self.world.tree_id, 'test'))
+        self.assertEqual('Vice City', tree.nodes[2].name)
+
+    def test_deleting_place_refreshes_tree_ok(self):
+        get_place_tree(self.world.tree_id)
+        self.continent.delete()
+
+        self.assertListEqual([self.world.pk, self.island.pk], get_place_tree(self.world.tree_id).ids)
+
+    def test_moving_place_to_another_tree_refreshes_both_trees_ok(self):
+        other_world = generate_place(owner=self.world.owner, site_type=SiteTypes.WORLD)
+        get_place_tree(self.world.tree_id)
+        get_place_tree(other_world.tree_id)
+        island = Place.objects.get(pk=self.island.pk)
+        island.parent_site = other_world
+        island.save()
+
+        self.assertNotIn(self.island.pk, get_place_tree(self.world.tree_id).ids)
+        self.assertIn(self.island.pk, get_place_tree(other_world.tree_id).ids)
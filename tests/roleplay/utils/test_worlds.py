@@ -0,0 +1,186 @@
+import json
+from io import StringIO
+
+from django.apps import apps
+from django.test import TestCase
+from model_bakery import baker
+
+from common.constants import models
+from core.exceptions import OilAndRopeException
+from roleplay.enums import SiteTypes
+from roleplay.hierarchy import make_path
+from roleplay.utils.trees import get_place_tree
+from roleplay.utils.worlds import export_world, export_world_document, import_world, read_json_places
+
+Place = apps.get_model(models.ROLEPLAY_PLACE)
+
+PLACES = [
+    {'id': 'earth', 'name': 'Earth', 'site_type': SiteTypes.WORLD, 'image': 'roleplay/place/earth.png'},
+    {'id': 'europe', 'parent': 'earth', 'name': 'Europe', 'site_type': SiteTypes.CONTINENT},
+    {
+        'id': 'spain', 'parent': 'europe', 'name': 'Spain', 'site_type': SiteTypes.COUNTRY,
+        'image': 'roleplay/place/spain.png',
+    },
+    {'id': 'madrid', 'parent': 'spain', 'name': 'Madrid', 'site_type': SiteTypes.CITY},
+    {'id': 'africa', 'parent': 'earth', 'name': 'Africa', 'description': 'Hot.', 'site_type': SiteTypes.CONTINENT},
+]
+
+
+class TestReadJsonPlaces(TestCase):
+
+    def test_places_split_between_chunks_ok(self):
+        stream = StringIO(json.dumps(PLACES))
+
+        places = list(read_json_places(stream, chunk_size=7))
+
+        self.assertListEqual(PLACES, places)
+
+    def test_empty_array_ok(self):
+        self.assertListEqual([], list(read_json_places(StringIO(' [ ] '))))
+
+    def test_not_array_ko(self):
+        with self.assertRaises(OilAndRopeException):
+            list(read_json_places(StringIO('{"id": 1}')))
+
+    def test_truncated_document_ko(self):
+        stream = StringIO(json.dumps(PLACES)[:-10])
+
+        with self.assertRaises(OilAndRopeException):
+            list(read_json_places(stream, chunk_size=16))
+
+
+class TestImportWorld(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = baker.make_recipe('registration.user')
+
+    def import_places(self, places: list, **kwargs):
+        return import_world(StringIO(json.dumps(places)), owner=self.owner, **kwargs)
+
+    def test_import_ok(self):
+        world, count = self.import_places(PLACES)
+
+        self.assertEqual(5, count)
+        self.assertEqual(5, Place.objects.filter(owner=self.owner, tree_id=world.tree_id).count())
+        self.assertEqual('Earth', world.name)
+        self.assertIsNone(world.parent_site)
+
+    def test_tree_is_built_ok(self):
+        world, _count = self.import_places(PLACES, batch_size=2)
+        spain = Place.objects.get(name='Spain')
+
+        self.assertListEqual(
+            ['Earth', 'Europe', 'Spain', 'Madrid', 'Africa'],
+            list(Place.objects.filter(tree_id=world.tree_id).order_by('path').values_list('name', flat=True)),
+        )
+        self.assertEqual(2, spain.level)
+        self.assertListEqual(['Madrid'], [place.name for place in spain.get_descendants()])
+        self.assertEqual(5, len(get_place_tree(world.tree_id)))
+
+    def test_paths_are_set_ok(self):
+        world, _count = self.import_places(PLACES, batch_size=2)
+        europe = Place.objects.get(name='Europe')
+        spain = Place.objects.get(name='Spain')
+
+        self.assertEqual(make_path(world.path, europe.pk), europe.path)
+        self.assertEqual(make_path(europe.path, spain.pk), spain.path)
+        self.assertListEqual(['Earth', 'Europe'], [place.name for place in spain.get_ancestors()])
+
+    def test_gallery_is_set_ok(self):
+        world, _count = self.import_places(PLACES)
+
+        self.assertListEqual(['roleplay/place/earth.png', 'roleplay/place/spain.png'], world.gallery)
+
+    def test_import_csv_ok(self):
+        stream = StringIO(
+            'id,parent,name,description,site_type,image\n'
+            f'1,,Earth,,{SiteTypes.WORLD},\n'
+            f'2,1,Europe,"Old, cold.",{SiteTypes.CONTINENT},\n'
+        )
+
+        world, count = import_world(stream, owner=self.owner, format='csv')
+
+        self.assertEqual(2, count)
+        self.assertEqual('Old, cold.', world.get_children().get().description)
+
+    def test_unknown_parent_ko(self):
+        places = [*PLACES, {'id': 'atlantis', 'parent': 'ocean', 'name': 'Atlantis'}]
+
+        with self.assertRaises(OilAndRopeException):
+            self.import_places(places)
+        self.assertFalse(Place.objects.filter(owner=self.owner).exists())
+
+    def test_invalid_place_ko(self):
+        places = [*PLACES, {'id': 'nowhere', 'parent': 'earth', 'name': 'Nowhere', 'site_type': 'somewhere'}]
+
+        with self.assertRaises(OilAndRopeException):
+            self.import_places(places)
+        self.assertFalse(Place.objects.filter(owner=self.owner).exists())
+
+    def test_invalid_image_ko(self):
+        images = (
+            f'roleplay/place/{"a" * 100}.png', '/etc/passwd', 'registration/profile/avatar.png',
+            'roleplay/place/../../registration/profile/avatar.png', 'roleplay/place/',
+        )
+        for image in images:
+            places = [*PLACES, {'id': 'nowhere', 'parent': 'earth', 'name': 'Nowhere', 'image': image}]
+
+            with self.subTest(image=image), self.assertRaises(OilAndRopeException):
+                self.import_places(places)
+        self.assertFalse(Place.objects.filter(owner=self.owner).exists())
+
+    def test_duplicated_place_ko(self):
+        for batch_size in (1, 10):
+            places = [*PLACES, {'id': 'africa', 'parent': 'europe', 'name': 'Africa'}]
+
+            with self.subTest(batch_size=batch_size), self.assertRaisesMessage(OilAndRopeException, 'Place #6'):
+                self.import_places(places, batch_size=batch_size)
+        self.assertFalse(Place.objects.filter(owner=self.owner).exists())
+
+    def test_empty_document_ko(self):
+        with self.assertRaises(OilAndRopeException):
+            self.import_places([])
+
+
+class TestExportWorld(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = baker.make_recipe('registration.user')
+        cls.world, _count = import_world(StringIO(json.dumps(PLACES)), owner=cls.owner)
+
+    def test_export_json_ok(self):
+        places = json.loads(''.join(export_world(self.world, chunk_size=2)))
+
+        self.assertListEqual(['Earth', 'Europe', 'Spain', 'Madrid', 'Africa'], [place['name'] for place in places])
+        self.assertIsNone(places[0]['parent'])
+        self.assertEqual(places[1]['id'], places[2]['parent'])
+
+    def test_export_place_as_world_ok(self):
+        europe = Place.objects.get(name='Europe')
+
+        places = json.loads(''.join(export_world(europe)))
+
+        self.assertListEqual(['Europe', 'Spain', 'Madrid'], [place['name'] for place in places])
+        self.assertIsNone(places[0]['parent'])
+
+    def test_export_document_ok(self):
+        with self.settings(PLACE_EXPORT_MAX_MEMORY_SIZE=16):
+            with export_world_document(self.world, chunk_size=2) as document:
+                places = json.loads(document.read())
+
+        self.assertListEqual(['Earth', 'Europe', 'Spain', 'Madrid', 'Africa'], [place['name'] for place in places])
+
+    def test_round_trip_ok(self):
+        for file_format in ('json', 'csv'):
+            with self.subTest(file_format=file_format):
+                document = ''.join(export_world(self.world, format=file_format, chunk_size=2))
+
+                world, count = import_world(StringIO(document), owner=self.owner, format=file_format)
+
+                self.assertEqual(5, count)
+                self.assertListEqual(
+                    list(self.world.get_descendants(include_self=True).values_list('name', 'description', 'image')),
+                    list(world.get_descendants(include_self=True).values_list('name', 'description', 'image')),
+                )
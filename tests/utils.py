@@ -1,8 +1,12 @@
 import logging
+import os
 import random
+import socket
+import uuid
 from typing import TYPE_CHECKING, Union
 from unittest import mock
 
+from channels_redis.core import RedisChannelLayer
 from model_bakery import baker
 
 from common.utils.faker import create_faker
@@ -15,6 +19,9 @@ LOGGER = logging.getLogger(__name__)
 
 fake = create_faker()
 
+# NOTE: Tests of the Redis backends run against this host, they're skipped if nothing listens there
+REDIS_TEST_HOST = (os.getenv('REDIS_TEST_HOST', 'localhost'), int(os.getenv('REDIS_TEST_PORT', '6379')))
+
 
 def generate_place(_quantity=1, **kwargs) -> Union[list['Place'], 'Place']:
     """
@@ -39,7 +46,7 @@ def generate_place(_quantity=1, **kwargs) -> Union[list['Place'], 'Place']:
             'owner': owner,
         }
         params.update(kwargs)
-        # NOTE: Bulk create does **not** work with `mptt`
+        # NOTE: Places are created one by one, so their paths are set on save
         places += [roleplay.models.Place.objects.create(**params)]
 
     return places if _quantity > 1 else places[0]
@@ -48,3 +55,19 @@ def generate_place(_quantity=1, **kwargs) -> Union[list['Place'], 'Place']:
 class AsyncMock(mock.MagicMock):
     async def __call__(self, *args, **kwargs):
         return super(AsyncMock, self).__call__(*args, **kwargs)
+
+
+def is_redis_available() -> bool:
+    try:
+        socket.create_connection(REDIS_TEST_HOST, timeout=0.5).close()
+    except OSError:
+        return False
+    return True
+
+
+def make_redis_channel_layer() -> RedisChannelLayer:
+    """
+    Returns a channel layer on the Redis test host with a prefix of its own, so tests never share keys.
+    """
+
+    return RedisChannelLayer(hosts=[REDIS_TEST_HOST], prefix=f'oilandrope-test-{uuid.uuid4().hex}')